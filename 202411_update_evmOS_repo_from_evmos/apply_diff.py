@@ -1,14 +1,18 @@
-import subprocess
+import json
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
+
+import tracing
+from three_way import apply_with_three_way_fallback
 
 
 def apply_regular_diff(diffs_dir, diff_file, target_dir):
     diff_file_path = os.path.join(diffs_dir, diff_file)
 
-    os.chdir(target_dir)
-    result = subprocess.run(
+    result = tracing.run(
         ['git', 'apply', '--reject', diff_file_path],
+        cwd=target_dir,
         capture_output=True,
         text=True
     )
@@ -39,6 +43,35 @@ def apply_regular_diff(diffs_dir, diff_file, target_dir):
     print(f"\nDone applying {diff_file}")
 
 
+def check_diff(diff_file_path, target_dir, check_only=True):
+    """
+    Runs `git apply` for the given diff file in the target directory,
+    either only checking if it would apply cleanly or applying it without rejections.
+
+    Returns the error output of git, which is empty if the diff applies cleanly.
+    """
+    command = ['git', 'apply', '--check', diff_file_path] if check_only else ['git', 'apply', diff_file_path]
+    result = tracing.run(command, cwd=target_dir, capture_output=True, text=True)
+    if result.returncode == 0:
+        return ""
+
+    return result.stderr.strip() or f"git apply exited with code {result.returncode}"
+
+
+def check_diffs(diffs_dir, target_dir, diff_files, dep_bumps, jobs=None):
+    """
+    Checks all regular diffs against the current state of the target directory.
+
+    Returns the error output of git for each diff, which is empty for dependency bumps and clean diffs.
+    """
+    # NOTE: `git apply --check` does not modify the working tree, so the checks can run concurrently
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+        return list(executor.map(
+            lambda item: "" if item[1] else check_diff(os.path.join(diffs_dir, item[0]), target_dir),
+            zip(diff_files, dep_bumps),
+        ))
+
+
 def check_dependency_bump(commit_title):
     deps_match = re.search(
         r"build\(deps\):\s+bump\s+(?P<dep>\S+)\s+from\s+\S+\s+to\s+(?P<target>\S+)",
@@ -57,28 +90,50 @@ def check_dependency_bump(commit_title):
 
 
 def apply_dependency_bump(target_dir, dep_bump):
-    print("bumping dependency: ", dep_bump)
-    command = f"go get {dep_bump["dep"]}@v{dep_bump["target"]} && go mod tidy"
+    return apply_dependency_bumps(target_dir, [dep_bump])
 
-    os.chdir(target_dir)
-    os.system(command)
 
-    os.chdir(os.path.join(target_dir, "example_chain"))
-    os.system(command)
+def apply_dependency_bumps(target_dir, dep_bumps):
+    """
+    Applies the given dependency bumps with a single `go get` and `go mod tidy` per module directory.
+    The root module is updated before `example_chain`, which depends on it through a `replace` directive.
 
+    Returns the exit codes for each module directory.
+    """
+    # NOTE: if a dependency is bumped multiple times, the latest bump wins
+    targets = {dep_bump["dep"]: dep_bump["target"] for dep_bump in dep_bumps}
+    modules = [f"{dep}@v{target}" for dep, target in targets.items()]
+    print("bumping dependencies: ", " ".join(modules))
 
-def apply_diff(source_repo, target_dir, diff_number):
-    diff_number = int(diff_number)  # convert str to int
+    module_dirs = [target_dir, os.path.join(target_dir, "example_chain")]
+    # NOTE: the modules are not updated concurrently, so that `example_chain` never reads a half-written root go.mod
+    exit_codes = {module_dir: go_get_and_tidy(module_dir, modules) for module_dir in module_dirs}
 
-    diffs_dir = os.path.join(source_repo, "diffs")
+    for module_dir, exit_code in exit_codes.items():
+        if exit_code != 0:
+            print(f"updating dependencies in {module_dir} failed with exit code {exit_code}")
+
+    return exit_codes
+
+
+def go_get_and_tidy(module_dir, modules):
+    result = tracing.run(['go', 'get', *modules], cwd=module_dir)
+    if result.returncode != 0:
+        return result.returncode
+
+    return tracing.run(['go', 'mod', 'tidy'], cwd=module_dir).returncode
+
+
+def find_diff_file(diffs_dir, diff_number):
     for entry in os.listdir(diffs_dir):
         if entry.startswith(f"{diff_number:03d}_evmos_diff_") and entry.endswith(".diff"):
-            diff_file = entry
-            break
-    else:
-        raise FileNotFoundError(
-            f"Diff file not found for number: {diff_number}")
+            return entry
+
+    raise FileNotFoundError(
+        f"Diff file not found for number: {diff_number}")
 
+
+def get_commits_from_diff_file(diff_file):
     commits_match = re.search(
         r"evmos_diff_(?P<commit_1>[a-z0-9]+)_(?P<commit_2>[a-z0-9]+)",
         diff_file
@@ -87,20 +142,128 @@ def apply_diff(source_repo, target_dir, diff_number):
         raise ValueError(
             f"Commit info not found in diff file name: {diff_file}")
 
-    os.chdir(source_repo)
-    commit_2 = commits_match.group('commit_2')
-    out = subprocess.run(
-        ['git', '--no-pager', 'show', '--quiet', '--format=%s', commit_2],
+    return commits_match.group('commit_1'), commits_match.group('commit_2')
+
+
+def get_commit_titles(source_repo, commits):
+    """Returns the titles of the given commits, which are read with a single git call."""
+    out = tracing.run(
+        ['git', '--no-pager', 'show', '--quiet', '--no-walk=unsorted', '--format=%s', *commits],
+        cwd=source_repo,
         check=True,
         capture_output=True,
         text=True
     )
-    commit_title = out.stdout.strip()
+
+    return out.stdout.splitlines()
+
+
+def apply_diff(source_repo, target_dir, diff_number, three_way=False, report_path=None):
+    diff_number = int(diff_number)  # convert str to int
+
+    source_repo = os.path.abspath(source_repo)
+    diffs_dir = os.path.join(source_repo, "diffs")
+    diff_file = find_diff_file(diffs_dir, diff_number)
+    _, commit_2 = get_commits_from_diff_file(diff_file)
+    commit_title = get_commit_titles(source_repo, [commit_2])[0]
 
     dep_bump = check_dependency_bump(commit_title)
     if dep_bump:
         apply_dependency_bump(target_dir, dep_bump)
+    elif three_way:
+        report = apply_with_three_way_fallback(source_repo, diffs_dir, diff_file, os.path.abspath(target_dir))
+        write_report(report, report_path)
     else:
         apply_regular_diff(diffs_dir, diff_file, target_dir)
 
     print(f"{commit_2} {commit_title}")
+
+
+def write_report(report, report_path=None):
+    if report_path is None:
+        print(json.dumps(report, indent=2))
+        return
+
+    with open(report_path, 'w') as file:
+        json.dump(report, file, indent=2)
+
+
+def apply_diff_range(source_repo, target_dir, first_number, last_number, jobs=None):
+    """
+    Applies all diffs in the given range of diff numbers.
+
+    All regular diffs are checked against the target directory in parallel first, to give an overview in the summary.
+    Afterwards, the diffs are checked again and applied in order until the first diff, that does not apply cleanly.
+    Runs of consecutive dependency bumps are combined into a single update of the Go modules.
+    This diff is not applied, so that it can be resolved manually using `apply_diff`.
+    """
+    source_repo = os.path.abspath(source_repo)
+    target_dir = os.path.abspath(target_dir)
+    diffs_dir = os.path.join(source_repo, "diffs")
+
+    diff_files = [find_diff_file(diffs_dir, number) for number in range(first_number, last_number + 1)]
+    commits = [get_commits_from_diff_file(diff_file)[1] for diff_file in diff_files]
+    titles = get_commit_titles(source_repo, commits)
+    dep_bumps = [check_dependency_bump(title) for title in titles]
+
+    check_errors = check_diffs(diffs_dir, target_dir, diff_files, dep_bumps, jobs)
+
+    entries = list(zip(range(first_number, last_number + 1), diff_files, titles, dep_bumps, check_errors))
+    results = []
+    i = 0
+    while i < len(entries):
+        number, diff_file, title, dep_bump, check_error = entries[i]
+
+        if dep_bump:
+            # Runs of consecutive dependency bumps are applied together,
+            # so that the modules only have to be resolved once.
+            run_end = i + 1
+            while run_end < len(entries) and entries[run_end][3]:
+                run_end += 1
+
+            exit_codes = apply_dependency_bumps(target_dir, [entry[3] for entry in entries[i:run_end]])
+            result = "bump failed" if any(exit_codes.values()) else "bumped"
+            results.extend((entry[0], entry[2], "bump", result) for entry in entries[i:run_end])
+            i = run_end
+            if result == "bump failed":
+                break
+
+            # NOTE: the bumps changed go.mod and go.sum, so the checks of the remaining diffs are outdated
+            remaining = entries[i:]
+            check_errors = check_diffs(
+                diffs_dir, target_dir, [entry[1] for entry in remaining], [entry[3] for entry in remaining], jobs
+            )
+            entries[i:] = [(*entry[:4], check_error) for entry, check_error in zip(remaining, check_errors)]
+            continue
+
+        # NOTE: the up-front check ran against the initial state of the target directory, so it is only advisory:
+        # a diff can depend on the previously applied diffs (e.g. modify a file added by one of them)
+        # or conflict with them. That's why each diff is checked again right before it is applied.
+        check = "conflict" if check_error else "clean"
+        diff_file_path = os.path.join(diffs_dir, diff_file)
+        error = check_diff(diff_file_path, target_dir) or check_diff(diff_file_path, target_dir, check_only=False)
+        i += 1
+        if error:
+            results.append((number, title, check, "conflict"))
+            print(f"\nStopping at {diff_file}:\n{error}")
+            break
+
+        results.append((number, title, check, "applied"))
+
+    for number, _, title, dep_bump, check_error in entries[i:]:
+        check = "bump" if dep_bump else ("conflict" if check_error else "clean")
+        results.append((number, title, check, "skipped"))
+
+    print_summary(results)
+
+    return results
+
+
+def print_summary(results):
+    headers = ("Diff", "Check", "Result", "Commit")
+    rows = [(f"{number:03d}", check, result, title) for number, title, check, result in results]
+    widths = [max(len(row[i]) for row in [headers, *rows]) for i in range(len(headers))]
+
+    print()
+    for row in [headers, *rows]:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
@@ -0,0 +1,47 @@
+import subprocess
+
+import pytest
+
+
+def git(repo, *args):
+    return subprocess.run(['git', *args], cwd=repo, check=True, capture_output=True, text=True).stdout
+
+
+def create_repo(path, content):
+    path.mkdir()
+    git(path, 'init', '-q')
+    git(path, 'config', 'user.email', 'test@example.com')
+    git(path, 'config', 'user.name', 'test')
+    (path / "notes.txt").write_text(content)
+    git(path, 'add', '.')
+    git(path, 'commit', '-qm', 'initial')
+    return path
+
+
+@pytest.fixture
+def source_repo(tmp_path):
+    repo = tmp_path / "evmos"
+    repo.mkdir()
+    git(repo, 'init', '-q')
+    git(repo, 'config', 'user.email', 'test@example.com')
+    git(repo, 'config', 'user.name', 'test')
+
+    app_dir = repo / "app" / "ante" / "evm"
+    app_dir.mkdir(parents=True)
+    (app_dir / "mono.go").write_text('import "github.com/evmos/evmos/v20/app/ante/evm"\n')
+    git(repo, 'add', '.')
+    git(repo, 'commit', '-qm', 'initial')
+
+    (app_dir / "mono.go").write_text('import "github.com/evmos/evmos/v20/app/ante/evm/09_gas_consume.go"\n')
+    git(repo, 'commit', '-qam', 'change import')
+
+    git(repo, 'mv', 'app/ante/evm/mono.go', 'app/ante/evm/renamed.go')
+    git(repo, 'commit', '-qm', 'rename file')
+
+    git(repo, 'commit', '-q', '--allow-empty', '-m', 'empty commit')
+
+    (repo / "binary.bin").write_bytes(b'\x00\x01\x02')
+    git(repo, 'add', '.')
+    git(repo, 'commit', '-qm', 'add binary file')
+
+    return repo
@@ -1,99 +1,145 @@
 import os
-import subprocess
-import re
+import shutil
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 
+import tracing
+from git_utils import resolve_object_names, stream_commit_pair_diffs
+from rewrite_rules import DEFAULT_ENGINE
+from sync_state import CACHE_DIR, cache_key, cache_path, load_sync_state, prune_cache, save_sync_state
 
-def get_commits_after(source_repo, last_sync_commit):
-    os.chdir(source_repo)
-    result = subprocess.run(['git', 'log', '--oneline'], capture_output=True, text=True, check=True)
-    commits = result.stdout.strip().split('\n')
-    
-    filtered_commits = []
-    for commit in commits:
-        commit_hash = commit.split(' ')[0]
-        filtered_commits.append(commit)
-        if hashes_match(commit_hash, last_sync_commit):
-            break
-
-    return filtered_commits 
 
+def get_commits_after(source_repo, last_sync_commit):
+    """
+    Returns the commits after the last synced commit (newest first), including the last synced commit itself.
+
+    Only the `last_sync_commit..HEAD` range is read instead of the full history.
+    """
+    result = tracing.run(
+        ['git', 'log', '--oneline', f'{last_sync_commit}..HEAD'],
+        cwd=source_repo,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    last_commit = tracing.run(
+        ['git', 'log', '--oneline', '-1', last_sync_commit],
+        cwd=source_repo,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+    return result.stdout.splitlines() + last_commit.stdout.splitlines()
+
+
+def create_diff_files(source_repo, commits, jobs=None, engine=None):
+    """
+    Writes the numbered diff files for all consecutive commit pairs,
+    already applying the rewrite rules to their contents.
+
+    Diffs, that are already up to date or contained in the cache, are not generated again.
+    The remaining diffs are read from a single git process and written by a bounded pool of worker processes.
+    """
+    engine = engine or DEFAULT_ENGINE
+    diffs_dir = os.path.join(source_repo, 'diffs')
+    os.makedirs(os.path.join(diffs_dir, CACHE_DIR), exist_ok=True)
+
+    reversed_commits = [commit.split(' ')[0] for commit in commits[::-1]]
+    commit_pairs = list(zip(reversed_commits, reversed_commits[1:]))
+    full_hashes = resolve_object_names(source_repo, reversed_commits)
+
+    previous_state = load_sync_state(diffs_dir)
+    state = {
+        "last_sync_commit": full_hashes[reversed_commits[0]],
+        "head": full_hashes[reversed_commits[-1]],
+        "rules_hash": engine.rules_hash,
+        "diffs": {},
+    }
+
+    diff_files = []
+    missing = {}
+    for i, (commit_1, commit) in enumerate(commit_pairs, start=1):
+        diff_file = f"{i:03d}_evmos_diff_{commit_1}_{commit}.diff"
+        diff_file_path = os.path.join(diffs_dir, diff_file)
+        key = cache_key(full_hashes[commit_1], full_hashes[commit], engine.rules_hash)
+        diff_files.append(diff_file)
+        state["diffs"][diff_file] = key
+
+        if previous_state["diffs"].get(diff_file) == key and os.path.exists(diff_file_path):
+            continue
+        if os.path.exists(cache_path(diffs_dir, key)):
+            shutil.copyfile(cache_path(diffs_dir, key), diff_file_path)
+            continue
+
+        missing[(commit_1, commit)] = (diff_file_path, key)
+
+    # Remove the numbered diffs of the previous run, that are not part of this sync anymore
+    for diff_file in previous_state["diffs"]:
+        if diff_file not in state["diffs"] and os.path.exists(os.path.join(diffs_dir, diff_file)):
+            os.remove(os.path.join(diffs_dir, diff_file))
+
+    jobs = jobs or os.cpu_count() or 1
+    pending = set()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        diffs = stream_commit_pair_diffs(source_repo, list(missing), full_hashes) if missing else []
+        for pair, diff in diffs:
+            diff_file_path, key = missing[pair]
+            pending.add(executor.submit(
+                write_diff_file, diff_file_path, diff, cache_path(diffs_dir, key), engine, tracing.is_enabled()
+            ))
+
+            # Limit the number of diffs that are held in memory at the same time
+            if len(pending) >= 2 * jobs:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    tracing.add_spans(future.result())
+
+        for future in pending:
+            tracing.add_spans(future.result())
+
+    # NOTE: only the entries of the current commit range are kept, so that the cache does not grow without bound
+    prune_cache(diffs_dir, state["diffs"].values())
+    save_sync_state(diffs_dir, state)
+
+    return diffs_dir, diff_files, len(missing)
+
+
+def write_diff_file(diff_file_path, diff, cache_file_path, engine, trace=False):
+    """
+    Rewrites the given diff and writes it to the cache and the numbered diff file.
+
+    This runs in a worker process, so the recorded spans are returned to be added to the main process.
+    """
+    if trace:
+        tracing.enable()
+
+    with tracing.span("rewrite", bytes_in=len(diff)) as args:
+        content = engine.rewrite(diff.decode('utf-8', errors='surrogateescape'))
+        args["bytes_out"] = tracing.byte_length(content)
+
+    tmp_file_path = cache_file_path + '.tmp'
+    with open(tmp_file_path, 'w', encoding='utf-8', errors='surrogateescape', newline='') as file:
+        file.write(content)
 
-def hashes_match(commit_hash, last_sync_commit) -> bool:
-    if len(commit_hash) == len(last_sync_commit):
-        return commit_hash == last_sync_commit
+    os.replace(tmp_file_path, cache_file_path)
+    shutil.copyfile(cache_file_path, diff_file_path)
 
-    compare_length = min(len(commit_hash), len(last_sync_commit))
-    if len(commit_hash) > len(last_sync_commit):
-        return commit_hash[:compare_length] == last_sync_commit[:compare_length]
-    elif len(commit_hash) < len(last_sync_commit):
-        return commit_hash[:compare_length] == last_sync_commit[:compare_length]
+    return tracing.take_spans()
 
-    return False
 
+def replace_evmos_with_evmOS(diff_file_path, engine=DEFAULT_ENGINE):
+    tmp_file_path = diff_file_path + '.tmp'
+    with tracing.span("rewrite", bytes_in=os.path.getsize(diff_file_path)) as args:
+        with open(diff_file_path, 'r') as file, open(tmp_file_path, 'w') as tmp_file:
+            tmp_file.writelines(engine.rewrite_lines(file))
+        args["bytes_out"] = os.path.getsize(tmp_file_path)
 
-def create_diff_files(source_repo, commits):
-    diffs_dir = os.path.join(source_repo, 'diffs')
-    os.makedirs(diffs_dir, exist_ok=True)
-
-    reversed_commits = commits[::-1]
-    for i in range(1, len(reversed_commits)):
-        commit_1 = reversed_commits[i - 1].split(' ')[0]
-        commit = reversed_commits[i].split(' ')[0]
-        diff_file_path = os.path.join(diffs_dir, f"{i:03d}_evmos_diff_{commit_1}_{commit}.diff")
-        subprocess.run(['git', 'diff', f'{commit_1}..{commit}'], stdout=open(diff_file_path, 'w'), check=True)
-
-    diff_files = [file for file in os.listdir(diffs_dir) if file.endswith('.diff')]
-
-    return diffs_dir, diff_files
-
-
-def replace_evmos_with_evmOS(diff_file_path):
-    with open(diff_file_path, 'r') as file:
-        content = file.read()
-
-    # paths
-    content = re.sub(r'github\.com/evmos/evmos/v20/', 'github.com/evmos/os/', content)
-    content = re.sub(r'ethermint/evm/v1', 'os/evm/v1', content)
-    content = re.sub(r'ethermint/feemarket/v1', 'os/feemarket/v1', content)
-    content = re.sub(r'ethermint/erc20/v1', 'os/erc20/v1', content)
-    content = re.sub(r'ethermint/crypto/v1', 'os/crypto/v1', content)
-    content = re.sub(r'ethermint/types/v1', 'os/types/v1', content)
-    content = re.sub(r'testutil/integration/evmos/', 'testutil/integration/os/', content)
-    content = re.sub(r'app/app.go', 'example_chain/app.go', content)
-    content = re.sub(r'app/config.go', 'example_chain/config.go', content)
-    content = re.sub(r'app/config_testing.go', 'example_chain/config_testing.go', content)
-    content = re.sub(r'app/ante/cosmos/interfaces.go', 'ante/interfaces/cosmos.go', content)
-    content = re.sub(r'app/ante/cosmos/', 'ante/cosmos/', content)
-    content = re.sub(r'app/ante/evm/interfaces.go', 'ante/interfaces/evm.go', content)
-    content = re.sub(r'app/ante/evm/mono.go', 'app/ante/evm/mono_decorator.go', content)
-    content = re.sub(r'app/ante/evm/', 'ante/evm/', content)
-    content = re.sub(r'app/ante/evm_benchmark_test.go', 'example_chain/ante/evm_benchmark_test.go', content)
-    content = re.sub(r'app/ante/handler_options', 'example_chain/ante/handler_options', content)
-    content = re.sub(r'app/ante/integration_test.go', 'example_chain/ante/integration_test.go', content)
-    content = re.sub(r'app/ante/testutils/testutils.go', 'ante/testutils/testutil.go', content)
-    content = re.sub(r'pp.EvmKeeper', 'pp.EVMKeeper', content)
-    content = re.sub(r'ante/evm/09_gas_consume', 'ante/evm/08_gas_consume', content)
-    content = re.sub(r'ante/evm/10_increment_sequence', 'ante/evm/09_increment_sequence', content)
-    content = re.sub(r'ante/evm/11_gas_wanted', 'ante/evm/10_gas_wanted', content)
-    content = re.sub(r'ante/evm/12_emit_event', 'ante/evm/11_emit_event', content)
-    content = re.sub(r'ante/cosmos/min_price', 'ante/cosmos/min_gas_price', content)
-    content = re.sub(r'cmd/evmosd', 'example_chain/osd/cmd', content)
-    content = re.sub(r'testutil/contract.go', 'example_chain/testutil/contract.go', content)
-    content = re.sub(r'ante/evm/setup_ctx_test.go', 'ante/evm/01_setup_ctx_test.go', content)
-
-    # Code snippets
-    content = re.sub(r'[a-z0-9]+\.WEVMOSContractMainnet', 'testconstants.WEVMOSContractMainnet', content)
-    content = re.sub(r'[a-z0-9]+\.WEVMOSContractTestnet', 'testconstants.WEVMOSContractTestnet', content)
-
-    with open(diff_file_path, 'w') as file:
-        file.write(content)
+    os.replace(tmp_file_path, diff_file_path)
 
 
-def update_repository(source_repo, last_sync_commit):
+def update_repository(source_repo, last_sync_commit, jobs=None):
+    source_repo = os.path.abspath(source_repo)
     commits = get_commits_after(source_repo, last_sync_commit)
-    diffs_dir, diff_files = create_diff_files(source_repo, commits)
-
-    for diff_file_path in diff_files:
-        replace_evmos_with_evmOS(os.path.join(diffs_dir, diff_file_path))
+    _, diff_files, n_generated = create_diff_files(source_repo, commits, jobs)
 
-    print(f"{len(diff_files)} diff files created successfully.") 
+    print(f"{len(diff_files)} diff files created successfully ({n_generated} newly generated).")
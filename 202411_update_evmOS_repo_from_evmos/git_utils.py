@@ -1,16 +1,105 @@
 import subprocess
-import os
-
-def get_commits_after(source_repo, last_sync_commit):
-    os.chdir(source_repo)
-    result = subprocess.run(['git', 'log', '--oneline'], capture_output=True, text=True, check=True)
-    commits = result.stdout.strip().split('\n')
-    
-    filtered_commits = []
-    for commit in commits:
-        commit_hash = commit.split(' ')[0]
-        filtered_commits.append(commit)
-        if commit_hash == last_sync_commit:
-            break
-
-    return filtered_commits 
\ No newline at end of file
+import threading
+import time
+
+import tracing
+
+
+def stream_commit_pair_diffs(source_repo, commit_pairs, full_hashes=None, chunk_size=1 << 16):
+    """
+    Yields the diff for each given (commit_1, commit_2) pair in order.
+
+    All pairs are passed to a single `git diff-tree --stdin` process,
+    which produces the same output as `git diff commit_1..commit_2`,
+    so there is no process startup cost per commit pair.
+    Each entry in the output stream is prefixed with a NUL byte and the commit hash.
+    """
+    # NOTE: diff-tree only accepts full commit hashes on stdin
+    if full_hashes is None:
+        full_hashes = resolve_object_names(source_repo, {commit for pair in commit_pairs for commit in pair})
+
+    process = subprocess.Popen(
+        ['git', '-C', source_repo, 'diff-tree', '--stdin', '-p', '-M', '--always', '--no-color', '--format=%x00%H'],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+    )
+
+    # NOTE: the input is written from a separate thread, because git starts writing diffs
+    # before reading all of stdin, which could otherwise block both processes on full pipes.
+    def write_pairs():
+        try:
+            with process.stdin:
+                for commit_1, commit_2 in commit_pairs:
+                    process.stdin.write(f"{full_hashes[commit_2]} {full_hashes[commit_1]}\n".encode())
+        except BrokenPipeError:
+            pass  # git exited early, which is reported through its exit code
+
+    writer = threading.Thread(target=write_pairs, daemon=True)
+    writer.start()
+
+    pairs = iter(commit_pairs)
+    entry_parts = []
+    # NOTE: this is a generator, so the span only covers the time spent reading from git,
+    # excluding the time the consumer spends processing the yielded diffs.
+    start_time = time.time()
+    read_duration = 0.0
+    bytes_out = 0
+    try:
+        with process.stdout:
+            while True:
+                read_start = time.perf_counter()
+                chunk = process.stdout.read(chunk_size)
+                read_duration += time.perf_counter() - read_start
+                if not chunk:
+                    break
+
+                bytes_out += len(chunk)
+                first, *rest = chunk.split(b'\0')
+                entry_parts.append(first)
+                for part in rest:
+                    entry = b''.join(entry_parts)
+                    if entry:
+                        yield next(pairs), parse_diff_tree_entry(entry)
+                    entry_parts = [part]
+
+        entry = b''.join(entry_parts)
+        if entry:
+            yield next(pairs), parse_diff_tree_entry(entry)
+    except BaseException:
+        process.kill()
+        raise
+    finally:
+        tracing.add_span("git diff-tree", start_time, read_duration, pairs=len(commit_pairs), bytes_out=bytes_out)
+
+    writer.join()
+    if process.wait() != 0:
+        raise subprocess.CalledProcessError(process.returncode, process.args)
+
+
+def parse_diff_tree_entry(entry: bytes) -> bytes:
+    """Strips the commit hash header line and the separating empty line from a diff-tree entry."""
+    _, _, diff = entry.partition(b'\n')
+    if diff.startswith(b'\n'):
+        diff = diff[1:]
+
+    return diff
+
+
+def resolve_object_names(source_repo, names):
+    """Resolves (abbreviated) object names to their full hashes with a single git process."""
+    names = list(names)
+    result = tracing.run(
+        ['git', '-C', source_repo, 'cat-file', '--batch-check=%(objectname)'],
+        input=''.join(f"{name}\n" for name in names),
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+    resolved = {}
+    for name, line in zip(names, result.stdout.splitlines()):
+        if line.endswith(' missing') or line.endswith(' ambiguous'):
+            raise ValueError(f"Could not resolve object name: {line}")
+        resolved[name] = line
+
+    return resolved
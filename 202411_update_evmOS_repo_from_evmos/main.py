@@ -7,34 +7,83 @@ Usage:
 """
 
 import argparse
+import atexit
+import os
+
+import tracing
 from diff_utils import update_repository
-from apply_diff import apply_diff
+from apply_diff import apply_diff, apply_diff_range
+from patch_model import PatchIndex
 
 def create_arg_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Update evmOS repository from Evmos repository.")
+    parser.add_argument('--trace', help='Record the timings of all subprocesses and rewrites to this Chrome trace file')
+    parser.add_argument('--trace-top', type=int, default=10, help='Number of spans in the timing summary (default: 10)')
     subparsers = parser.add_subparsers(dest='command')
 
     # Subcommand for generating diffs
     generate_parser = subparsers.add_parser('generate', help='Generate diff files')
     generate_parser.add_argument('source_repo', help='Path to the source repository')
     generate_parser.add_argument('last_sync_commit', help='Last synced commit hash')
+    generate_parser.add_argument('--jobs', type=int, default=None, help='Number of worker processes (default: CPU count)')
 
     # Subcommand for applying diffs
     apply_parser = subparsers.add_parser('apply', help='Apply diff files')
     apply_parser.add_argument('source_repo', help='Path to the source repository')
     apply_parser.add_argument('target_dir', help='Target directory to apply diffs')
-    apply_parser.add_argument('diff_number', help='Diff number to apply')
+    apply_parser.add_argument('diff_number', help='Diff number or range of diff numbers (e.g. 5-20) to apply')
+    apply_parser.add_argument('--jobs', type=int, default=None, help='Number of parallel checks for a range (default: CPU count)')
+    apply_parser.add_argument('--three-way', action='store_true', help='Fall back to a three-way merge before rejecting hunks')
+    apply_parser.add_argument('--report', help='Write the JSON report of the three-way apply to this file')
+
+    # Subcommand for querying the files touched by the diffs
+    index_parser = subparsers.add_parser('index', help='Query which diffs touch which files')
+    index_parser.add_argument('source_repo', help='Path to the source repository')
+    index_parser.add_argument('--file', help='Print the diffs and hunks touching this file')
+    index_parser.add_argument('--overlaps', type=int, help='Print the diffs touching the same files as this diff number')
 
     return parser
 
+
+def query_index(source_repo, file=None, overlaps=None):
+    index = PatchIndex.load(os.path.join(source_repo, "diffs"))
+
+    if file:
+        for entry in index.hunks_touching(file):
+            print(index.describe(entry))
+
+    if overlaps is not None:
+        for number, paths in index.overlapping_diffs(overlaps).items():
+            print(f"{number:03d}  {', '.join(sorted(paths))}")
+
+
+def write_trace_and_summary(trace_path, top_n):
+    tracing.write_trace(trace_path)
+    tracing.print_summary(top_n)
+    print(f"\nTrace written to {trace_path}")
+
+
 if __name__ == "__main__":
     parser = create_arg_parser()
     args = parser.parse_args()
 
+    if args.trace:
+        tracing.enable()
+        atexit.register(write_trace_and_summary, args.trace, args.trace_top)
+
     if args.command == 'generate':
-        update_repository(args.source_repo, args.last_sync_commit)
+        update_repository(args.source_repo, args.last_sync_commit, args.jobs)
     elif args.command == 'apply':
-        apply_diff(args.source_repo, args.target_dir, args.diff_number)
+        if '-' in args.diff_number:
+            # NOTE: a range stops at the first diff, that doesn't apply, so it has no three-way fallback to report on
+            if args.three_way or args.report:
+                parser.error("--three-way and --report can only be used with a single diff number")
+            first_number, last_number = (int(number) for number in args.diff_number.split('-', 1))
+            apply_diff_range(args.source_repo, args.target_dir, first_number, last_number, args.jobs)
+        else:
+            apply_diff(args.source_repo, args.target_dir, args.diff_number, args.three_way, args.report)
+    elif args.command == 'index':
+        query_index(args.source_repo, args.file, args.overlaps)
     else:
         parser.print_help()
 
@@ -0,0 +1,278 @@
+"""
+This module contains a parsed representation of the generated diff files
+and an index from the touched file paths to the diffs and hunks, that change them.
+
+The index is stored next to the diffs and only the diff files, that changed
+since it was last built, are parsed again.
+"""
+
+import json
+import os
+import re
+import sys
+
+
+INDEX_FILE = 'file_index.json'
+# NOTE: the index entry for file patches without hunks, e.g. renames without content changes or binary files
+NO_HUNKS = (0, 0, 0, 0)
+
+HUNK_HEADER = re.compile(r"@@ -(?P<old_start>\d+)(?:,(?P<old_count>\d+))? \+(?P<new_start>\d+)(?:,(?P<new_count>\d+))? @@")
+DIFF_NUMBER = re.compile(r"^(?P<number>\d+)_evmos_diff_.+\.diff$")
+
+
+class Hunk:
+    __slots__ = ("old_start", "old_count", "new_start", "new_count")
+
+    def __init__(self, old_start, old_count, new_start, new_count):
+        self.old_start = old_start
+        self.old_count = old_count
+        self.new_start = new_start
+        self.new_count = new_count
+
+    def __repr__(self):
+        return f"Hunk(-{self.old_start},{self.old_count} +{self.new_start},{self.new_count})"
+
+
+class FilePatch:
+    __slots__ = ("old_path", "new_path", "old_blob", "new_blob", "hunks", "start", "end")
+
+    def __init__(self, old_path=None, new_path=None, start=0):
+        self.old_path = old_path
+        self.new_path = new_path
+        self.old_blob = None
+        self.new_blob = None
+        self.hunks = []
+        # the range of lines in the diff, that belong to this file
+        self.start = start
+        self.end = start
+
+    @property
+    def path(self):
+        """The path of the file after applying the patch, or before it for deleted files."""
+        return self.new_path or self.old_path
+
+    def __repr__(self):
+        return f"FilePatch({self.old_path!r} -> {self.new_path!r}, {len(self.hunks)} hunks)"
+
+
+def parse_patch(lines):
+    """Parses the lines of a diff in the format of `git diff` into a list of file patches."""
+    file_patches = []
+    current = None
+    old_remaining = new_remaining = 0
+
+    n_lines = 0
+    for n_lines, line in enumerate(lines, start=1):
+        line = line.rstrip('\n')
+
+        # Lines of the hunk bodies can start with anything, e.g. a removed line starting with "-- ",
+        # so they are skipped based on the line counts in the hunk header.
+        if old_remaining > 0 or new_remaining > 0:
+            if line.startswith('-'):
+                old_remaining -= 1
+            elif line.startswith('+'):
+                new_remaining -= 1
+            elif not line.startswith('\\'):
+                old_remaining -= 1
+                new_remaining -= 1
+            continue
+
+        if line.startswith('diff --git '):
+            if current is not None:
+                current.end = n_lines - 1
+            old_path, new_path = parse_diff_git_paths(line[len('diff --git '):])
+            current = FilePatch(old_path, new_path, start=n_lines - 1)
+            file_patches.append(current)
+        elif current is None:
+            continue
+        elif line.startswith('@@ '):
+            match = HUNK_HEADER.match(line)
+            hunk = Hunk(
+                int(match.group('old_start')),
+                int(match.group('old_count') or 1),
+                int(match.group('new_start')),
+                int(match.group('new_count') or 1),
+            )
+            current.hunks.append(hunk)
+            old_remaining, new_remaining = hunk.old_count, hunk.new_count
+        elif line.startswith('--- '):
+            current.old_path = parse_path(line[len('--- '):])
+        elif line.startswith('+++ '):
+            current.new_path = parse_path(line[len('+++ '):])
+        elif line.startswith('rename from '):
+            current.old_path = line[len('rename from '):]
+        elif line.startswith('rename to '):
+            current.new_path = line[len('rename to '):]
+        elif line.startswith('new file mode '):
+            current.old_path = None
+        elif line.startswith('deleted file mode '):
+            current.new_path = None
+        elif line.startswith('index '):
+            current.old_blob, _, rest = line[len('index '):].partition('..')
+            current.new_blob = rest.split(' ')[0]
+
+    if current is not None:
+        current.end = n_lines
+
+    return file_patches
+
+
+def parse_diff_git_paths(paths):
+    # NOTE: this is only a fallback for patches without `---`/`+++` lines (e.g. binary files),
+    # which is ambiguous for paths containing " b/".
+    old_path, _, new_path = paths.partition(' b/')
+    return parse_path(old_path), new_path.strip('"')
+
+
+def parse_path(path):
+    path = path.strip('"')
+    if path == '/dev/null':
+        return None
+
+    return path[2:] if path[:2] in ('a/', 'b/') else path
+
+
+def diff_number(diff_file):
+    match = DIFF_NUMBER.match(diff_file)
+    return int(match.group('number')) if match else None
+
+
+def load_series(diffs_dir):
+    """Parses all numbered diff files in the given directory, keyed by their diff number."""
+    series = {}
+    for entry in os.listdir(diffs_dir):
+        number = diff_number(entry)
+        if number is None:
+            continue
+
+        with open(os.path.join(diffs_dir, entry), 'r', errors='surrogateescape') as file:
+            series[number] = parse_patch(file)
+
+    return series
+
+
+class PatchIndex:
+    """
+    Inverted index from the file paths to the diffs and hunks, that touch them.
+
+    Each entry in the index is a tuple of (diff number, old start, old count, new start, new count).
+    """
+
+    def __init__(self, files=None, stamps=None):
+        self.files = files or {}
+        self.stamps = stamps or {}
+
+    @classmethod
+    def load(cls, diffs_dir):
+        """Loads the stored index and updates it for all diff files, that were added or changed since."""
+        index = cls()
+        index_file_path = os.path.join(diffs_dir, INDEX_FILE)
+        if os.path.exists(index_file_path):
+            with open(index_file_path, 'r') as file:
+                stored = json.load(file)
+            index = cls(
+                {path: [tuple(entry) for entry in entries] for path, entries in stored["files"].items()},
+                stored["stamps"],
+            )
+
+        if index.update(diffs_dir):
+            index.save(diffs_dir)
+
+        return index
+
+    def save(self, diffs_dir):
+        index_file_path = os.path.join(diffs_dir, INDEX_FILE)
+        tmp_file_path = index_file_path + '.tmp'
+        with open(tmp_file_path, 'w') as file:
+            json.dump({"files": self.files, "stamps": self.stamps}, file)
+
+        os.replace(tmp_file_path, index_file_path)
+
+    def update(self, diffs_dir):
+        """Parses the diff files, that are not in the index yet or changed, and returns if anything changed."""
+        stamps = {}
+        for entry in os.scandir(diffs_dir):
+            if diff_number(entry.name) is not None:
+                stat = entry.stat()
+                stamps[entry.name] = [stat.st_size, stat.st_mtime_ns]
+
+        outdated = {diff_file for diff_file, stamp in self.stamps.items() if stamps.get(diff_file) != stamp}
+        added = {diff_file for diff_file in stamps if self.stamps.get(diff_file) != stamps[diff_file]}
+        if not outdated and not added:
+            return False
+
+        outdated_numbers = {diff_number(diff_file) for diff_file in outdated}
+        for path in list(self.files):
+            self.files[path] = [entry for entry in self.files[path] if entry[0] not in outdated_numbers]
+            if not self.files[path]:
+                del self.files[path]
+
+        for diff_file in sorted(added):
+            number = diff_number(diff_file)
+            with open(os.path.join(diffs_dir, diff_file), 'r', errors='surrogateescape') as file:
+                self.add(number, parse_patch(file))
+
+        self.stamps = stamps
+        return True
+
+    def add(self, number, file_patches):
+        for file_patch in file_patches:
+            paths = {file_patch.old_path, file_patch.new_path} - {None}
+            entries = [
+                (number, hunk.old_start, hunk.old_count, hunk.new_start, hunk.new_count)
+                for hunk in file_patch.hunks
+            ] or [(number, *NO_HUNKS)]
+
+            for path in paths:
+                path_entries = self.files.setdefault(sys.intern(path), [])
+                path_entries.extend(entries)
+                path_entries.sort()
+
+    def diffs_touching(self, path):
+        return sorted({entry[0] for entry in self.files.get(path, [])})
+
+    def hunks_touching(self, path):
+        return self.files.get(path, [])
+
+    @staticmethod
+    def describe(entry):
+        """Returns the hunk header of an index entry or the reason, why the file is touched without any hunks."""
+        number, old_start, old_count, new_start, new_count = entry
+        if entry[1:] == NO_HUNKS:
+            return f"{number:03d}  (no content changes, e.g. a rename, mode change or binary file)"
+
+        return f"{number:03d}  @@ -{old_start},{old_count} +{new_start},{new_count} @@"
+
+    def overlapping_diffs(self, number):
+        """Returns the other diffs, that touch any of the files changed in the given diff, grouped by the diff number."""
+        overlaps = {}
+        for path, entries in self.files.items():
+            if any(entry[0] == number for entry in entries):
+                for other in {entry[0] for entry in entries} - {number}:
+                    overlaps.setdefault(other, []).append(path)
+
+        return dict(sorted(overlaps.items()))
+
+    def blocked_by(self, number, path, hunk=None):
+        """
+        Returns the later diffs, that change lines in the given file, which overlap with the
+        hunks of the given diff (or only the given hunk).
+
+        NOTE: this compares the changed lines in the diff with the original lines in the later diffs
+        and does not account for line shifts of the diffs in between, so it's only an approximation.
+        """
+        ranges = [
+            (entry[3], entry[3] + entry[4])
+            for entry in self.files.get(path, [])
+            if entry[0] == number and (hunk is None or entry[1:] == (hunk.old_start, hunk.old_count, hunk.new_start, hunk.new_count))
+        ]
+
+        blocked = set()
+        for entry in self.files.get(path, []):
+            if entry[0] <= number:
+                continue
+            start, end = entry[1], entry[1] + entry[2]
+            if any(start <= range_end and range_start <= end for range_start, range_end in ranges):
+                blocked.add(entry[0])
+
+        return sorted(blocked)
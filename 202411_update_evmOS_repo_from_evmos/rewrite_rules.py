@@ -0,0 +1,89 @@
+"""
+This module contains the rule table, that describes the known differences
+between the Evmos and evmOS repositories, e.g. renamed files and import paths.
+
+The rules are compiled into one combined matcher, so that each diff only has to
+be scanned once instead of running a separate substitution per rule.
+"""
+
+import hashlib
+import re
+
+
+# NOTE: the order of the rules matters, because later rules are applied to the output
+# of earlier rules (e.g. `app/ante/evm/mono.go` is first renamed to `app/ante/evm/mono_decorator.go`
+# and then moved to `ante/evm/mono_decorator.go` by the generic `app/ante/evm/` rule).
+PATH_RULES = [
+    (r'github\.com/evmos/evmos/v20/', 'github.com/evmos/os/'),
+    (r'ethermint/evm/v1', 'os/evm/v1'),
+    (r'ethermint/feemarket/v1', 'os/feemarket/v1'),
+    (r'ethermint/erc20/v1', 'os/erc20/v1'),
+    (r'ethermint/crypto/v1', 'os/crypto/v1'),
+    (r'ethermint/types/v1', 'os/types/v1'),
+    (r'testutil/integration/evmos/', 'testutil/integration/os/'),
+    (r'app/app.go', 'example_chain/app.go'),
+    (r'app/config.go', 'example_chain/config.go'),
+    (r'app/config_testing.go', 'example_chain/config_testing.go'),
+    (r'app/ante/cosmos/interfaces.go', 'ante/interfaces/cosmos.go'),
+    (r'app/ante/cosmos/', 'ante/cosmos/'),
+    (r'app/ante/evm/interfaces.go', 'ante/interfaces/evm.go'),
+    (r'app/ante/evm/mono.go', 'app/ante/evm/mono_decorator.go'),
+    (r'app/ante/evm/', 'ante/evm/'),
+    (r'app/ante/evm_benchmark_test.go', 'example_chain/ante/evm_benchmark_test.go'),
+    (r'app/ante/handler_options', 'example_chain/ante/handler_options'),
+    (r'app/ante/integration_test.go', 'example_chain/ante/integration_test.go'),
+    (r'app/ante/testutils/testutils.go', 'ante/testutils/testutil.go'),
+    (r'pp.EvmKeeper', 'pp.EVMKeeper'),
+    (r'ante/evm/09_gas_consume', 'ante/evm/08_gas_consume'),
+    (r'ante/evm/10_increment_sequence', 'ante/evm/09_increment_sequence'),
+    (r'ante/evm/11_gas_wanted', 'ante/evm/10_gas_wanted'),
+    (r'ante/evm/12_emit_event', 'ante/evm/11_emit_event'),
+    (r'ante/cosmos/min_price', 'ante/cosmos/min_gas_price'),
+    (r'cmd/evmosd', 'example_chain/osd/cmd'),
+    (r'testutil/contract.go', 'example_chain/testutil/contract.go'),
+    (r'ante/evm/setup_ctx_test.go', 'ante/evm/01_setup_ctx_test.go'),
+]
+
+CODE_RULES = [
+    (r'[a-z0-9]+\.WEVMOSContractMainnet', 'testconstants.WEVMOSContractMainnet'),
+    (r'[a-z0-9]+\.WEVMOSContractTestnet', 'testconstants.WEVMOSContractTestnet'),
+]
+
+
+class RewriteEngine:
+    """
+    Applies an ordered list of (pattern, replacement) rules to text line by line.
+
+    None of the rules can match across a line break, so rewriting each line on its own
+    gives the same result as running the rules one after another over the full text.
+    The combined matcher is used to pass through all lines, that none of the rules apply to,
+    which are by far the most lines in a diff.
+    Only the matching lines are run through the ordered rules, so that chained rules
+    (where a rule matches the output of an earlier rule) keep working as before.
+    """
+
+    def __init__(self, rules):
+        self.rules = [(re.compile(pattern), replacement) for pattern, replacement in rules]
+        self.matcher = re.compile("|".join(f"(?:{pattern})" for pattern, _ in rules))
+        # NOTE: this is used to invalidate cached diffs, whenever the rules change
+        self.rules_hash = hashlib.sha256(repr(list(rules)).encode()).hexdigest()
+
+    def rewrite_line(self, line: str) -> str:
+        if not self.matcher.search(line):
+            return line
+
+        for pattern, replacement in self.rules:
+            line = pattern.sub(replacement, line)
+
+        return line
+
+    def rewrite_lines(self, lines):
+        for line in lines:
+            yield self.rewrite_line(line)
+
+    def rewrite(self, content: str) -> str:
+        # NOTE: only splitting at `\n` here, because `.` in the rules can match any other line separator
+        return "\n".join(self.rewrite_lines(content.split("\n")))
+
+
+DEFAULT_ENGINE = RewriteEngine(PATH_RULES + CODE_RULES)
@@ -0,0 +1,57 @@
+"""
+This module contains the persisted state of the diff generation,
+which is used to only generate new or invalidated diffs when rerunning the `generate` command.
+
+The rewritten diffs are stored in a cache, where each entry is keyed by
+the commit pair and the hash of the rewrite rules, that were used to create it.
+The numbered diff files are copied from the cache entries.
+"""
+
+import hashlib
+import json
+import os
+
+
+# NOTE: this has to be increased whenever the way the diffs are generated changes
+CACHE_VERSION = 1
+SYNC_STATE_FILE = 'sync_state.json'
+CACHE_DIR = '.cache'
+
+
+def load_sync_state(diffs_dir):
+    state_file_path = os.path.join(diffs_dir, SYNC_STATE_FILE)
+    if not os.path.exists(state_file_path):
+        return {"diffs": {}}
+
+    with open(state_file_path, 'r') as file:
+        return json.load(file)
+
+
+def save_sync_state(diffs_dir, state):
+    state_file_path = os.path.join(diffs_dir, SYNC_STATE_FILE)
+    tmp_file_path = state_file_path + '.tmp'
+    with open(tmp_file_path, 'w') as file:
+        json.dump(state, file, indent=2, sort_keys=True)
+
+    os.replace(tmp_file_path, state_file_path)
+
+
+def cache_key(commit_1, commit_2, rules_hash):
+    return hashlib.sha256(f"{CACHE_VERSION}:{commit_1}..{commit_2}:{rules_hash}".encode()).hexdigest()
+
+
+def cache_path(diffs_dir, key):
+    return os.path.join(diffs_dir, CACHE_DIR, f"{key}.diff")
+
+
+def prune_cache(diffs_dir, keys):
+    """Removes all cache entries, whose keys are not in the given keys, and returns the number of removed entries."""
+    keep = {f"{key}.diff" for key in keys}
+    cache_dir = os.path.join(diffs_dir, CACHE_DIR)
+    removed = 0
+    for entry in os.scandir(cache_dir):
+        if entry.name not in keep:
+            os.remove(entry.path)
+            removed += 1
+
+    return removed
@@ -1,4 +1,7 @@
-from apply_diff import check_dependency_bump
+import apply_diff
+from apply_diff import apply_diff_range, check_dependency_bump
+from conftest import create_repo, git
+from diff_utils import create_diff_files, get_commits_after
 
 
 def test_check_dependency_bump_pass():
@@ -13,3 +16,109 @@ def test_check_dependency_bump_pass():
 
 def test_check_dependency_bump_fail():
     assert check_dependency_bump("pattern not found") is False
+
+
+def test_apply_diff_range_stops_at_first_conflict(tmp_path, capsys):
+    source_repo = create_repo(tmp_path / "evmos", "a\nb\nc\nd\ne\nf\ng\nh\ni\nj\nk\nl\n")
+    for old, new in [("a", "A"), ("l", "L"), ("f", "F")]:
+        notes = source_repo / "notes.txt"
+        notes.write_text(notes.read_text().replace(f"{old}\n", f"{new}\n"))
+        git(source_repo, 'commit', '-qam', f'change {old}')
+
+    first_commit = git(source_repo, 'rev-list', '--max-parents=0', 'HEAD').strip()[:7]
+    create_diff_files(str(source_repo), get_commits_after(str(source_repo), first_commit), jobs=1)
+
+    target_dir = create_repo(tmp_path / "os", "a\nb\nc\nd\ne\nf\ng\nh\ni\nj\nk\nx\n")
+    results = apply_diff_range(str(source_repo), str(target_dir), 1, 3, jobs=2)
+
+    assert [(number, check, result) for number, _, check, result in results] == [
+        (1, "clean", "applied"),
+        (2, "conflict", "conflict"),
+        (3, "clean", "skipped"),
+    ]
+    assert (target_dir / "notes.txt").read_text() == "A\nb\nc\nd\ne\nf\ng\nh\ni\nj\nk\nx\n"
+    assert "002   conflict  conflict  change l" in capsys.readouterr().out
+
+
+def test_apply_diff_range_coalesces_dependency_bumps(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(apply_diff, "go_get_and_tidy", lambda module_dir, modules: calls.append((module_dir, modules)) or 0)
+
+    source_repo = create_repo(tmp_path / "evmos", "a\n")
+    for title in [
+        "build(deps): bump github.com/cosmos/rosetta from 0.50.10 to 0.50.11 (#3037)",
+        "build(deps): bump github.com/cosmos/cosmos-db from 1.0.2 to 1.1.0 (#3038)",
+        "build(deps): bump github.com/cosmos/rosetta from 0.50.11 to 0.50.12 (#3039)",
+    ]:
+        git(source_repo, 'commit', '-q', '--allow-empty', '-m', title)
+
+    first_commit = git(source_repo, 'rev-list', '--max-parents=0', 'HEAD').strip()[:7]
+    create_diff_files(str(source_repo), get_commits_after(str(source_repo), first_commit), jobs=1)
+
+    target_dir = create_repo(tmp_path / "os", "a\n")
+    results = apply_diff.apply_diff_range(str(source_repo), str(target_dir), 1, 3)
+
+    assert [result for _, _, _, result in results] == ["bumped"] * 3
+    # The root module is updated first, because example_chain depends on it
+    assert calls == [
+        (str(target_dir), ["github.com/cosmos/rosetta@v0.50.12", "github.com/cosmos/cosmos-db@v1.1.0"]),
+        (str(target_dir / "example_chain"), ["github.com/cosmos/rosetta@v0.50.12", "github.com/cosmos/cosmos-db@v1.1.0"]),
+    ]
+
+
+def test_apply_dependency_bumps_reports_exit_codes(tmp_path, monkeypatch):
+    monkeypatch.setattr(apply_diff, "go_get_and_tidy", lambda module_dir, modules: 1 if module_dir.endswith("example_chain") else 0)
+
+    exit_codes = apply_diff.apply_dependency_bumps(str(tmp_path), [{"dep": "github.com/cosmos/rosetta", "target": "0.50.11"}])
+
+    assert exit_codes == {str(tmp_path): 0, str(tmp_path / "example_chain"): 1}
+
+
+def test_apply_diff_range_applies_diffs_depending_on_earlier_diffs(tmp_path):
+    source_repo = create_repo(tmp_path / "evmos", "a\n")
+    (source_repo / "new.txt").write_text("x\n")
+    git(source_repo, 'add', 'new.txt')
+    git(source_repo, 'commit', '-qm', 'add new file')
+    (source_repo / "new.txt").write_text("y\n")
+    git(source_repo, 'commit', '-qam', 'change new file')
+
+    first_commit = git(source_repo, 'rev-list', '--max-parents=0', 'HEAD').strip()[:7]
+    create_diff_files(str(source_repo), get_commits_after(str(source_repo), first_commit), jobs=1)
+
+    target_dir = create_repo(tmp_path / "os", "a\n")
+    results = apply_diff_range(str(source_repo), str(target_dir), 1, 2, jobs=2)
+
+    # NOTE: the second diff does not apply to the initial state, but after the first diff was applied
+    assert [(number, check, result) for number, _, check, result in results] == [
+        (1, "clean", "applied"),
+        (2, "conflict", "applied"),
+    ]
+    assert (target_dir / "new.txt").read_text() == "y\n"
+
+
+def test_apply_diff_range_checks_again_after_dependency_bumps(tmp_path, monkeypatch):
+    def bump(module_dir, modules):
+        if module_dir == str(target_dir):
+            (target_dir / "notes.txt").write_text("b\n")
+        return 0
+
+    monkeypatch.setattr(apply_diff, "go_get_and_tidy", bump)
+
+    source_repo = create_repo(tmp_path / "evmos", "a\n")
+    (source_repo / "notes.txt").write_text("b\n")
+    git(source_repo, 'commit', '-qam', 'build(deps): bump github.com/cosmos/rosetta from 0.50.10 to 0.50.11 (#3037)')
+    (source_repo / "notes.txt").write_text("c\n")
+    git(source_repo, 'commit', '-qam', 'change notes')
+
+    first_commit = git(source_repo, 'rev-list', '--max-parents=0', 'HEAD').strip()[:7]
+    create_diff_files(str(source_repo), get_commits_after(str(source_repo), first_commit), jobs=1)
+
+    target_dir = create_repo(tmp_path / "os", "a\n")
+    results = apply_diff.apply_diff_range(str(source_repo), str(target_dir), 1, 2)
+
+    # NOTE: the second diff only applies after the bump changed the file, which is reflected in its check
+    assert [(number, check, result) for number, _, check, result in results] == [
+        (1, "bump", "bumped"),
+        (2, "clean", "applied"),
+    ]
+    assert (target_dir / "notes.txt").read_text() == "c\n"
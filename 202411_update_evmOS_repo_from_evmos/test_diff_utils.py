@@ -0,0 +1,69 @@
+import os
+
+from conftest import git
+from diff_utils import create_diff_files, get_commits_after
+from rewrite_rules import DEFAULT_ENGINE, RewriteEngine
+from sync_state import CACHE_DIR
+
+
+def test_create_diff_files_matches_git_diff(source_repo):
+    first_commit = git(source_repo, 'rev-list', '--max-parents=0', 'HEAD').strip()[:7]
+    commits = get_commits_after(str(source_repo), first_commit)
+    assert len(commits) == 5
+
+    diffs_dir, diff_files, n_generated = create_diff_files(str(source_repo), commits, jobs=2)
+
+    assert len(diff_files) == n_generated == 4
+    assert sorted(entry for entry in os.listdir(diffs_dir) if entry.endswith('.diff')) == diff_files
+    for diff_file in diff_files:
+        _, _, _, commit_1, commit_2 = diff_file[:-len('.diff')].split('_')
+        expected = DEFAULT_ENGINE.rewrite(git(source_repo, 'diff', f'{commit_1}..{commit_2}'))
+        with open(os.path.join(diffs_dir, diff_file)) as file:
+            assert file.read() == expected
+
+
+def test_create_diff_files_only_generates_new_or_invalidated_diffs(source_repo):
+    first_commit = git(source_repo, 'rev-list', '--max-parents=0', 'HEAD').strip()[:7]
+    commits = get_commits_after(str(source_repo), first_commit)
+    diffs_dir, _, _ = create_diff_files(str(source_repo), commits, jobs=1)
+
+    _, _, n_generated = create_diff_files(str(source_repo), commits, jobs=1)
+    assert n_generated == 0
+
+    (source_repo / "new.txt").write_text("new file\n")
+    git(source_repo, 'add', '.')
+    git(source_repo, 'commit', '-qm', 'add new file')
+    commits = get_commits_after(str(source_repo), first_commit)
+    _, diff_files, n_generated = create_diff_files(str(source_repo), commits, jobs=1)
+    assert len(diff_files) == 5
+    assert n_generated == 1
+
+    _, _, n_generated = create_diff_files(str(source_repo), commits, jobs=1, engine=RewriteEngine([("new", "old")]))
+    assert n_generated == 5
+    with open(os.path.join(diffs_dir, diff_files[-1])) as file:
+        assert "old file" in file.read()
+
+
+def test_create_diff_files_removes_diffs_of_previous_sync(source_repo):
+    first_commit = git(source_repo, 'rev-list', '--max-parents=0', 'HEAD').strip()[:7]
+    diffs_dir, _, _ = create_diff_files(str(source_repo), get_commits_after(str(source_repo), first_commit), jobs=1)
+
+    later_commit = git(source_repo, 'rev-parse', '--short', 'HEAD~1').strip()
+    _, diff_files, n_generated = create_diff_files(
+        str(source_repo), get_commits_after(str(source_repo), later_commit), jobs=1
+    )
+
+    assert len(diff_files) == 1
+    assert n_generated == 0  # the diff was already generated in the previous run
+    assert sorted(entry for entry in os.listdir(diffs_dir) if entry.endswith('.diff')) == diff_files
+
+
+def test_create_diff_files_prunes_cache_entries_outside_of_the_range(source_repo):
+    first_commit = git(source_repo, 'rev-list', '--max-parents=0', 'HEAD').strip()[:7]
+    diffs_dir, _, _ = create_diff_files(str(source_repo), get_commits_after(str(source_repo), first_commit), jobs=1)
+    assert len(os.listdir(os.path.join(diffs_dir, CACHE_DIR))) == 4
+
+    later_commit = git(source_repo, 'rev-parse', '--short', 'HEAD~1').strip()
+    create_diff_files(str(source_repo), get_commits_after(str(source_repo), later_commit), jobs=1)
+
+    assert len(os.listdir(os.path.join(diffs_dir, CACHE_DIR))) == 1
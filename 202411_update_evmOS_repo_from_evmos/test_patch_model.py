@@ -0,0 +1,90 @@
+import os
+
+from patch_model import Hunk, PatchIndex, parse_patch
+
+
+SAMPLE_DIFF = """\
+diff --git a/x/evm/keeper/state_transition.go b/x/evm/keeper/state_transition.go
+index 1a2b3c4..5d6e7f8 100644
+--- a/x/evm/keeper/state_transition.go
++++ b/x/evm/keeper/state_transition.go
+@@ -10,2 +10,2 @@ func (k Keeper) ApplyTransaction() {
+ context
+--- removed line, that looks like a header
++++ added line, that looks like a header
+@@ -40 +40,2 @@
+-single line
++first line
++second line
+diff --git a/old.go b/new.go
+similarity index 100%
+rename from old.go
+rename to new.go
+diff --git a/deleted.go b/deleted.go
+deleted file mode 100644
+index 1111111..0000000
+--- a/deleted.go
++++ /dev/null
+@@ -1 +0,0 @@
+-package deleted
+"""
+
+
+def test_parse_patch():
+    file_patches = parse_patch(SAMPLE_DIFF.splitlines(keepends=True))
+
+    assert [(patch.old_path, patch.new_path) for patch in file_patches] == [
+        ("x/evm/keeper/state_transition.go", "x/evm/keeper/state_transition.go"),
+        ("old.go", "new.go"),
+        ("deleted.go", None),
+    ]
+    state_transition = file_patches[0]
+    assert (state_transition.old_blob, state_transition.new_blob) == ("1a2b3c4", "5d6e7f8")
+    assert [(h.old_start, h.old_count, h.new_start, h.new_count) for h in state_transition.hunks] == [
+        (10, 2, 10, 2),
+        (40, 1, 40, 2),
+    ]
+    assert file_patches[1].hunks == []
+    assert file_patches[2].path == "deleted.go"
+
+
+def write_diff(diffs_dir, name, content):
+    with open(os.path.join(diffs_dir, name), 'w') as file:
+        file.write(content)
+
+
+def test_patch_index(tmp_path):
+    diffs_dir = str(tmp_path)
+    write_diff(diffs_dir, "001_evmos_diff_a_b.diff", SAMPLE_DIFF)
+    write_diff(diffs_dir, "002_evmos_diff_b_c.diff", SAMPLE_DIFF.split("diff --git a/old.go")[0].replace("@@ -40 +40,2 @@", "@@ -90 +90,2 @@"))
+    write_diff(diffs_dir, "003_evmos_diff_c_d.diff", "diff --git a/new.go b/new.go\n--- a/new.go\n+++ b/new.go\n@@ -1 +1 @@\n-a\n+b\n")
+
+    index = PatchIndex.load(diffs_dir)
+
+    assert index.diffs_touching("x/evm/keeper/state_transition.go") == [1, 2]
+    assert index.diffs_touching("new.go") == [1, 3]
+    assert index.overlapping_diffs(3) == {1: ["new.go"]}
+    assert index.blocked_by(1, "x/evm/keeper/state_transition.go") == [2]
+    assert index.blocked_by(1, "x/evm/keeper/state_transition.go", Hunk(40, 1, 40, 2)) == []
+
+    # The stored index is updated for changed diff files only
+    write_diff(diffs_dir, "003_evmos_diff_c_d.diff", "diff --git a/other.go b/other.go\n--- a/other.go\n+++ b/other.go\n@@ -1 +1 @@\n-a\n+b\n")
+    os.utime(os.path.join(diffs_dir, "003_evmos_diff_c_d.diff"), ns=(1, 1))
+    index = PatchIndex.load(diffs_dir)
+
+    assert index.diffs_touching("new.go") == [1]
+    assert index.diffs_touching("other.go") == [3]
+    assert index.diffs_touching("x/evm/keeper/state_transition.go") == [1, 2]
+
+
+def test_patch_index_describes_file_patches_without_hunks(tmp_path):
+    diffs_dir = str(tmp_path)
+    write_diff(diffs_dir, "001_evmos_diff_a_b.diff", "diff --git a/old.go b/new.go\nsimilarity index 100%\nrename from old.go\nrename to new.go\n")
+    write_diff(diffs_dir, "002_evmos_diff_b_c.diff", "diff --git a/new.go b/new.go\n--- a/new.go\n+++ b/new.go\n@@ -1 +1 @@\n-a\n+b\n")
+
+    index = PatchIndex.load(diffs_dir)
+
+    assert [index.describe(entry) for entry in index.hunks_touching("new.go")] == [
+        "001  (no content changes, e.g. a rename, mode change or binary file)",
+        "002  @@ -1,1 +1,1 @@",
+    ]
@@ -0,0 +1,59 @@
+import re
+
+from diff_utils import replace_evmos_with_evmOS
+from rewrite_rules import CODE_RULES, DEFAULT_ENGINE, PATH_RULES, RewriteEngine
+
+
+SAMPLE_DIFF = """\
+diff --git a/app/ante/evm/mono.go b/app/ante/evm/mono.go
+index 1a2b3c4..5d6e7f8 100644
+--- a/app/ante/evm/mono.go
++++ b/app/ante/evm/mono.go
+@@ -1,7 +1,7 @@
+ import (
+-\tevmante "github.com/evmos/evmos/v20/app/ante/evm"
++\tevmante "github.com/evmos/evmos/v20/app/ante/evm/interfaces.go"
+ \t"github.com/evmos/evmos/v20/app/ante/evm/09_gas_consume.go"
+ \t"github.com/evmos/evmos/v20/app/ante/cosmos/min_price.go"
+ )
+ \tapp.EvmKeeper.GetParams(ctx)
+ \taddr := erc20types.WEVMOSContractMainnet
+ \tthis line does not match any rule
+"""
+
+
+def legacy_rewrite(content):
+    """Reference implementation, that runs the rules one after another over the full text."""
+    for pattern, replacement in PATH_RULES + CODE_RULES:
+        content = re.sub(pattern, replacement, content)
+    return content
+
+
+def test_rewrite_matches_sequential_rules():
+    assert DEFAULT_ENGINE.rewrite(SAMPLE_DIFF) == legacy_rewrite(SAMPLE_DIFF)
+
+
+def test_rewrite_chained_ante_rules():
+    rewritten = DEFAULT_ENGINE.rewrite(SAMPLE_DIFF)
+    assert "diff --git a/ante/evm/mono_decorator.go b/ante/evm/mono_decorator.go" in rewritten
+    assert '"github.com/evmos/os/ante/interfaces/evm.go"' in rewritten
+    assert '"github.com/evmos/os/ante/evm/08_gas_consume.go"' in rewritten
+    assert '"github.com/evmos/os/ante/cosmos/min_gas_price.go"' in rewritten
+    assert "app.EVMKeeper" in rewritten
+    assert "testconstants.WEVMOSContractMainnet" in rewritten
+
+
+def test_rewrite_passes_through_unmatched_lines():
+    engine = RewriteEngine([(r"foo", "bar")])
+    assert engine.rewrite_line("nothing to see\n") == "nothing to see\n"
+    assert engine.rewrite_line("foo foo\n") == "bar bar\n"
+
+
+def test_replace_evmos_with_evmOS(tmp_path):
+    diff_file = tmp_path / "001_evmos_diff_a_b.diff"
+    diff_file.write_text(SAMPLE_DIFF)
+
+    replace_evmos_with_evmOS(str(diff_file))
+
+    assert diff_file.read_text() == legacy_rewrite(SAMPLE_DIFF)
+    assert [entry.name for entry in tmp_path.iterdir()] == [diff_file.name]
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from conftest import create_repo, git
+from diff_utils import create_diff_files, get_commits_after
+from three_way import BLOB_INDEX_FILE, apply_with_three_way_fallback
+
+
+LINES = [f"line {i}\n" for i in range(1, 11)]
+
+
+@pytest.fixture
+def diffs_dir(tmp_path):
+    source_repo = create_repo(tmp_path / "evmos", "".join(LINES))
+    (source_repo / "notes.txt").write_text("".join(LINES).replace("line 5\n", "changed line 5\n"))
+    git(source_repo, 'commit', '-qam', 'change line 5')
+
+    first_commit = git(source_repo, 'rev-list', '--max-parents=0', 'HEAD').strip()[:7]
+    diffs_dir, diff_files, _ = create_diff_files(str(source_repo), get_commits_after(str(source_repo), first_commit), jobs=1)
+
+    return source_repo, diffs_dir, diff_files[0]
+
+
+def test_apply_with_three_way_fallback_merges_changed_context(tmp_path, diffs_dir):
+    source_repo, diffs_dir, diff_file = diffs_dir
+    target_dir = create_repo(tmp_path / "os", "".join(LINES).replace("line 7\n", "local line 7\n"))
+
+    report = apply_with_three_way_fallback(str(source_repo), diffs_dir, diff_file, str(target_dir))
+
+    assert report == {"notes.txt": {"status": "merged", "applied": 0, "merged": 1, "rejected": 0}}
+    assert (target_dir / "notes.txt").read_text() == "".join(LINES).replace("line 5\n", "changed line 5\n").replace("line 7\n", "local line 7\n")
+    with open(f"{diffs_dir}/{BLOB_INDEX_FILE}") as file:
+        assert len(json.load(file)["blobs"]) == 1
+
+
+def test_apply_with_three_way_fallback_rejects_conflicts(tmp_path, diffs_dir):
+    source_repo, diffs_dir, diff_file = diffs_dir
+    target_dir = create_repo(tmp_path / "os", "".join(LINES).replace("line 5\n", "local line 5\n"))
+
+    report = apply_with_three_way_fallback(str(source_repo), diffs_dir, diff_file, str(target_dir))
+
+    assert report == {"notes.txt": {"status": "rejected", "applied": 0, "merged": 0, "rejected": 1, "blocks": []}}
+    assert (target_dir / "notes.txt.rej").exists()
@@ -0,0 +1,54 @@
+import json
+import sys
+import time
+
+import tracing
+from conftest import git
+from git_utils import stream_commit_pair_diffs
+
+
+def test_span_name():
+    assert tracing.span_name(['git', '-C', '/path/to/repo', 'diff-tree', '--stdin']) == 'git diff-tree'
+    assert tracing.span_name(['git', '--no-pager', 'show', '--quiet']) == 'git show'
+    assert tracing.span_name(['go', 'mod', 'tidy']) == 'go mod'
+
+
+def test_run_records_spans(tmp_path, capsys):
+    tracing.enable()
+    try:
+        tracing.run([sys.executable, '-c', 'print("hello")'], input="abc", capture_output=True, text=True)
+        with tracing.span("rewrite", bytes_in=10) as args:
+            args["bytes_out"] = 20
+
+        tracing.write_trace(tmp_path / "trace.json")
+        tracing.print_summary()
+    finally:
+        spans = tracing.take_spans()
+        tracing._spans = None
+
+    assert [(span["args"]["bytes_in"], span["args"]["bytes_out"]) for span in spans] == [(3, 6), (10, 20)]
+    assert spans[1]["name"] == "rewrite"
+    with open(tmp_path / "trace.json") as file:
+        assert len(json.load(file)["traceEvents"]) == 2
+    assert "rewrite" in capsys.readouterr().out
+
+
+def test_byte_length_counts_encoded_bytes():
+    assert tracing.byte_length("ä") == 2
+    assert tracing.byte_length(b"\xc3\xa4") == 2
+    assert tracing.byte_length(None) == 0
+
+
+def test_diff_tree_span_excludes_consumer_time(source_repo):
+    commits = git(source_repo, 'rev-list', '--reverse', 'HEAD').split()
+    tracing.enable()
+    try:
+        for _ in stream_commit_pair_diffs(str(source_repo), list(zip(commits, commits[1:]))):
+            time.sleep(0.1)
+    finally:
+        spans = tracing.take_spans()
+        tracing._spans = None
+
+    diff_tree_span = next(span for span in spans if span["name"] == "git diff-tree")
+    assert diff_tree_span["dur"] < 0.3 * 1e6
+    assert diff_tree_span["args"]["bytes_out"] > 0
@@ -0,0 +1,192 @@
+"""
+This module contains the three-way fallback for applying diffs.
+
+If a file patch does not apply cleanly, the pre-image of the file is taken from the Evmos repository,
+rewritten with the same rules as the diffs and merged with the current file in the evmOS repository.
+Only if this merge has conflicts, the patch is applied with `git apply --reject`.
+
+The pre-image blobs are looked up through an index of the blob ids referenced in the diff series,
+which is stored next to the diffs and resolved with a single git call for all new diffs.
+"""
+
+import json
+import os
+import re
+import tempfile
+
+import tracing
+from git_utils import resolve_object_names
+from patch_model import PatchIndex, diff_number, parse_patch
+from rewrite_rules import DEFAULT_ENGINE
+
+
+BLOB_INDEX_FILE = 'blob_index.json'
+NULL_BLOB = re.compile(r"^0+$")
+
+
+class BlobIndex:
+    """Maps the abbreviated pre-image blob ids in the diffs to the full blob ids in the Evmos repository."""
+
+    def __init__(self, blobs=None, diff_files=None):
+        self.blobs = blobs or {}
+        self.diff_files = set(diff_files or [])
+
+    @classmethod
+    def load(cls, source_repo, diffs_dir):
+        index = cls()
+        index_file_path = os.path.join(diffs_dir, BLOB_INDEX_FILE)
+        if os.path.exists(index_file_path):
+            with open(index_file_path, 'r') as file:
+                stored = json.load(file)
+            index = cls(stored["blobs"], stored["diff_files"])
+
+        if index.update(source_repo, diffs_dir):
+            index.save(diffs_dir)
+
+        return index
+
+    def save(self, diffs_dir):
+        index_file_path = os.path.join(diffs_dir, BLOB_INDEX_FILE)
+        tmp_file_path = index_file_path + '.tmp'
+        with open(tmp_file_path, 'w') as file:
+            json.dump({"blobs": self.blobs, "diff_files": sorted(self.diff_files)}, file)
+
+        os.replace(tmp_file_path, index_file_path)
+
+    def update(self, source_repo, diffs_dir):
+        """Adds the blob ids of all diff files, that are not in the index yet, and returns if anything changed."""
+        # NOTE: the blob ids in a diff file only depend on the commit pair in its name,
+        # so the files that are already indexed don't have to be parsed again.
+        new_diff_files = [
+            entry for entry in os.listdir(diffs_dir)
+            if diff_number(entry) is not None and entry not in self.diff_files
+        ]
+        if not new_diff_files:
+            return False
+
+        abbreviations = set()
+        for diff_file in new_diff_files:
+            with open(os.path.join(diffs_dir, diff_file), 'r', errors='surrogateescape') as file:
+                for file_patch in parse_patch(file):
+                    if file_patch.old_blob and not NULL_BLOB.match(file_patch.old_blob):
+                        abbreviations.add(file_patch.old_blob)
+
+        abbreviations -= set(self.blobs)
+        if abbreviations:
+            self.blobs.update(resolve_object_names(source_repo, abbreviations))
+
+        self.diff_files.update(new_diff_files)
+        return True
+
+    def resolve(self, abbreviation):
+        return self.blobs.get(abbreviation)
+
+
+def apply_with_three_way_fallback(source_repo, diffs_dir, diff_file, target_dir, blob_index=None, engine=DEFAULT_ENGINE):
+    """
+    Applies the given diff file file by file, falling back to a three-way merge
+    and afterwards to `git apply --reject` for the files, that do not apply cleanly.
+
+    Returns a report with the number of applied, merged and rejected hunks per file.
+    """
+    blob_index = blob_index or BlobIndex.load(source_repo, diffs_dir)
+    with open(os.path.join(diffs_dir, diff_file), 'r', errors='surrogateescape') as file:
+        lines = file.readlines()
+
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for i, file_patch in enumerate(parse_patch(lines)):
+            patch_file_path = os.path.join(tmp_dir, f"{i}.diff")
+            with open(patch_file_path, 'w', errors='surrogateescape') as file:
+                file.writelines(lines[file_patch.start:file_patch.end])
+
+            n_hunks = len(file_patch.hunks)
+            if run_git_apply(target_dir, [patch_file_path]).returncode == 0:
+                result = {"status": "applied", "applied": n_hunks, "merged": 0, "rejected": 0}
+            elif merge_file_patch(source_repo, file_patch, patch_file_path, target_dir, blob_index, engine, tmp_dir):
+                result = {"status": "merged", "applied": 0, "merged": n_hunks, "rejected": 0}
+            else:
+                result = apply_with_rejects(target_dir, patch_file_path, n_hunks)
+
+            report[file_patch.path] = result
+
+    number = diff_number(diff_file)
+    patch_index = PatchIndex.load(diffs_dir)
+    for path, result in report.items():
+        if result["rejected"]:
+            result["blocks"] = patch_index.blocked_by(number, path)
+
+    return report
+
+
+def run_git_apply(cwd, args):
+    # NOTE: setting the ceiling directory prevents git from treating the temporary directory
+    # as part of a surrounding repository, when applying patches outside the target repository.
+    env = dict(os.environ, GIT_CEILING_DIRECTORIES=os.path.dirname(os.path.abspath(cwd)))
+    return tracing.run(['git', 'apply', *args], cwd=cwd, capture_output=True, text=True, env=env)
+
+
+def merge_file_patch(source_repo, file_patch, patch_file_path, target_dir, blob_index, engine, tmp_dir):
+    """
+    Merges the changes of the file patch into the target file, using the rewritten pre-image
+    from the Evmos repository as the merge base.
+
+    Returns if the merge was clean, in which case the result is written to the target file.
+    """
+    if not (file_patch.old_path and file_patch.new_path and file_patch.hunks and file_patch.old_blob):
+        return False
+
+    blob = blob_index.resolve(file_patch.old_blob)
+    ours_path = os.path.join(target_dir, file_patch.old_path)
+    if not blob or not os.path.isfile(ours_path):
+        return False
+
+    base = tracing.run(
+        ['git', 'cat-file', 'blob', blob],
+        cwd=source_repo,
+        capture_output=True,
+        check=True
+    ).stdout.decode('utf-8', errors='surrogateescape')
+    with tracing.span("rewrite", bytes_in=tracing.byte_length(base)) as args:
+        base = engine.rewrite(base)
+        args["bytes_out"] = tracing.byte_length(base)
+
+    # NOTE: the base is written twice, because applying the patch to one copy creates "their" version of the file
+    merge_dir = os.path.join(tmp_dir, f"merge_{os.path.basename(patch_file_path)}")
+    base_path = os.path.join(tmp_dir, f"base_{os.path.basename(patch_file_path)}")
+    for path in (os.path.join(merge_dir, file_patch.old_path), base_path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', errors='surrogateescape', newline='') as file:
+            file.write(base)
+
+    if run_git_apply(merge_dir, [patch_file_path]).returncode != 0:
+        return False
+
+    theirs_path = os.path.join(merge_dir, file_patch.new_path)
+    merge = tracing.run(
+        ['git', 'merge-file', '-p', ours_path, base_path, theirs_path],
+        capture_output=True
+    )
+    if merge.returncode != 0:
+        return False
+
+    new_path = os.path.join(target_dir, file_patch.new_path)
+    os.makedirs(os.path.dirname(new_path), exist_ok=True)
+    with open(new_path, 'wb') as file:
+        file.write(merge.stdout)
+    if new_path != ours_path:
+        os.remove(ours_path)
+
+    return True
+
+
+def apply_with_rejects(target_dir, patch_file_path, n_hunks):
+    result = run_git_apply(target_dir, ['--reject', patch_file_path])
+    applied = len(re.findall(r"^Hunk #\d+ applied cleanly\.", result.stderr, re.MULTILINE))
+    rejected = len(re.findall(r"^Rejected hunk #\d+\.", result.stderr, re.MULTILINE))
+
+    # NOTE: if the patch cannot be applied at all (e.g. the file does not exist), git does not list the hunks
+    if result.returncode != 0 and applied == rejected == 0:
+        return {"status": "rejected", "applied": 0, "merged": 0, "rejected": n_hunks, "error": result.stderr.strip()}
+
+    return {"status": "rejected" if rejected else "applied", "applied": applied, "merged": 0, "rejected": rejected}
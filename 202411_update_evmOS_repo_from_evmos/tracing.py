@@ -0,0 +1,129 @@
+"""
+This module contains the optional timing instrumentation of the sync tool.
+
+When enabled, a span is recorded for each subprocess and rewrite pass with its wall time
+and the number of bytes going in and out. The spans can be written as a Chrome trace file
+(which can be opened in chrome://tracing or https://ui.perfetto.dev) and summarized at the end of a run.
+"""
+
+import json
+import os
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+
+
+_spans = None
+
+
+def enable():
+    """Enables recording spans in the current process, discarding all previously recorded spans."""
+    global _spans
+    _spans = []
+
+
+def is_enabled():
+    return _spans is not None
+
+
+def take_spans():
+    """Returns the spans recorded so far and clears them, e.g. to pass them from a worker process to the main process."""
+    global _spans
+    spans = _spans or []
+    if _spans is not None:
+        _spans = []
+
+    return spans
+
+
+def add_spans(spans):
+    if _spans is not None and spans:
+        _spans.extend(spans)
+
+
+def byte_length(value):
+    """Returns the length of the given output in bytes, also for text, that was decoded from it."""
+    if isinstance(value, str):
+        return len(value.encode('utf-8', errors='surrogateescape'))
+
+    return len(value or b"")
+
+
+def add_span(name, start_time, duration, **args):
+    """Records a span with the given start (as a wall clock time) and duration in seconds."""
+    if _spans is None:
+        return
+
+    _spans.append({
+        "name": name,
+        "ts": start_time * 1e6,
+        "dur": duration * 1e6,
+        "pid": os.getpid(),
+        "tid": threading.get_ident(),
+        "args": args,
+    })
+
+
+@contextmanager
+def span(name, **args):
+    """
+    Records the wall time of the wrapped block.
+    The yielded dictionary can be used to add further information, e.g. the number of output bytes.
+    """
+    if _spans is None:
+        yield {}
+        return
+
+    start_time = time.time()
+    start = time.perf_counter()
+    try:
+        yield args
+    finally:
+        add_span(name, start_time, time.perf_counter() - start, **args)
+
+
+def run(command, **kwargs):
+    """Runs `subprocess.run` with the given arguments and records a span for it."""
+    words = command.split() if isinstance(command, str) else list(command)
+    with span(span_name(words), command=" ".join(words)) as args:
+        result = subprocess.run(command, **kwargs)
+        args["bytes_in"] = byte_length(kwargs.get("input"))
+        args["bytes_out"] = byte_length(result.stdout) + byte_length(result.stderr)
+        args["returncode"] = result.returncode
+
+    return result
+
+
+def span_name(words):
+    """Returns the program and its subcommand as the name of the span, e.g. `git diff-tree` or `go mod`."""
+    program, *rest = words
+    if rest[:1] == ["-C"]:
+        rest = rest[2:]
+
+    subcommand = next((word for word in rest if not word.startswith('-')), "")
+    return f"{program} {subcommand}".strip()
+
+
+def write_trace(trace_path):
+    events = [{"cat": "sync", "ph": "X", **recorded} for recorded in _spans or []]
+    with open(trace_path, 'w') as file:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+
+def print_summary(top_n=10):
+    totals = {}
+    for recorded in _spans or []:
+        total = totals.setdefault(recorded["name"], {"count": 0, "dur": 0.0, "bytes_in": 0, "bytes_out": 0})
+        total["count"] += 1
+        total["dur"] += recorded["dur"]
+        total["bytes_in"] += recorded["args"].get("bytes_in", 0)
+        total["bytes_out"] += recorded["args"].get("bytes_out", 0)
+
+    print(f"\nTop {top_n} spans by total wall time:")
+    print(f"{'Span':<24} {'Count':>7} {'Total (s)':>10} {'Mean (ms)':>10} {'Bytes in':>12} {'Bytes out':>12}")
+    for name, total in sorted(totals.items(), key=lambda item: item[1]["dur"], reverse=True)[:top_n]:
+        print(
+            f"{name:<24} {total['count']:>7} {total['dur'] / 1e6:>10.3f} {total['dur'] / total['count'] / 1e3:>10.2f} "
+            f"{total['bytes_in']:>12} {total['bytes_out']:>12}"
+        )
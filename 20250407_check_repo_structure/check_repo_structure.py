@@ -1,10 +1,24 @@
 #!/usr/bin/env python3
 
+import argparse
+import csv
+import json
 import os
 import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from pathlib import Path
-from typing import Dict, List
-from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from dataclasses import asdict, dataclass, field
+
+from workflow_analysis import WorkflowAnalyzer, git_blob_hash
+
+
+README_NAMES = {"readme.md"}
+CHANGELOG_NAMES = {"changelog.md", "changes.md", "history.md"}
+WORKFLOW_SUFFIXES = (".yml", ".yaml")
+EXCLUDED_REPOS = {"evmos"}
+# Cached results are discarded, whenever the checked file names or the cached fields change
+CACHE_SETTINGS = [2, sorted(README_NAMES), sorted(CHANGELOG_NAMES), list(WORKFLOW_SUFFIXES)]
 
 
 @dataclass
@@ -14,6 +28,8 @@ class RepoStatus:
     has_changelog: bool
     has_github_actions: bool
     github_actions: List[str]
+    # Workflow file name -> git blob hash of its content
+    workflow_blobs: Dict[str, str] = field(default_factory=dict)
 
     @property
     def status_summary(self) -> Dict[str, bool]:
@@ -24,28 +40,261 @@ class RepoStatus:
         }
 
 
-def check_repository(repo_path: Path) -> RepoStatus:
+def check_repository(repo_path: Path, name: Optional[str] = None) -> RepoStatus:
     """Check a repository for required files and structures."""
-    name = repo_path.name
-
-    # Check for README (case insensitive)
-    has_readme = any(f.lower() == "readme.md" for f in os.listdir(repo_path))
+    name = name or repo_path.name
 
-    # Check for Changelog (various common names)
-    changelog_names = {"changelog.md", "changes.md", "history.md"}
-    has_changelog = any(
-        f.lower() in changelog_names for f in os.listdir(repo_path)
-    )
+    # A single pass over the top-level entries finds the README, the changelog and the .github directory
+    has_readme = False
+    has_changelog = False
+    has_github_dir = False
+    with os.scandir(repo_path) as entries:
+        for entry in entries:
+            lower_name = entry.name.lower()
+            has_readme = has_readme or lower_name in README_NAMES
+            has_changelog = has_changelog or lower_name in CHANGELOG_NAMES
+            has_github_dir = has_github_dir or (entry.name == ".github" and entry.is_dir())
 
     # Check for GitHub Actions
-    github_actions_path = repo_path / ".github" / "workflows"
-    github_actions = []
-    if github_actions_path.exists():
-        for workflow in github_actions_path.glob("*.yml"):
-            github_actions.append(workflow.stem)
+    workflow_blobs = {}
+    if has_github_dir:
+        try:
+            with os.scandir(repo_path / ".github" / "workflows") as entries:
+                for entry in entries:
+                    if entry.name.endswith(WORKFLOW_SUFFIXES) and entry.is_file():
+                        with open(entry.path, "rb") as f:
+                            workflow_blobs[entry.name] = git_blob_hash(f.read())
+        except (FileNotFoundError, NotADirectoryError):
+            pass
+    github_actions = sorted(os.path.splitext(file_name)[0] for file_name in workflow_blobs)
     has_github_actions = len(github_actions) > 0
 
-    return RepoStatus(name, has_readme, has_changelog, has_github_actions, github_actions)
+    return RepoStatus(name, has_readme, has_changelog, has_github_actions, github_actions, workflow_blobs)
+
+
+def find_repositories(base_path: Path, depth: int = 1,
+                      errors: Optional[List[Tuple[Path, OSError]]] = None) -> Iterator[Path]:
+    """
+    Find the git repositories up to the given number of directory levels below the base path.
+    The directories of a repository are not searched for further repositories.
+    If a list of errors is given, directories that can't be read are added to it and skipped.
+    """
+    try:
+        with os.scandir(base_path) as entries:
+            directories = [entry for entry in entries if entry.is_dir()]
+    except OSError as e:
+        if errors is None:
+            raise
+        errors.append((base_path, e))
+        return
+
+    for entry in directories:
+        path = Path(entry.path)
+        if entry.name.lower() in EXCLUDED_REPOS:
+            continue
+        if os.path.exists(os.path.join(entry.path, ".git")):
+            yield path
+        elif depth > 1 and not entry.name.startswith("."):
+            yield from find_repositories(path, depth - 1, errors)
+
+
+def resolve_git_dir(repo_path: Path) -> Optional[str]:
+    """Return the git directory of a repository, following the `gitdir:` file of worktrees and submodules."""
+    git_path = os.path.join(repo_path, ".git")
+    if os.path.isdir(git_path):
+        return git_path
+
+    try:
+        with open(git_path, "r") as f:
+            content = f.read().strip()
+    except OSError:
+        return None
+
+    if not content.startswith("gitdir:"):
+        return None
+    return os.path.normpath(os.path.join(repo_path, content[len("gitdir:"):].strip()))
+
+
+def read_git_head(repo_path: Path) -> Optional[str]:
+    """
+    Return the commit of the repository's HEAD by reading the git files directly,
+    which is much cheaper than starting a git process for each repository.
+    """
+    git_dir = resolve_git_dir(repo_path)
+    if git_dir is None:
+        return None
+
+    try:
+        with open(os.path.join(git_dir, "HEAD"), "r") as f:
+            head = f.read().strip()
+    except OSError:
+        return None
+
+    if not head.startswith("ref:"):
+        # Detached HEAD
+        return head
+
+    ref = head[len("ref:"):].strip()
+    # Worktrees store their branches in the common git directory of the main repository
+    common_dir = git_dir
+    try:
+        with open(os.path.join(git_dir, "commondir"), "r") as f:
+            common_dir = os.path.normpath(os.path.join(git_dir, f.read().strip()))
+    except OSError:
+        pass
+
+    try:
+        with open(os.path.join(common_dir, ref), "r") as f:
+            return f.read().strip()
+    except OSError:
+        pass
+
+    # Refs, that were not updated since the last `git gc`, are only stored in the packed refs
+    try:
+        with open(os.path.join(common_dir, "packed-refs"), "r") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2 and parts[1] == ref:
+                    return parts[0]
+    except OSError:
+        pass
+
+    # The branch has no commits yet
+    return ref
+
+
+def fingerprint_repository(repo_path: Path) -> Dict:
+    """
+    Return the values, that change whenever the result of `check_repository` can change:
+    the git HEAD, the modification times of the directories, whose entries are checked,
+    and the modification time and size of each workflow file, because their contents are hashed.
+    """
+    mtimes = []
+    for path in (repo_path, repo_path / ".github", repo_path / ".github" / "workflows"):
+        try:
+            mtimes.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            mtimes.append(None)
+
+    # NOTE: editing a file in place doesn't change the modification time of its directory
+    workflows = []
+    try:
+        with os.scandir(repo_path / ".github" / "workflows") as entries:
+            for entry in entries:
+                if entry.name.endswith(WORKFLOW_SUFFIXES) and entry.is_file():
+                    stat = entry.stat()
+                    workflows.append([entry.name, stat.st_mtime_ns, stat.st_size])
+    except OSError:
+        pass
+
+    return {"head": read_git_head(repo_path), "mtimes": mtimes, "workflows": sorted(workflows)}
+
+
+def check_repository_cached(repo_path: Path, name: str, cached: Optional[Dict]) -> Tuple[RepoStatus, Dict]:
+    """Check a repository, unless its fingerprint matches the cached one, and return the result with its cache entry."""
+    fingerprint = fingerprint_repository(repo_path)
+    if cached is not None and cached["fingerprint"] == fingerprint:
+        status = RepoStatus(**dict(cached["status"], name=name))
+    else:
+        status = check_repository(repo_path, name)
+
+    return status, {"fingerprint": fingerprint, "status": asdict(status)}
+
+
+def scan_repositories(
+    base_path: Path, repo_paths: Iterable[Path], jobs: int, cache: Optional[Dict] = None
+) -> Iterator[Tuple[Path, Optional[RepoStatus], Optional[Dict], Optional[OSError]]]:
+    """
+    Check the repositories in a thread pool, while they are found, and yield their results as they complete.
+    If a cache is given, only the repositories, that changed since they were cached, are checked again,
+    and the new cache entry of each repository is yielded alongside its result.
+    Repositories, that could not be read, are yielded with the error instead of a result.
+    """
+    def collect(futures):
+        for future in futures:
+            repo_path = pending.pop(future)
+            try:
+                result = future.result()
+            except OSError as e:
+                yield repo_path, None, None, e
+                continue
+
+            if cache is None:
+                yield repo_path, result, None, None
+            else:
+                yield repo_path, *result, None
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        pending = {}
+        for repo_path in repo_paths:
+            name = repo_path.relative_to(base_path).as_posix()
+            if cache is None:
+                future = executor.submit(check_repository, repo_path, name)
+            else:
+                future = executor.submit(check_repository_cached, repo_path, name, cache.get(str(repo_path)))
+            pending[future] = repo_path
+
+            # The results are yielded while the walk goes on, which waits, if enough checks are queued
+            if len(pending) >= 2 * jobs:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                yield from collect(done)
+
+        yield from collect(as_completed(list(pending)))
+
+
+def load_cache(cache_path: Optional[str]) -> Tuple[Optional[Dict], Dict]:
+    """Return the cached repository results and workflow analyses, which are empty if the cache can't be read."""
+    if cache_path is None:
+        return None, {}
+    if not os.path.exists(cache_path):
+        return {}, {}
+
+    try:
+        with open(cache_path, "r") as f:
+            cache = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: ignoring the unreadable cache {cache_path}: {e}", file=sys.stderr)
+        return {}, {}
+    if not isinstance(cache, dict):
+        return {}, {}
+
+    workflows = cache.get("workflows", {})
+    if cache.get("settings") != CACHE_SETTINGS:
+        return {}, workflows
+
+    return cache.get("repos", {}), workflows
+
+
+def save_cache(cache_path: str, repos: Dict, workflows: Optional[Dict] = None):
+    tmp_cache_path = cache_path + ".tmp"
+    with open(tmp_cache_path, "w") as f:
+        json.dump({"settings": CACHE_SETTINGS, "repos": repos, "workflows": workflows or {}}, f)
+
+    os.replace(tmp_cache_path, cache_path)
+
+
+def write_json(repos: List[RepoStatus], path: str, analyzer: Optional[WorkflowAnalyzer] = None):
+    results = []
+    for repo in repos:
+        result = asdict(repo)
+        if analyzer is not None:
+            result["workflow_analysis"] = {
+                file_name: asdict(analyzer.get(blob)) for file_name, blob in repo.workflow_blobs.items()
+            }
+        results.append(result)
+
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+def write_csv(repos: List[RepoStatus], path: str):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["repository", "readme", "changelog", "github_actions", "workflows"])
+        for repo in repos:
+            writer.writerow([
+                repo.name, repo.has_readme, repo.has_changelog, repo.has_github_actions, ";".join(repo.github_actions)
+            ])
 
 
 def print_markdown_table(headers: List[str], rows: List[List[str]], title: str = None) -> None:
@@ -99,11 +348,13 @@ def print_results(repos: List[RepoStatus]):
         ))
 
         if all_workflows:
+            # Set lookups keep the matrix linear in its size for thousands of repositories and workflows
+            repo_workflows = [set(repo.github_actions) for repo in repos]
             headers = ["Workflow"] + [repo.name for repo in repos]
             rows = [
                 [workflow] + [
-                    "✅" if workflow in repo.github_actions else "❌"
-                    for repo in repos
+                    "✅" if workflow in workflows else "❌"
+                    for workflows in repo_workflows
                 ]
                 for workflow in all_workflows
             ]
@@ -113,27 +364,129 @@ def print_results(repos: List[RepoStatus]):
         print("\nNo GitHub Actions found in any repository.")
 
 
+def print_workflow_analysis(repos: List[RepoStatus], analyzer: WorkflowAnalyzer):
+    """Print the triggers and jobs of each unique workflow and the versions of the used actions."""
+    # Repositories with identical workflow files share one row
+    repos_per_blob: Dict[Tuple[str, str], List[str]] = {}
+    for repo in repos:
+        for file_name, blob in repo.workflow_blobs.items():
+            repos_per_blob.setdefault((os.path.splitext(file_name)[0], blob), []).append(repo.name)
+
+    if not repos_per_blob:
+        return
+
+    headers = ["Workflow", "Blob", "Repositories", "Triggers", "Jobs"]
+    rows = []
+    for (workflow, blob), repo_names in sorted(repos_per_blob.items()):
+        info = analyzer.get(blob)
+        rows.append([
+            workflow,
+            blob[:8],
+            str(len(repo_names)),
+            f"error: {info.error}" if info.error else ", ".join(info.triggers),
+            ", ".join(info.jobs),
+        ])
+    print_markdown_table(headers, rows, "GitHub Workflow Contents")
+
+    # Count each action version once per repository
+    repos_per_action: Dict[Tuple[str, str], set] = {}
+    for (_, blob), repo_names in repos_per_blob.items():
+        for action in analyzer.get(blob).actions:
+            name, _, version = action.partition("@")
+            repos_per_action.setdefault((name, version), set()).update(repo_names)
+
+    if repos_per_action:
+        headers = ["Action", "Version", "Repositories"]
+        rows = [
+            [name, version or "-", str(len(repo_names))]
+            for (name, version), repo_names in sorted(repos_per_action.items())
+        ]
+        print_markdown_table(headers, rows, "GitHub Action Versions")
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python check_repo_structure.py <directory_path>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Check the structure of all git repositories in a directory")
+    parser.add_argument("directory", help="Directory containing the repositories")
+    parser.add_argument("-j", "--jobs", type=positive_int, default=32,
+                        help="Number of repositories to check in parallel (default: 32)")
+    parser.add_argument("-d", "--depth", type=positive_int, default=1,
+                        help="Number of directory levels to search for repositories (default: 1)")
+    parser.add_argument("--cache", help="File to store the results in, to only check changed repositories in later runs")
+    parser.add_argument("--json", help="Also write the results to the given JSON file")
+    parser.add_argument("--csv", help="Also write the results to the given CSV file")
+    parser.add_argument("--analyze-workflows", action="store_true",
+                        help="Analyze the triggers, jobs and action versions of the workflows (requires PyYAML)")
+    args = parser.parse_args()
 
-    base_path = Path(sys.argv[1]).resolve()
+    base_path = Path(args.directory).resolve()
     if not base_path.exists() or not base_path.is_dir():
         print(f"Error: {base_path} is not a valid directory")
         sys.exit(1)
+    if args.analyze_workflows:
+        try:
+            import yaml  # noqa: F401
+        except ImportError:
+            print("Error: --analyze-workflows requires PyYAML (pip install pyyaml)", file=sys.stderr)
+            sys.exit(1)
 
     # Get all subdirectories that are git repositories (excluding evmos)
+    cache, workflow_cache = load_cache(args.cache)
+    new_cache = {}
     repos = []
-    for item in base_path.iterdir():
-        if item.is_dir() and (item / ".git").exists() and item.name.lower() != "evmos":
-            repos.append(check_repository(item))
+    scan_errors = []
+    show_progress = sys.stderr.isatty()
+    repo_paths = find_repositories(base_path, args.depth, scan_errors)
+    for repo_path, repo, cache_entry, error in scan_repositories(base_path, repo_paths, args.jobs, cache):
+        if error is not None:
+            scan_errors.append((repo_path, error))
+            continue
+
+        repos.append(repo)
+        if cache_entry is not None:
+            new_cache[str(repo_path)] = cache_entry
+        if show_progress:
+            print(f"\rChecked {len(repos)} repositories", end="", file=sys.stderr)
+    if show_progress:
+        print(file=sys.stderr)
+    # NOTE: an unreadable repository or directory is reported, but doesn't abort the scan of all others
+    errors = [(path.relative_to(base_path).as_posix(), error) for path, error in scan_errors]
+    for name, error in sorted(errors, key=lambda item: item[0]):
+        print(f"Error: could not check {name}: {error}", file=sys.stderr)
+
+    analyzer = None
+    if args.analyze_workflows:
+        analyzer = WorkflowAnalyzer(workflow_cache)
+        analyzer.analyze(
+            (blob, base_path / repo.name / ".github" / "workflows" / file_name)
+            for repo in repos
+            for file_name, blob in repo.workflow_blobs.items()
+        )
+        workflow_cache = analyzer.to_cache(blob for repo in repos for blob in repo.workflow_blobs.values())
+
+    if args.cache:
+        save_cache(args.cache, new_cache, workflow_cache)
+
+    repos.sort(key=lambda repo: repo.name)
+    # NOTE: the output files are written even without any repositories, so that they never contain stale results
+    if args.json:
+        write_json(repos, args.json, analyzer)
+    if args.csv:
+        write_csv(repos, args.csv)
 
     if not repos:
         print("No Git repositories found in the specified directory.")
         sys.exit(0)
 
     print_results(repos)
+    if analyzer is not None:
+        print_workflow_analysis(repos, analyzer)
 
 
 if __name__ == "__main__":
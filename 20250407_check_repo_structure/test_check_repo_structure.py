@@ -0,0 +1,254 @@
+"""
+Tests for finding and checking the repositories, which run on temporary directory trees.
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+import check_repo_structure as crs
+
+
+def make_repo(path: Path, *files: str) -> Path:
+    (path / ".git").mkdir(parents=True)
+    for file_name in files:
+        (path / file_name).parent.mkdir(parents=True, exist_ok=True)
+        (path / file_name).write_text("content\n")
+    return path
+
+
+def test_find_repositories_searches_up_to_the_depth(tmp_path):
+    make_repo(tmp_path / "top")
+    make_repo(tmp_path / "group" / "nested")
+    make_repo(tmp_path / "group" / "deeper" / "repo")
+    # Repositories are not searched for further repositories, and hidden directories are skipped below the top
+    make_repo(tmp_path / "top" / "vendor" / "inner")
+    make_repo(tmp_path / ".hidden" / "repo")
+
+    def found(depth):
+        return sorted(path.relative_to(tmp_path).as_posix() for path in crs.find_repositories(tmp_path, depth))
+
+    assert found(1) == ["top"]
+    assert found(2) == ["group/nested", "top"]
+    assert found(3) == ["group/deeper/repo", "group/nested", "top"]
+
+
+def test_find_repositories_skips_excluded_repositories(tmp_path):
+    make_repo(tmp_path / "evmos")
+    make_repo(tmp_path / "Evmos-fork")
+    make_repo(tmp_path / "group" / "EVMOS")
+
+    assert sorted(path.name for path in crs.find_repositories(tmp_path, 2)) == ["Evmos-fork"]
+
+
+def fail_to_scan(monkeypatch, locked: Path):
+    scandir = os.scandir
+
+    def locked_scandir(path):
+        if Path(path) == locked:
+            raise PermissionError(13, "Permission denied", str(path))
+        return scandir(path)
+
+    monkeypatch.setattr(crs.os, "scandir", locked_scandir)
+
+
+def test_find_repositories_collects_unreadable_directories(tmp_path, monkeypatch):
+    make_repo(tmp_path / "top")
+    make_repo(tmp_path / "group" / "nested")
+    (tmp_path / "group" / "locked").mkdir()
+    fail_to_scan(monkeypatch, tmp_path / "group" / "locked")
+
+    errors = []
+    found = sorted(path.relative_to(tmp_path).as_posix() for path in crs.find_repositories(tmp_path, 3, errors))
+
+    assert found == ["group/nested", "top"]
+    assert [(path, type(error)) for path, error in errors] == [(tmp_path / "group" / "locked", PermissionError)]
+    with pytest.raises(PermissionError):
+        list(crs.find_repositories(tmp_path, 3))
+
+
+def test_main_reports_unreadable_directories(tmp_path, monkeypatch, capsys):
+    make_repo(tmp_path / "group" / "nested", "README.md")
+    (tmp_path / "group" / "locked").mkdir()
+    fail_to_scan(monkeypatch, tmp_path / "group" / "locked")
+    monkeypatch.setattr("sys.argv", ["check_repo_structure.py", str(tmp_path), "--depth", "3"])
+
+    crs.main()
+
+    output = capsys.readouterr()
+    assert "Error: could not check group/locked: " in output.err
+    assert "nested" in output.out
+
+
+def test_main_rejects_a_depth_below_one(tmp_path, monkeypatch):
+    monkeypatch.setattr("sys.argv", ["check_repo_structure.py", str(tmp_path), "--depth", "0"])
+
+    with pytest.raises(SystemExit) as exit_info:
+        crs.main()
+
+    assert exit_info.value.code == 2
+
+
+def test_scan_repositories_reports_unreadable_repositories(tmp_path, monkeypatch):
+    repo_paths = [make_repo(tmp_path / f"repo{i}", "README.md") for i in range(5)]
+
+    check_repository = crs.check_repository
+
+    def check_or_fail(repo_path, name=None):
+        if repo_path.name == "repo2":
+            raise PermissionError(13, "Permission denied", str(repo_path))
+        return check_repository(repo_path, name)
+
+    monkeypatch.setattr(crs, "check_repository", check_or_fail)
+    results = {path.name: (repo, error) for path, repo, _, error in crs.scan_repositories(tmp_path, repo_paths, 2)}
+
+    assert isinstance(results.pop("repo2")[1], PermissionError)
+    assert all(repo.has_readme and error is None for repo, error in results.values())
+    assert len(results) == 4
+
+
+def test_scan_repositories_yields_results_while_the_walk_goes_on(tmp_path):
+    repo_paths = [make_repo(tmp_path / f"repo{i}") for i in range(10)]
+    walked = []
+
+    def walk():
+        for path in repo_paths:
+            walked.append(path)
+            yield path
+
+    results = crs.scan_repositories(tmp_path, walk(), 1)
+    next(results)
+    assert len(walked) < len(repo_paths)
+    assert len(list(results)) == len(repo_paths) - 1
+
+
+def test_positive_int_rejects_less_than_one():
+    assert crs.positive_int("4") == 4
+    with pytest.raises(argparse.ArgumentTypeError):
+        crs.positive_int("0")
+
+
+COMMIT = "0123456789abcdef0123456789abcdef01234567"
+OTHER_COMMIT = "89abcdef0123456789abcdef0123456789abcdef"
+
+
+def test_read_git_head_reads_loose_refs(tmp_path):
+    git_dir = make_repo(tmp_path / "repo") / ".git"
+    (git_dir / "HEAD").write_text("ref: refs/heads/main\n")
+    (git_dir / "refs" / "heads").mkdir(parents=True)
+    (git_dir / "refs" / "heads" / "main").write_text(COMMIT + "\n")
+
+    assert crs.read_git_head(tmp_path / "repo") == COMMIT
+
+
+def test_read_git_head_reads_packed_refs(tmp_path):
+    git_dir = make_repo(tmp_path / "repo") / ".git"
+    (git_dir / "HEAD").write_text("ref: refs/heads/main\n")
+    (git_dir / "packed-refs").write_text(
+        "# pack-refs with: peeled fully-peeled sorted\n"
+        f"{OTHER_COMMIT} refs/heads/feature\n"
+        f"{COMMIT} refs/heads/main\n"
+        f"^{OTHER_COMMIT}\n"
+    )
+
+    assert crs.read_git_head(tmp_path / "repo") == COMMIT
+
+
+def test_read_git_head_reads_detached_head(tmp_path):
+    git_dir = make_repo(tmp_path / "repo") / ".git"
+    (git_dir / "HEAD").write_text(COMMIT + "\n")
+
+    assert crs.read_git_head(tmp_path / "repo") == COMMIT
+
+
+def test_read_git_head_follows_worktrees_to_the_common_dir(tmp_path):
+    main_git_dir = make_repo(tmp_path / "main") / ".git"
+    (main_git_dir / "packed-refs").write_text(f"{COMMIT} refs/heads/feature\n")
+    worktree_git_dir = main_git_dir / "worktrees" / "feature"
+    worktree_git_dir.mkdir(parents=True)
+    (worktree_git_dir / "HEAD").write_text("ref: refs/heads/feature\n")
+    (worktree_git_dir / "commondir").write_text("../..\n")
+    (tmp_path / "feature").mkdir()
+    (tmp_path / "feature" / ".git").write_text(f"gitdir: {worktree_git_dir}\n")
+
+    assert crs.read_git_head(tmp_path / "feature") == COMMIT
+
+
+def test_check_repository_cached_only_checks_changed_repositories(tmp_path, monkeypatch):
+    repo_path = make_repo(tmp_path / "repo", "README.md")
+    (repo_path / ".git" / "HEAD").write_text(COMMIT + "\n")
+    status, entry = crs.check_repository_cached(repo_path, "repo", None)
+    assert status.has_readme
+
+    # Cache hit: the repository is not checked again
+    with monkeypatch.context() as m:
+        m.setattr(crs, "check_repository", lambda *args: pytest.fail("unexpected check"))
+        cached_status, cached_entry = crs.check_repository_cached(repo_path, "repo", entry)
+    assert cached_status == status
+    assert cached_entry == entry
+
+    # Cache miss: a new commit or a changed directory invalidates the entry
+    (repo_path / ".git" / "HEAD").write_text(OTHER_COMMIT + "\n")
+    assert crs.check_repository_cached(repo_path, "repo", entry)[1]["fingerprint"]["head"] == OTHER_COMMIT
+
+    (repo_path / "CHANGELOG.md").write_text("changes\n")
+    os.utime(repo_path, ns=(0, 0))
+    status, _ = crs.check_repository_cached(repo_path, "repo", entry)
+    assert status.has_changelog
+
+
+def test_load_cache_ignores_corrupt_files(tmp_path):
+    cache_path = tmp_path / "cache.json"
+    cache_path.write_text('{"settings": [2, ["readme.md"], "repos": {')
+    assert crs.load_cache(str(cache_path)) == ({}, {})
+
+    cache_path.write_text("[]")
+    assert crs.load_cache(str(cache_path)) == ({}, {})
+
+
+def test_main_writes_empty_outputs_without_repositories(tmp_path, monkeypatch):
+    (tmp_path / "empty").mkdir()
+    json_path = tmp_path / "results.json"
+    csv_path = tmp_path / "results.csv"
+    monkeypatch.setattr(
+        "sys.argv", ["check_repo_structure.py", str(tmp_path / "empty"), "--json", str(json_path), "--csv", str(csv_path)]
+    )
+
+    with pytest.raises(SystemExit) as exit_info:
+        crs.main()
+
+    assert exit_info.value.code == 0
+    assert json.loads(json_path.read_text()) == []
+    assert csv_path.read_text().splitlines() == ["repository,readme,changelog,github_actions,workflows"]
+
+
+def test_main_reports_missing_pyyaml_for_the_workflow_analysis(tmp_path, monkeypatch, capsys):
+    make_repo(tmp_path / "repo", ".github/workflows/ci.yml")
+    # NOTE: a module set to None in sys.modules raises an ImportError when it is imported
+    monkeypatch.setitem(sys.modules, "yaml", None)
+    monkeypatch.setattr("sys.argv", ["check_repo_structure.py", str(tmp_path), "--analyze-workflows"])
+
+    with pytest.raises(SystemExit) as exit_info:
+        crs.main()
+
+    assert exit_info.value.code == 1
+    assert "--analyze-workflows requires PyYAML" in capsys.readouterr().err
+
+
+def test_check_repository_cached_rehashes_workflows_edited_in_place(tmp_path):
+    repo_path = make_repo(tmp_path / "repo", ".github/workflows/ci.yml")
+    workflow_path = repo_path / ".github" / "workflows" / "ci.yml"
+    status, entry = crs.check_repository_cached(repo_path, "repo", None)
+
+    # Editing the file in place changes neither the HEAD nor the modification time of its directory
+    directory_stat = os.stat(workflow_path.parent)
+    workflow_path.write_text("changed content\n")
+    os.utime(workflow_path.parent, ns=(directory_stat.st_atime_ns, directory_stat.st_mtime_ns))
+
+    new_status, _ = crs.check_repository_cached(repo_path, "repo", entry)
+    assert new_status.workflow_blobs["ci.yml"] != status.workflow_blobs["ci.yml"]
+    assert new_status.workflow_blobs["ci.yml"] == crs.git_blob_hash(b"changed content\n")
@@ -0,0 +1,58 @@
+"""
+Tests for the analysis of the GitHub workflow files.
+"""
+
+import pytest
+
+from workflow_analysis import WorkflowAnalyzer, git_blob_hash
+
+pytest.importorskip("yaml")
+
+
+WORKFLOW = b"""
+on: [push]
+jobs:
+  test:
+    steps:
+      - uses: actions/checkout@v3
+"""
+
+
+def test_analyzer_parses_each_blob_once(tmp_path):
+    paths = [tmp_path / "a.yml", tmp_path / "b.yml"]
+    for path in paths:
+        path.write_bytes(WORKFLOW)
+    blob = git_blob_hash(WORKFLOW)
+
+    analyzer = WorkflowAnalyzer()
+    analyzer.analyze((blob, path) for path in paths)
+
+    assert analyzer.n_parsed == 1
+    assert analyzer.get(blob).triggers == ["push"]
+    assert analyzer.get(blob).actions == ["actions/checkout@v3"]
+
+
+def test_analyzer_stores_changed_files_under_their_new_hash(tmp_path):
+    path = tmp_path / "ci.yml"
+    old_blob = git_blob_hash(WORKFLOW)
+    new_content = WORKFLOW.replace(b"push", b"pull_request").replace(b"@v3", b"@v4")
+    path.write_bytes(new_content)
+
+    analyzer = WorkflowAnalyzer()
+    analyzer.analyze([(old_blob, path)])
+
+    # The old hash is not poisoned with the analysis of the new content
+    assert analyzer.get(old_blob).error is not None
+    assert analyzer.get(git_blob_hash(new_content)).actions == ["actions/checkout@v4"]
+    assert old_blob not in analyzer.to_cache([old_blob])["blobs"]
+
+
+def test_analyzer_skips_unreadable_files(tmp_path):
+    blob = git_blob_hash(WORKFLOW)
+    (tmp_path / "ok.yml").write_bytes(WORKFLOW)
+
+    analyzer = WorkflowAnalyzer()
+    analyzer.analyze([("0" * 40, tmp_path / "deleted.yml"), (blob, tmp_path / "ok.yml")])
+
+    assert analyzer.get("0" * 40).error is not None
+    assert analyzer.get(blob).triggers == ["push"]
@@ -0,0 +1,107 @@
+"""Analysis of the jobs, triggers and actions used in GitHub workflow files."""
+
+import hashlib
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+
+# Cached analyses are discarded, whenever the analysis itself changes
+ANALYSIS_VERSION = 1
+
+
+@dataclass
+class WorkflowInfo:
+    triggers: List[str] = field(default_factory=list)
+    jobs: List[str] = field(default_factory=list)
+    actions: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+def git_blob_hash(content: bytes) -> str:
+    """Return the same hash as `git hash-object`, so that identical files share one analysis across repositories."""
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
+def parse_triggers(on) -> List[str]:
+    if isinstance(on, str):
+        return [on]
+    if isinstance(on, (list, dict)):
+        return [str(trigger) for trigger in on]
+    return []
+
+
+def analyze_workflow(content: bytes) -> WorkflowInfo:
+    """Extract the triggers, job names and used actions (with their versions) from a workflow file."""
+    import yaml
+
+    try:
+        workflow = yaml.safe_load(content)
+    except yaml.YAMLError as e:
+        return WorkflowInfo(error=str(e).splitlines()[0])
+
+    if not isinstance(workflow, dict):
+        return WorkflowInfo(error="workflow is not a mapping")
+
+    # YAML 1.1 parses the `on` key as the boolean True
+    triggers = parse_triggers(workflow.get("on", workflow.get(True)))
+
+    jobs = workflow.get("jobs") or {}
+    if not isinstance(jobs, dict):
+        jobs = {}
+
+    actions = set()
+    for job in jobs.values():
+        if not isinstance(job, dict):
+            continue
+        # Jobs can call reusable workflows instead of running steps
+        if isinstance(job.get("uses"), str):
+            actions.add(job["uses"])
+        for step in job.get("steps") or []:
+            if isinstance(step, dict) and isinstance(step.get("uses"), str):
+                actions.add(step["uses"])
+
+    return WorkflowInfo(triggers, [str(job) for job in jobs], sorted(actions))
+
+
+class WorkflowAnalyzer:
+    """Analyzes workflow files by their git blob hash, so that each unique content is only parsed once."""
+
+    def __init__(self, cached: Optional[Dict] = None):
+        self.analyses: Dict[str, WorkflowInfo] = {}
+        if cached and cached.get("version") == ANALYSIS_VERSION:
+            self.analyses = {blob: WorkflowInfo(**info) for blob, info in cached["blobs"].items()}
+        self.n_parsed = 0
+
+    def analyze(self, blobs: Iterable[tuple]) -> None:
+        """
+        Analyze the (blob hash, file path) pairs, whose blob hash was not analyzed yet.
+
+        The analysis is stored under the hash of the content, that was actually read,
+        so that a file, which changed after it was hashed, can't be stored under the hash of its old content.
+        """
+        for blob, path in blobs:
+            if blob in self.analyses:
+                continue
+
+            try:
+                with open(path, "rb") as f:
+                    content = f.read()
+            except OSError:
+                # NOTE: the blob is left unanalyzed, so that it is reported by `get` and read again in the next run
+                continue
+            content_blob = git_blob_hash(content)
+            if content_blob not in self.analyses:
+                self.analyses[content_blob] = analyze_workflow(content)
+                self.n_parsed += 1
+
+    def get(self, blob: str) -> WorkflowInfo:
+        # Files, that changed after they were hashed or couldn't be read, have no analysis for their hash
+        return self.analyses.get(blob) or WorkflowInfo(error="the file changed or could not be read while it was checked")
+
+    def to_cache(self, used_blobs: Iterable[str]) -> Dict:
+        # NOTE: only the analyses of workflows, that still exist, are kept in the cache
+        used_blobs = set(used_blobs)
+        return {
+            "version": ANALYSIS_VERSION,
+            "blobs": {blob: vars(info) for blob, info in self.analyses.items() if blob in used_blobs},
+        }
@@ -0,0 +1,81 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class JsonRpcError(Exception):
+    pass
+
+
+def error_message(response):
+    """
+    Return the message of the error in a JSON-RPC response, or the whole error if it has no message.
+    """
+    error = response['error']
+    return error.get('message', str(error)) if isinstance(error, dict) else str(error)
+
+
+def create_session(pool_size=10):
+    """
+    Create an HTTP session, that keeps the connections to the node open between requests.
+
+    Args:
+        pool_size (int): Maximum number of connections kept open per host
+
+    Returns:
+        requests.Session: Session with a connection pool of the given size
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def batch_call(session, rpc_url, calls, timeout=30):
+    """
+    Send several JSON-RPC calls in a single batch request.
+
+    Args:
+        session (requests.Session): Session to send the request with
+        rpc_url (str): URL of the JSON-RPC endpoint
+        calls (list): List of (method, params) tuples
+        timeout (float): Timeout of the request in seconds
+
+    Returns:
+        list: The responses in the order of the calls, each containing either a `result` or an `error`
+    """
+    payload = [
+        {'jsonrpc': '2.0', 'id': i, 'method': method, 'params': params}
+        for i, (method, params) in enumerate(calls)
+    ]
+    response = session.post(rpc_url, json=payload, timeout=timeout)
+    response.raise_for_status()
+    body = response.json()
+
+    # Some nodes answer a batch with a single error object (e.g. if batches are disabled)
+    if isinstance(body, dict):
+        raise JsonRpcError(body.get('error', body))
+
+    # The responses of a batch can be returned in any order
+    responses = {entry['id']: entry for entry in body}
+    return [responses.get(i, {'error': {'message': 'missing response'}}) for i in range(len(calls))]
+
+
+def call(session, rpc_url, method, params, timeout=30):
+    """
+    Send a single JSON-RPC call and return its result.
+
+    Raises:
+        JsonRpcError: If the node returned an error
+    """
+    response = session.post(
+        rpc_url,
+        json={'jsonrpc': '2.0', 'id': 0, 'method': method, 'params': params},
+        timeout=timeout,
+    )
+    response.raise_for_status()
+    body = response.json()
+    if 'error' in body:
+        raise JsonRpcError(error_message(body))
+
+    return body['result']
@@ -0,0 +1,158 @@
+"""
+Submit the same signed transaction from many concurrent workers at (almost) the same time,
+to test how the node handles duplicate transactions racing each other.
+
+Each worker opens its connection to the node first and then waits at a barrier,
+so that all submissions are sent within a narrow time window.
+The script prints which submissions were accepted or rejected and a histogram of their latencies.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from json_rpc import batch_call, create_session, error_message
+from stub_node import start_stub_node
+
+# Upper bounds of the latency histogram buckets in milliseconds
+HISTOGRAM_BUCKETS = [0.5, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+
+
+def race_submissions(rpc_url, raw_tx, workers=32, connect_timeout=30):
+    """
+    Submit the same raw transaction from the given number of concurrent workers.
+
+    Args:
+        rpc_url (str): URL of the JSON-RPC endpoint
+        raw_tx (str): Hex encoded raw transaction
+        workers (int): Number of concurrent submissions
+        connect_timeout (float): Seconds to wait for all workers to open their connections
+
+    Returns:
+        list: One dict per submission with the start offset and latency in seconds,
+              if it was accepted and the transaction hash or error message
+
+    Raises:
+        threading.BrokenBarrierError: If not all workers opened their connections in time
+    """
+    barrier = threading.Barrier(workers)
+
+    def submit(worker):
+        session = create_session(pool_size=1)
+        # Open the connection before the barrier, so that only the submission itself is raced
+        try:
+            batch_call(session, rpc_url, [('eth_chainId', [])])
+        except Exception:
+            # Release the other workers, instead of letting them wait for this one
+            barrier.abort()
+            raise
+        barrier.wait(timeout=connect_timeout)
+
+        start = time.perf_counter()
+        response = batch_call(session, rpc_url, [('eth_sendRawTransaction', [raw_tx])])[0]
+        latency = time.perf_counter() - start
+        session.close()
+
+        accepted = 'error' not in response
+        return {
+            'worker': worker,
+            'start': start,
+            'latency': latency,
+            'accepted': accepted,
+            'message': response['result'] if accepted else error_message(response),
+        }
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(submit, worker) for worker in range(workers)]
+
+    # The error of a worker, that could not connect, is raised instead of the broken barrier of the others
+    errors = [future.exception() for future in futures if future.exception() is not None]
+    if errors:
+        raise next((error for error in errors if not isinstance(error, threading.BrokenBarrierError)), errors[0])
+    results = [future.result() for future in futures]
+
+    first_start = min(result['start'] for result in results)
+    for result in results:
+        result['start'] -= first_start
+
+    return results
+
+
+def latency_histogram(latencies):
+    """
+    Count the latencies (in seconds) per histogram bucket.
+
+    Returns:
+        list: (upper bound in ms or None for the overflow bucket, count) tuples
+    """
+    counts = Counter()
+    for latency in latencies:
+        bucket = next((bound for bound in HISTOGRAM_BUCKETS if latency * 1e3 <= bound), None)
+        counts[bucket] += 1
+
+    return [(bound, counts[bound]) for bound in HISTOGRAM_BUCKETS + [None]]
+
+
+def print_results(results):
+    """
+    Print the results of the race and return if exactly one submission was accepted.
+    """
+    accepted = [result for result in results if result['accepted']]
+    rejections = Counter(result['message'] for result in results if not result['accepted'])
+    window = max(result['start'] for result in results)
+
+    print(f"Sent {len(results)} submissions within {window * 1e3:.2f} ms")
+    print(f"Accepted: {len(accepted)} {sorted(set(result['message'] for result in accepted))}")
+    for message, count in rejections.most_common():
+        print(f"Rejected: {count} ({message})")
+    if len(accepted) != 1:
+        print(f"WARNING: expected exactly one accepted submission, got {len(accepted)}")
+
+    print("\nLatency histogram:")
+    histogram = latency_histogram([result['latency'] for result in results])
+    for bound, count in histogram:
+        label = f"<= {bound:g} ms" if bound is not None else f"> {HISTOGRAM_BUCKETS[-1]} ms"
+        print(f"{label:>12} {count:>5} {'#' * count}")
+
+    return len(accepted) == 1
+
+
+def sign_transaction_from_env():
+    # Imported here, so that the harness can run against the stub node without web3
+    from runDuplicateTx import create_and_sign_transaction, w3
+
+    private_key = os.getenv('PRIVATE_KEY')
+    if not private_key:
+        raise ValueError("Please set PRIVATE_KEY in your .env file")
+
+    to_address = os.getenv('TO_ADDRESS', '0x742d35Cc6634C0532925a3b844Bc454e4438f44e')
+    return w3.to_hex(create_and_sign_transaction(private_key, to_address, 0.00000001))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Race duplicate submissions of the same transaction")
+    parser.add_argument('-w', '--workers', type=int, default=32, help="Number of concurrent submissions")
+    parser.add_argument('--raw-tx', help="Hex encoded raw transaction to submit (default: sign a new one)")
+    parser.add_argument('--stub', action='store_true', help="Run against a local stub node instead of RPC_URL")
+    args = parser.parse_args()
+
+    if args.stub:
+        rpc_url = start_stub_node().url
+        raw_tx = args.raw_tx or '0x' + os.urandom(110).hex()
+    else:
+        rpc_url = os.getenv('RPC_URL', 'http://localhost:8545')
+        raw_tx = args.raw_tx or sign_transaction_from_env()
+
+    # The exit code allows running the harness against the stub node in CI
+    try:
+        results = race_submissions(rpc_url, raw_tx, args.workers)
+    except threading.BrokenBarrierError:
+        sys.exit("Not all workers could open their connection to the node in time")
+    sys.exit(0 if print_results(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Track the inclusion of many transactions by following new blocks,
+instead of polling the node for the receipt of each transaction separately.
+
+Each new block is fetched once with its full transaction list and the included
+transactions are resolved from an in-memory index of the pending hashes.
+The blocks are followed in a background thread while the transactions are submitted,
+so that the inclusion latencies don't depend on how long the submission takes.
+"""
+import threading
+import time
+from collections import Counter
+
+from json_rpc import batch_call, call
+
+# Maximum number of blocks fetched in a single batch request
+MAX_BLOCKS_PER_BATCH = 50
+
+
+class ReceiptTracker:
+    """
+    Follows new blocks and resolves the tracked transaction hashes, that are included in them.
+
+    `start` has to be called before the first transaction is submitted,
+    so that no block containing a tracked transaction is skipped.
+    It starts following the blocks in a background thread, which uses the given session exclusively
+    and runs until `stop` is called.
+    Transactions can be tracked after their block was observed, e.g. once all submissions are done.
+    """
+
+    def __init__(self, session, rpc_url, poll_interval=0.5):
+        self.session = session
+        self.rpc_url = rpc_url
+        self.poll_interval = poll_interval
+        self.next_block = None
+        # Hash -> time of submission of the transactions, that are not included yet
+        self.pending = {}
+        # Hash -> block number, inclusion latency and status of the included transactions
+        self.included = {}
+        # Block number -> number of transactions, that were included before or more than once in the block
+        self.duplicates_per_block = Counter()
+        # Hash -> block number and time of observation of all transactions in the followed blocks
+        self.seen_hashes = {}
+        self.seen_nonces = set()
+        # Hashes of the transactions, that were tracked after their block was observed and have no status yet
+        self.unresolved = []
+        # NOTE: `lock` guards the state above, `poll_lock` makes sure that only one poll runs at a time
+        self.lock = threading.Lock()
+        self.poll_lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.error = None
+
+    def start(self):
+        self.next_block = int(call(self.session, self.rpc_url, 'eth_blockNumber', []), 16) + 1
+        self.thread = threading.Thread(target=self.follow, daemon=True)
+        self.thread.start()
+
+    def follow(self):
+        while not self.stopped.wait(self.poll_interval):
+            try:
+                self.poll()
+            except Exception as e:
+                # The error is raised again by `wait`, instead of silently stopping to follow the blocks
+                self.error = e
+                return
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def track(self, tx_hash, submitted_at=None):
+        tx_hash = tx_hash.lower()
+        submitted_at = submitted_at if submitted_at is not None else time.perf_counter()
+        with self.lock:
+            if tx_hash in self.included or tx_hash in self.pending:
+                return
+            if tx_hash in self.seen_hashes:
+                number, observed_at = self.seen_hashes[tx_hash]
+                self.include(tx_hash, number, submitted_at, observed_at)
+                self.unresolved.append(tx_hash)
+            else:
+                self.pending[tx_hash] = submitted_at
+
+    def include(self, tx_hash, number, submitted_at, observed_at):
+        self.included[tx_hash] = {
+            'block': number, 'latency': observed_at - submitted_at, 'included_at': observed_at, 'status': None
+        }
+
+    def poll(self):
+        """
+        Fetch all blocks, that were produced since the last poll, and resolve the tracked transactions in them.
+
+        Returns:
+            list: Hashes of the transactions, that were resolved in this poll
+        """
+        with self.poll_lock:
+            if self.next_block is None:
+                self.next_block = int(call(self.session, self.rpc_url, 'eth_blockNumber', []), 16) + 1
+
+            resolved = self.fetch_blocks()
+            with self.lock:
+                resolved.extend(self.unresolved)
+                self.unresolved = []
+            self.resolve_statuses(resolved)
+
+        return resolved
+
+    def fetch_blocks(self):
+        latest_block = int(call(self.session, self.rpc_url, 'eth_blockNumber', []), 16)
+        resolved = []
+        while self.next_block <= latest_block:
+            block_numbers = range(self.next_block, min(latest_block, self.next_block + MAX_BLOCKS_PER_BATCH - 1) + 1)
+            responses = batch_call(
+                self.session, self.rpc_url,
+                [('eth_getBlockByNumber', [hex(number), True]) for number in block_numbers]
+            )
+            observed_at = time.perf_counter()
+            for number, response in zip(block_numbers, responses):
+                if 'error' in response or response.get('result') is None:
+                    # The block is not available yet, so it is fetched again in the next poll
+                    self.next_block = number
+                    return resolved
+
+                with self.lock:
+                    resolved.extend(self.process_block(number, response['result']['transactions'], observed_at))
+
+            self.next_block = block_numbers[-1] + 1
+
+        return resolved
+
+    def process_block(self, number, transactions, observed_at):
+        resolved = []
+        for tx in transactions:
+            tx_hash = tx['hash'].lower()
+            # Transactions with the same sender and nonce are duplicates, even if they are signed differently
+            nonce_key = (tx['from'].lower(), tx['nonce']) if 'from' in tx and 'nonce' in tx else None
+            if tx_hash in self.seen_hashes or (nonce_key is not None and nonce_key in self.seen_nonces):
+                self.duplicates_per_block[number] += 1
+            self.seen_hashes.setdefault(tx_hash, (number, observed_at))
+            if nonce_key is not None:
+                self.seen_nonces.add(nonce_key)
+
+            submitted_at = self.pending.pop(tx_hash, None)
+            if submitted_at is not None:
+                self.include(tx_hash, number, submitted_at, observed_at)
+                resolved.append(tx_hash)
+
+        return resolved
+
+    def resolve_statuses(self, tx_hashes):
+        """
+        Fetch the receipts of the newly included transactions in a single batch request to get their status.
+        """
+        if not tx_hashes:
+            return
+
+        responses = batch_call(
+            self.session, self.rpc_url,
+            [('eth_getTransactionReceipt', [tx_hash]) for tx_hash in tx_hashes]
+        )
+        with self.lock:
+            for tx_hash, response in zip(tx_hashes, responses):
+                receipt = response.get('result')
+                if receipt is not None:
+                    self.included[tx_hash]['status'] = int(receipt['status'], 16)
+
+    def wait(self, tx_hashes=None, timeout=120):
+        """
+        Wait until the given (or all tracked) transactions are included or the timeout is reached.
+        The blocks are polled here, if they aren't followed in the background.
+
+        Returns:
+            bool: If all of the transactions were included
+        """
+        deadline = time.perf_counter() + timeout
+        while True:
+            if self.error is not None:
+                raise self.error
+            if self.thread is None:
+                self.poll()
+            with self.lock:
+                done = not self.pending if tx_hashes is None else all(h.lower() not in self.pending for h in tx_hashes)
+                unresolved = bool(self.unresolved)
+            if done:
+                if unresolved:
+                    # Resolves the statuses of the transactions, that were tracked after their block was observed
+                    self.poll()
+                return True
+            if time.perf_counter() >= deadline:
+                return False
+
+            time.sleep(self.poll_interval)
+
+    def inclusion_throughput(self):
+        """
+        Return the number of included transactions per second between the first and the last inclusion,
+        or None if they were all observed at the same time (e.g. in a single block).
+
+        The inclusion times are the times, at which the blocks were observed while following them,
+        so the blocks have to be followed during the submission (see `start`) and `poll_interval`
+        has to be shorter than the block time for the rate to be accurate.
+        """
+        included_at = [entry['included_at'] for entry in self.included.values()]
+        if len(included_at) < 2 or max(included_at) == min(included_at):
+            return None
+
+        # NOTE: the transactions observed first are not counted, because they mark the start of the measurement
+        first = min(included_at)
+        return sum(1 for at in included_at if at > first) / (max(included_at) - first)
+
+    def print_summary(self):
+        latencies = sorted(entry['latency'] for entry in self.included.values())
+        print(f"Included: {len(self.included)}, still pending: {len(self.pending)}")
+        if latencies:
+            print(
+                f"Inclusion latency: p50 {latencies[len(latencies) // 2]:.2f}s, "
+                f"p95 {latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]:.2f}s, "
+                f"max {latencies[-1]:.2f}s"
+            )
+            failed = sum(1 for entry in self.included.values() if entry['status'] == 0)
+            print(f"Failed transactions: {failed}")
+
+        throughput = self.inclusion_throughput()
+        if throughput is not None:
+            print(f"Inclusion throughput: {throughput:.1f} tx/s between the first and the last inclusion")
+
+        blocks = Counter(entry['block'] for entry in self.included.values())
+        for number in sorted(set(blocks) | set(self.duplicates_per_block)):
+            print(f"  Block {number}: {blocks[number]} tracked transactions, {self.duplicates_per_block[number]} duplicates")
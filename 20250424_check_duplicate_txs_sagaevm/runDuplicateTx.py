@@ -1,9 +1,15 @@
 from web3 import Web3
+import argparse
 import json
 import os
+import time
+from collections import Counter
 from eth_account import Account
 from dotenv import load_dotenv
 
+from json_rpc import batch_call, create_session, error_message
+from receipt_tracker import ReceiptTracker
+
 # Load environment variables
 load_dotenv()
 
@@ -66,7 +72,154 @@ def send_transaction(signed_tx):
     tx_hash = w3.eth.send_raw_transaction(signed_tx)
     return tx_hash.hex()
 
+def fetch_chain_params(session, rpc_url, address):
+    """
+    Fetch the nonce, gas price and chain id of the network in a single batch request.
+    
+    Args:
+        session (requests.Session): Session to send the request with
+        rpc_url (str): URL of the JSON-RPC endpoint
+        address (str): Address to fetch the nonce for
+    
+    Returns:
+        tuple: (nonce, gas_price, chain_id) as integers
+    """
+    responses = batch_call(session, rpc_url, [
+        ('eth_getTransactionCount', [address, 'pending']),
+        ('eth_gasPrice', []),
+        ('eth_chainId', []),
+    ])
+    for response in responses:
+        if 'error' in response:
+            raise ValueError(f"Could not fetch chain parameters: {response['error']}")
+    
+    return tuple(int(response['result'], 16) for response in responses)
+
+def presign_transactions(private_key, to_address, value_wei, count, nonce, gas_price, chain_id, gas_limit=21000):
+    """
+    Sign transactions with consecutive nonces offline, without any calls to the network.
+    
+    Args:
+        private_key (str): Private key of the sender
+        to_address (str): Recipient address
+        value_wei (int): Amount to send in Wei
+        count (int): Number of transactions to sign
+        nonce (int): Nonce of the first transaction
+        gas_price (int): Gas price in wei
+        chain_id (int): Chain id of the network
+        gas_limit (int): Gas limit for each transaction
+    
+    Returns:
+        list: Hex encoded raw transactions
+    """
+    to_address = Web3.to_checksum_address(to_address)
+    raw_txs = []
+    for i in range(count):
+        transaction = {
+            'nonce': nonce + i,
+            'to': to_address,
+            'value': value_wei,
+            'gas': gas_limit,
+            'gasPrice': gas_price,
+            'chainId': chain_id
+        }
+        signed_tx = Account.sign_transaction(transaction, private_key)
+        raw_txs.append(Web3.to_hex(signed_tx.rawTransaction))
+    
+    return raw_txs
+
+def submit_in_batches(session, rpc_url, raw_txs, batch_size=100):
+    """
+    Submit raw transactions with `eth_sendRawTransaction` in JSON-RPC batch requests.
+    
+    The batches are sent one after another, so that the node receives the transactions of each sender
+    in nonce order. Concurrent batches would arrive out of order and be rejected or queued as nonce gaps,
+    so more load has to come from more senders (see `sharded_load.py`).
+    
+    Args:
+        session (requests.Session): Session to send the requests with
+        rpc_url (str): URL of the JSON-RPC endpoint
+        raw_txs (list): Hex encoded raw transactions
+        batch_size (int): Number of transactions per batch request
+    
+    Returns:
+        tuple: (responses in the order of the transactions, duration of the submission in seconds),
+            where each response also holds the time its batch was submitted at as `submitted_at`
+    """
+    batches = [raw_txs[i:i + batch_size] for i in range(0, len(raw_txs), batch_size)]
+    
+    responses = []
+    start = time.perf_counter()
+    for batch in batches:
+        submitted_at = time.perf_counter()
+        for response in batch_call(session, rpc_url, [('eth_sendRawTransaction', [raw_tx]) for raw_tx in batch]):
+            response['submitted_at'] = submitted_at
+            responses.append(response)
+    
+    return responses, time.perf_counter() - start
+
+def summarize_submissions(responses, duration):
+    """
+    Print the number of accepted and rejected transactions and the submission rate.
+    """
+    errors = Counter(error_message(response) for response in responses if 'error' in response)
+    accepted = len(responses) - sum(errors.values())
+    print(f"Submitted {len(responses)} transactions in {duration:.2f}s ({len(responses) / duration:.1f} tx/s)")
+    print(f"Accepted: {accepted}, rejected: {sum(errors.values())}")
+    for message, count in errors.most_common():
+        print(f"  {count:>6}x {message}")
+
+def run_load(private_key, to_address, value_eth, count, batch_size, rpc_url, track=True, timeout=120):
+    """
+    Pre-sign `count` transactions and submit them as fast as possible to measure the mempool throughput.
+    If `track` is set, the inclusion of the accepted transactions is followed block by block afterwards.
+    """
+    account = Account.from_key(private_key)
+    session = create_session(pool_size=1)
+    
+    # Fetch the chain parameters once instead of for every transaction
+    nonce, gas_price, chain_id = fetch_chain_params(session, rpc_url, account.address)
+    print(f"Chain id: {chain_id}, gas price: {gas_price}, starting nonce: {nonce}")
+    
+    start = time.perf_counter()
+    raw_txs = presign_transactions(
+        private_key, to_address, Web3.to_wei(value_eth, 'ether'), count, nonce, gas_price, chain_id
+    )
+    print(f"Signed {count} transactions in {time.perf_counter() - start:.2f}s")
+    
+    # NOTE: the tracker follows the blocks in the background, so it gets its own session
+    tracker = ReceiptTracker(create_session(pool_size=1), rpc_url)
+    if track:
+        tracker.start()
+    
+    responses, duration = submit_in_batches(session, rpc_url, raw_txs, batch_size)
+    summarize_submissions(responses, duration)
+    
+    if track:
+        for response in responses:
+            if 'result' in response:
+                tracker.track(response['result'], response['submitted_at'])
+        print("\nWaiting for the transactions to be included...")
+        tracker.wait(timeout=timeout)
+        tracker.stop()
+        tracker.print_summary()
+    
+    return raw_txs, responses
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Send duplicate transactions or generate load on an EVM chain")
+    parser.add_argument('--mode', choices=['duplicate', 'load'], default='duplicate',
+                        help="Resend one transaction three times (duplicate) or submit many pre-signed transactions (load)")
+    parser.add_argument('-n', '--count', type=int, default=500, help="Number of transactions in load mode")
+    parser.add_argument('--batch-size', type=int, default=100, help="Transactions per JSON-RPC batch in load mode")
+    parser.add_argument('--value', type=float, default=0.00000001, help="Amount to send per transaction in ETH")
+    parser.add_argument('--no-track', action='store_true', help="Don't wait for the transactions to be included")
+    parser.add_argument('--timeout', type=float, default=120, help="Seconds to wait for the transactions to be included")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+    
     # Load private key from environment variable
     private_key = os.getenv('PRIVATE_KEY')
     if not private_key:
@@ -76,23 +229,46 @@ def main():
     to_address = os.getenv('TO_ADDRESS', '0x742d35Cc6634C0532925a3b844Bc454e4438f44e')
     
     # Amount to send in ETH
-    value_eth = 0.00000001
+    value_eth = args.value
+    
+    rpc_url = os.getenv('RPC_URL', 'http://localhost:8545')
+    if args.mode == 'load':
+        run_load(
+            private_key, to_address, value_eth, args.count, args.batch_size, rpc_url,
+            track=not args.no_track, timeout=args.timeout
+        )
+        return
     
     # Create and sign the transaction
     print("Creating and signing transaction...")
     signed_tx = create_and_sign_transaction(private_key, to_address, value_eth)
     
+    # Follow the new blocks instead of polling for the receipt of each attempt
+    tracker = ReceiptTracker(create_session(pool_size=1), rpc_url)
+    tracker.start()
+    
     # Send the same transaction three times
     for i in range(3):
-    # i = 1
         print(f"\nSending transaction attempt {i+1}...")
-        tx_hash = send_transaction(signed_tx)
+        try:
+            tx_hash = send_transaction(signed_tx)
+        except ValueError as e:
+            print(f"Transaction rejected: {e}")
+            continue
         print(f"Transaction hash: {tx_hash}")
         
-        # Wait for transaction receipt
-        receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-        print(f"Transaction status: {'Success' if receipt.status == 1 else 'Failed'}")
-        print(f"Block number: {receipt.blockNumber}")
+        # Wait for the transaction to be included
+        tracker.track(tx_hash)
+        if not tracker.wait([tx_hash], timeout=args.timeout):
+            print(f"Transaction was not included within {args.timeout}s")
+            continue
+        included = tracker.included[tx_hash.lower()]
+        print(f"Transaction status: {'Success' if included['status'] == 1 else 'Failed'}")
+        print(f"Block number: {included['block']} (included after {included['latency']:.2f}s)")
+    
+    print()
+    tracker.stop()
+    tracker.print_summary()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,194 @@
+"""
+Generate load from a pool of accounts, sharded across worker processes.
+
+Transactions of a single account have to be included in nonce order, which limits the throughput
+of the load mode in `runDuplicateTx.py` to what the node accepts for one sender.
+Here, the accounts are derived from a mnemonic (or loaded from a file with one private key per line)
+and split between the worker processes, which sign the transactions with a local nonce counter
+per account and submit them in JSON-RPC batches.
+The results of all workers are aggregated into the submission rate,
+and the inclusion throughput is measured from the first to the last inclusion afterwards.
+"""
+import argparse
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from eth_account import Account
+from dotenv import load_dotenv
+from web3 import Web3
+
+from json_rpc import batch_call, create_session, error_message
+from receipt_tracker import ReceiptTracker
+from runDuplicateTx import presign_transactions, submit_in_batches
+from stub_node import start_stub_node
+
+
+def derive_accounts(mnemonic, count):
+    """
+    Derive the private keys of the first `count` accounts of the standard Ethereum derivation path.
+    """
+    Account.enable_unaudited_hdwallet_features()
+    return [
+        Account.from_mnemonic(mnemonic, account_path=f"m/44'/60'/0'/0/{i}").key.hex()
+        for i in range(count)
+    ]
+
+
+def load_keys(path):
+    with open(path, 'r') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def fetch_nonces(session, rpc_url, addresses):
+    """
+    Fetch the pending nonces of all accounts in a single batch request.
+    """
+    responses = batch_call(session, rpc_url, [('eth_getTransactionCount', [address, 'pending']) for address in addresses])
+    for address, response in zip(addresses, responses):
+        if 'error' in response:
+            raise ValueError(f"Could not fetch the nonce of {address}: {response['error']}")
+
+    return [int(response['result'], 16) for response in responses]
+
+
+def run_shard(rpc_url, accounts, to_address, value_wei, count_per_account, gas_price, chain_id, batch_size):
+    """
+    Sign and submit the transactions of a shard of accounts in a worker process.
+
+    Args:
+        accounts (list): (private key, first nonce) tuples of the accounts in this shard
+
+    Returns:
+        dict: Number of signed transactions, the accepted hashes with their submission times,
+              the errors by message and the start and end of the submission as wall clock times
+    """
+    start = time.perf_counter()
+    # The nonce counter of each account is kept locally, so the node is never asked for it again
+    per_account = [
+        presign_transactions(private_key, to_address, value_wei, count_per_account, nonce, gas_price, chain_id)
+        for private_key, nonce in accounts
+    ]
+    sign_duration = time.perf_counter() - start
+
+    # Interleave the accounts, so that each batch carries transactions of many senders in nonce order
+    raw_txs = [raw_tx for round_txs in zip(*per_account) for raw_tx in round_txs]
+
+    session = create_session(pool_size=1)
+    # The submission times are converted to wall clock times, so that they can be compared between processes
+    wall_clock_offset = time.time() - time.perf_counter()
+    started_at = time.perf_counter() + wall_clock_offset
+    responses, duration = submit_in_batches(session, rpc_url, raw_txs, batch_size)
+
+    return {
+        'signed': len(raw_txs),
+        'sign_duration': sign_duration,
+        'accepted': [
+            (response['result'], response['submitted_at'] + wall_clock_offset)
+            for response in responses if 'result' in response
+        ],
+        'errors': Counter(error_message(response) for response in responses if 'error' in response),
+        'started_at': started_at,
+        'finished_at': started_at + duration,
+    }
+
+
+def run_sharded_load(rpc_url, private_keys, to_address, value_eth, count_per_account, workers, batch_size):
+    """
+    Split the accounts between the worker processes, run the shards and print the aggregated results.
+
+    Returns:
+        list: The results of all shards
+    """
+    session = create_session(pool_size=1)
+    addresses = [Account.from_key(private_key).address for private_key in private_keys]
+    gas_price, chain_id = (int(response['result'], 16) for response in batch_call(
+        session, rpc_url, [('eth_gasPrice', []), ('eth_chainId', [])]
+    ))
+    nonces = fetch_nonces(session, rpc_url, addresses)
+    print(f"Chain id: {chain_id}, gas price: {gas_price}, accounts: {len(private_keys)}, workers: {workers}")
+
+    accounts = list(zip(private_keys, nonces))
+    shards = [accounts[i::workers] for i in range(workers) if accounts[i::workers]]
+    value_wei = Web3.to_wei(value_eth, 'ether')
+
+    with ProcessPoolExecutor(max_workers=len(shards)) as executor:
+        futures = [
+            executor.submit(
+                run_shard, rpc_url, shard, to_address, value_wei, count_per_account, gas_price, chain_id, batch_size
+            )
+            for shard in shards
+        ]
+        results = [future.result() for future in futures]
+
+    print_results(results)
+    return results
+
+
+def print_results(results):
+    signed = sum(result['signed'] for result in results)
+    accepted = sum(len(result['accepted']) for result in results)
+    errors = sum((result['errors'] for result in results), Counter())
+    duration = max(result['finished_at'] for result in results) - min(result['started_at'] for result in results)
+
+    print(f"Signed {signed} transactions ({max(result['sign_duration'] for result in results):.2f}s in the slowest shard)")
+    print(f"Submitted {signed} transactions in {duration:.2f}s ({signed / duration:.1f} tx/s)")
+    # NOTE: this is the rate at which the node accepted the transactions into its mempool, not the inclusion rate
+    print(f"Accepted: {accepted} ({accepted / duration:.1f} tx/s accepted), rejected: {sum(errors.values())}")
+    for message, count in errors.most_common():
+        print(f"  {count:>6}x {message}")
+
+
+def track_inclusion(tracker, results, timeout):
+    # The tracker measures the latencies with the performance counter of this process
+    offset = time.perf_counter() - time.time()
+    for result in results:
+        for tx_hash, submitted_at in result['accepted']:
+            tracker.track(tx_hash, submitted_at + offset)
+
+    print("\nWaiting for the transactions to be included...")
+    tracker.wait(timeout=timeout)
+    tracker.stop()
+    tracker.print_summary()
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Generate load from many accounts across worker processes")
+    parser.add_argument('-a', '--accounts', type=int, default=16, help="Number of accounts to derive from MNEMONIC")
+    parser.add_argument('--keys-file', help="File with one private key per line (instead of MNEMONIC)")
+    parser.add_argument('-n', '--count', type=int, default=100, help="Number of transactions per account")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(), help="Number of worker processes")
+    parser.add_argument('--batch-size', type=int, default=100, help="Transactions per JSON-RPC batch")
+    parser.add_argument('--value', type=float, default=0.00000001, help="Amount to send per transaction in ETH")
+    parser.add_argument('--no-track', action='store_true', help="Don't wait for the transactions to be included")
+    parser.add_argument('--timeout', type=float, default=120, help="Seconds to wait for the transactions to be included")
+    parser.add_argument('--stub', action='store_true', help="Run against a local stub node with random accounts")
+    args = parser.parse_args()
+
+    if args.stub:
+        rpc_url = start_stub_node(block_time=1.0).url
+        private_keys = [Account.create().key.hex() for _ in range(args.accounts)]
+    else:
+        rpc_url = os.getenv('RPC_URL', 'http://localhost:8545')
+        if args.keys_file:
+            private_keys = load_keys(args.keys_file)
+        elif os.getenv('MNEMONIC'):
+            private_keys = derive_accounts(os.getenv('MNEMONIC'), args.accounts)
+        else:
+            raise ValueError("Please set MNEMONIC in your .env file or pass --keys-file")
+
+    to_address = os.getenv('TO_ADDRESS', '0x742d35Cc6634C0532925a3b844Bc454e4438f44e')
+
+    tracker = ReceiptTracker(create_session(pool_size=1), rpc_url)
+    if not args.no_track:
+        tracker.start()
+
+    results = run_sharded_load(rpc_url, private_keys, to_address, args.value, args.count, args.workers, args.batch_size)
+    if not args.no_track:
+        track_inclusion(tracker, results, args.timeout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+A minimal local JSON-RPC node, that can be used instead of a live chain to run the scripts in CI.
+
+It accepts raw transactions into an in-memory mempool and rejects transactions,
+that it has already seen, with the same `already known` error as geth-based nodes.
+If a block time is given, a block with all pending transactions is produced in the background at that interval.
+The transaction hash is the SHA-256 hash of the raw transaction, because the
+standard library has no Keccak implementation, so the stub doesn't decode transactions at all.
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHAIN_ID = 1337
+GAS_PRICE = 10 ** 9
+
+
+class StubChain:
+    """
+    In-memory state of the stub node.
+    """
+
+    def __init__(self, chain_id=CHAIN_ID, gas_price=GAS_PRICE):
+        self.chain_id = chain_id
+        self.gas_price = gas_price
+        self.lock = threading.Lock()
+        self.mempool = {}
+        self.known = set()
+        self.blocks = [[]]
+        self.receipts = {}
+
+    def send_raw_transaction(self, raw_tx):
+        raw_tx = raw_tx[2:] if raw_tx.startswith('0x') else raw_tx
+        tx_hash = '0x' + hashlib.sha256(bytes.fromhex(raw_tx)).hexdigest()
+        with self.lock:
+            if tx_hash in self.known:
+                raise ValueError('already known')
+            self.known.add(tx_hash)
+            self.mempool[tx_hash] = raw_tx
+
+        return tx_hash
+
+    def mine_block(self):
+        """
+        Include all pending transactions in a new block and return its number.
+        """
+        with self.lock:
+            number = len(self.blocks)
+            self.blocks.append(list(self.mempool))
+            for tx_hash in self.mempool:
+                self.receipts[tx_hash] = {'transactionHash': tx_hash, 'blockNumber': hex(number), 'status': '0x1'}
+            self.mempool = {}
+
+        return number
+
+    def get_block(self, number, full_transactions):
+        with self.lock:
+            number = len(self.blocks) - 1 if number == 'latest' else int(number, 16)
+            if number >= len(self.blocks):
+                return None
+            tx_hashes = self.blocks[number]
+
+        transactions = [
+            {'hash': tx_hash, 'blockNumber': hex(number)} if full_transactions else tx_hash
+            for tx_hash in tx_hashes
+        ]
+        return {'number': hex(number), 'transactions': transactions}
+
+    def methods(self):
+        """
+        Returns the handlers of the supported JSON-RPC methods, which take the params of the call.
+        """
+        return {
+            'eth_sendRawTransaction': lambda params: self.send_raw_transaction(params[0]),
+            'eth_blockNumber': lambda params: hex(len(self.blocks) - 1),
+            'eth_getBlockByNumber': lambda params: self.get_block(params[0], params[1]),
+            'eth_getTransactionReceipt': lambda params: self.receipts.get(params[0]),
+            'eth_chainId': lambda params: hex(self.chain_id),
+            'eth_gasPrice': lambda params: hex(self.gas_price),
+            'eth_getTransactionCount': lambda params: hex(0),
+        }
+
+
+class JsonRpcHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Disabling Nagle's algorithm avoids delayed ACKs adding ~40ms to each keep-alive request
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        if isinstance(request, list):
+            response = [self.server.dispatch(entry) for entry in request]
+        else:
+            response = self.server.dispatch(request)
+
+        body = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubNode(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, chain=None):
+        super().__init__(address, JsonRpcHandler)
+        self.chain = chain or StubChain()
+        self.methods = self.chain.methods()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def dispatch(self, request):
+        response = {'jsonrpc': '2.0', 'id': request.get('id')}
+        method = self.methods.get(request.get('method'))
+        if method is None:
+            # Same error as geth-based nodes return for unknown methods
+            message = f"the method {request.get('method')} does not exist/is not available"
+            response['error'] = {'code': -32601, 'message': message}
+            return response
+
+        try:
+            response['result'] = method(request.get('params', []))
+        except ValueError as e:
+            response['error'] = {'code': -32000, 'message': str(e)}
+
+        return response
+
+
+def produce_blocks(chain, block_time):
+    while True:
+        time.sleep(block_time)
+        chain.mine_block()
+
+
+def start_stub_node(port=0, chain=None, block_time=None):
+    """
+    Start the stub node in a background thread.
+
+    Args:
+        port (int): Port to listen on (0 picks a free port)
+        chain (StubChain): State of the node (a new one is created if not given)
+        block_time (float): Interval in seconds to produce blocks at (no blocks are produced if not given)
+
+    Returns:
+        StubNode: The running server, whose `url` is the JSON-RPC endpoint
+    """
+    server = StubNode(('127.0.0.1', port), chain)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    if block_time:
+        threading.Thread(target=produce_blocks, args=(server.chain, block_time), daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run a local JSON-RPC stub node")
+    parser.add_argument('--port', type=int, default=8545, help="Port to listen on")
+    parser.add_argument('--block-time', type=float, default=1.0, help="Interval in seconds to produce blocks at")
+    args = parser.parse_args()
+
+    server = StubNode(('127.0.0.1', args.port))
+    threading.Thread(target=produce_blocks, args=(server.chain, args.block_time), daemon=True).start()
+    print(f"Stub node listening on {server.url}")
+    server.serve_forever()
@@ -0,0 +1,73 @@
+"""
+Run the race harness against the local stub node, so that it can be checked in CI without a chain.
+"""
+import os
+import threading
+import time
+
+import pytest
+
+requests = pytest.importorskip('requests')
+
+from json_rpc import batch_call, create_session
+from race_harness import print_results, race_submissions
+from stub_node import StubNode, start_stub_node
+
+
+def random_raw_tx():
+    return '0x' + os.urandom(110).hex()
+
+
+def test_race_accepts_exactly_one_submission():
+    server = start_stub_node()
+    try:
+        results = race_submissions(server.url, random_raw_tx(), workers=8)
+    finally:
+        server.shutdown()
+
+    assert len(results) == 8
+    assert sum(result['accepted'] for result in results) == 1
+    assert {result['message'] for result in results if not result['accepted']} == {'already known'}
+    assert print_results(results)
+
+
+class FlakyStubNode(StubNode):
+    """Stub node, that drops the connection of the first request instead of answering it."""
+
+    def __init__(self, address):
+        super().__init__(address)
+        self.failed = threading.Event()
+
+    def dispatch(self, request):
+        if not self.failed.is_set():
+            self.failed.set()
+            raise RuntimeError('dropping the connection')
+        return super().dispatch(request)
+
+    def handle_error(self, request, client_address):
+        pass
+
+
+def test_race_raises_the_connection_error_instead_of_waiting():
+    server = FlakyStubNode(('127.0.0.1', 0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        start = time.perf_counter()
+        with pytest.raises(requests.exceptions.ConnectionError):
+            race_submissions(server.url, random_raw_tx(), workers=4, connect_timeout=60)
+    finally:
+        server.shutdown()
+
+    # The other workers are released by the failing one, instead of waiting for the timeout
+    assert time.perf_counter() - start < 10
+
+
+def test_stub_node_rejects_unsupported_methods():
+    server = start_stub_node()
+    try:
+        responses = batch_call(create_session(pool_size=1), server.url, [('eth_chainId', []), ('eth_call', [])])
+    finally:
+        server.shutdown()
+
+    assert responses[0]['result'] == hex(1337)
+    assert responses[1]['error'] == {'code': -32601, 'message': 'the method eth_call does not exist/is not available'}
@@ -0,0 +1,71 @@
+"""
+Track the inclusion of transactions in the blocks of the local stub node.
+"""
+import os
+import time
+
+import pytest
+
+pytest.importorskip('requests')
+
+from json_rpc import call, create_session
+from receipt_tracker import ReceiptTracker
+from stub_node import start_stub_node
+
+
+def random_raw_tx():
+    return '0x' + os.urandom(110).hex()
+
+
+def test_latency_does_not_include_the_submission_of_later_transactions():
+    server = start_stub_node(block_time=0.05)
+    session = create_session(pool_size=1)
+    tracker = ReceiptTracker(create_session(pool_size=1), server.url, poll_interval=0.02)
+    try:
+        tracker.start()
+        submissions = []
+        start = time.perf_counter()
+        for _ in range(10):
+            submitted_at = time.perf_counter()
+            submissions.append((call(session, server.url, 'eth_sendRawTransaction', [random_raw_tx()]), submitted_at))
+            time.sleep(0.1)
+        submission_duration = time.perf_counter() - start
+
+        # NOTE: the transactions are tracked after all of them were submitted, like in the load mode
+        for tx_hash, submitted_at in submissions:
+            tracker.track(tx_hash, submitted_at)
+        assert tracker.wait(timeout=10)
+    finally:
+        tracker.stop()
+        server.shutdown()
+
+    latencies = [entry['latency'] for entry in tracker.included.values()]
+    assert len(latencies) == 10
+    assert submission_duration >= 1
+    assert max(latencies) < 0.5
+    assert {entry['status'] for entry in tracker.included.values()} == {1}
+
+
+def test_inclusion_throughput_follows_the_submission_rate():
+    server = start_stub_node(block_time=0.1)
+    session = create_session(pool_size=1)
+    tracker = ReceiptTracker(create_session(pool_size=1), server.url, poll_interval=0.02)
+    try:
+        tracker.start()
+        submissions = []
+        for _ in range(50):
+            submitted_at = time.perf_counter()
+            submissions.append((call(session, server.url, 'eth_sendRawTransaction', [random_raw_tx()]), submitted_at))
+            time.sleep(0.02)
+
+        for tx_hash, submitted_at in submissions:
+            tracker.track(tx_hash, submitted_at)
+        assert tracker.wait(timeout=10)
+    finally:
+        tracker.stop()
+        server.shutdown()
+
+    # NOTE: the transactions are submitted at up to 50 tx/s and included in blocks every 0.1s,
+    # so every block is observed separately instead of all of them at the end of the submission
+    assert len({entry['block'] for entry in tracker.included.values()}) >= 5
+    assert 20 < tracker.inclusion_throughput() < 80
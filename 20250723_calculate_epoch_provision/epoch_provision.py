@@ -7,6 +7,9 @@ target from 66% to 33%, which can be found at:
 https://www.notion.so/evmos/Decrease-bonding-target-0e05fea889a84ca8b408b173039fa8c6
 """
 
+from dataclasses import dataclass
+from functools import lru_cache
+
 # Bonding parameters
 BONDED_RATIO = 127.05 / 371.84  # see on mintscan.io/evmos dashboard
 MAX_VARIANCE = 0.4
@@ -15,6 +18,7 @@ MAX_VARIANCE = 0.4
 A = 300_000_000
 C = 9_375_000
 R = 0.5
+EPOCHS_PER_PERIOD = 365  # one epoch per day and one period per year
 
 # Distribution constants
 STAKING_RATIO = 0.533333333
@@ -27,8 +31,60 @@ def exp_decay(period: int) -> float:
     return A * (1 - R) ** period + C
 
 
-def bonding_incentive(bonding_target: float) -> float:
-    return 1 + MAX_VARIANCE - BONDED_RATIO * (MAX_VARIANCE / bonding_target)
+def bonding_incentive(
+    bonding_target: float,
+    bonded_ratio: float = BONDED_RATIO,
+    max_variance: float = MAX_VARIANCE,
+) -> float:
+    # NOTE: this also works element-wise for NumPy arrays, which is used in sweep.py
+    return 1 + max_variance - bonded_ratio * (max_variance / bonding_target)
+
+
+@dataclass(frozen=True)
+class ProvisionParams:
+    bonding_target: float
+    bonded_ratio: float = BONDED_RATIO
+    max_variance: float = MAX_VARIANCE
+    a: float = A
+    c: float = C
+    r: float = R
+    staking_ratio: float = STAKING_RATIO
+    epochs_per_period: int = EPOCHS_PER_PERIOD
+
+
+@lru_cache(maxsize=None)
+def projection_factor(params: ProvisionParams) -> float:
+    """Returns the share of the decayed provision, that is minted as staking provision per epoch."""
+    incentive = bonding_incentive(params.bonding_target, params.bonded_ratio, params.max_variance)
+    return params.staking_ratio * incentive / params.epochs_per_period
+
+
+def decay_sum(n_periods: int, params: ProvisionParams) -> float:
+    """Returns the sum of the decayed provisions of the first n periods using the geometric series."""
+    decay = 1 - params.r
+    if decay == 1:
+        return (params.a + params.c) * n_periods
+
+    return params.a * (1 - decay ** n_periods) / (1 - decay) + params.c * n_periods
+
+
+@lru_cache(maxsize=4096)
+def cumulative_staking_provision(epoch: int, params: ProvisionParams) -> float:
+    """Returns the total staking provision minted in the epochs before the given epoch in O(1)."""
+    full_periods, remaining_epochs = divmod(epoch, params.epochs_per_period)
+    current_period_provision = params.a * (1 - params.r) ** full_periods + params.c
+
+    total = decay_sum(full_periods, params) * params.epochs_per_period + remaining_epochs * current_period_provision
+    return projection_factor(params) * total
+
+
+def staking_provision_between(start_epoch: int, end_epoch: int, params: ProvisionParams) -> float:
+    """Returns the staking provision minted from the start epoch up to (excluding) the end epoch."""
+    return cumulative_staking_provision(end_epoch, params) - cumulative_staking_provision(start_epoch, params)
+
+
+def epoch_staking_provision(epoch: int, params: ProvisionParams) -> float:
+    return staking_provision_between(epoch, epoch + 1, params)
 
 
 def calculate_provision_for_bonding_target(bonding_target: int):
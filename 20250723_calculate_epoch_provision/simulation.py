@@ -0,0 +1,159 @@
+"""
+This script simulates the distribution of the staking provisions on Evmos
+for random paths of the bonded ratio, instead of the single snapshot in epoch_provision.py.
+
+The bonded ratio follows a random walk in logit space, so that it stays between 0 and 1.
+The paths are generated in vectorized batches, which are spread across a process pool.
+Each batch has its own seed derived from the given seed, so the results only depend on
+the seed and the number of paths, but not on the number of workers.
+
+Instead of returning the paths, each worker reduces them to a histogram per epoch of the deviation
+of the logit from its start, in units of its standard deviation. The histograms of all workers are added up
+and the percentile bands are interpolated from them, which is accurate to a fraction of the bin width.
+
+Requires numpy.
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from epoch_provision import BONDED_RATIO, EPOCHS_PER_PERIOD, STAKING_RATIO, bonding_incentive, exp_decay
+
+
+PERCENTILES = (5, 25, 50, 75, 95)
+# The histograms cover the deviations up to this many standard deviations, larger ones are counted in the outer bins
+HISTOGRAM_RANGE = 6.0
+HISTOGRAM_BINS = 1024
+
+
+# -----------------
+# Functions
+#
+def simulate_logits(
+    seed: np.random.SeedSequence,
+    n_paths: int,
+    n_epochs: int,
+    initial_ratio: float = BONDED_RATIO,
+    volatility: float = 0.02,
+) -> np.ndarray:
+    """Returns the logits of the bonded ratio per epoch with the shape (paths, epochs) for a batch of random paths."""
+    rng = np.random.default_rng(seed)
+    steps = rng.normal(0.0, volatility, size=(n_paths, n_epochs))
+    return np.log(initial_ratio / (1 - initial_ratio)) + np.cumsum(steps, axis=1)
+
+
+def epoch_provisions(bonding_target: float, logits: np.ndarray) -> np.ndarray:
+    """Returns the staking provision for the given logits of the bonded ratio, whose last axis are the epochs."""
+    bonded_ratios = 1 / (1 + np.exp(-logits))
+    periods = np.arange(logits.shape[-1]) // EPOCHS_PER_PERIOD
+
+    return STAKING_RATIO * exp_decay(periods) / EPOCHS_PER_PERIOD * bonding_incentive(bonding_target, bonded_ratios)
+
+
+def deviation_scale(n_epochs: int, volatility: float) -> np.ndarray:
+    """Returns the standard deviation of the logit per epoch, which is the sum of the normal steps up to it."""
+    return volatility * np.sqrt(np.arange(1, n_epochs + 1))
+
+
+def histogram_batches(seeds, batch_sizes, n_epochs: int, initial_ratio: float, volatility: float) -> np.ndarray:
+    """
+    Simulates the given batches and returns the number of paths per epoch and deviation bin
+    with the shape (epochs, bins), so that only the histograms have to be sent back from the worker.
+    """
+    scale = deviation_scale(n_epochs, volatility)
+    offsets = np.arange(n_epochs) * HISTOGRAM_BINS
+    counts = np.zeros(n_epochs * HISTOGRAM_BINS, dtype=np.int64)
+    for seed, n_paths in zip(seeds, batch_sizes):
+        deviations = simulate_logits(seed, n_paths, n_epochs, initial_ratio, volatility) - np.log(
+            initial_ratio / (1 - initial_ratio)
+        )
+        z = np.divide(deviations, scale, out=np.zeros_like(deviations), where=scale > 0)
+        bins = ((z + HISTOGRAM_RANGE) * (HISTOGRAM_BINS / (2 * HISTOGRAM_RANGE))).astype(np.int64)
+        counts += np.bincount((np.clip(bins, 0, HISTOGRAM_BINS - 1) + offsets).ravel(), minlength=counts.size)
+
+    return counts.reshape(n_epochs, HISTOGRAM_BINS)
+
+
+def histogram_percentiles(counts: np.ndarray, percentiles) -> np.ndarray:
+    """Interpolates the given percentiles of the deviations from the histograms with the shape (percentiles, epochs)."""
+    cumulative = np.cumsum(counts, axis=1)
+    bin_width = 2 * HISTOGRAM_RANGE / HISTOGRAM_BINS
+    bands = []
+    for percentile in percentiles:
+        target = cumulative[:, -1] * (percentile / 100)
+        bins = np.minimum((cumulative < target[:, None]).sum(axis=1), HISTOGRAM_BINS - 1)
+        below = np.take_along_axis(cumulative, bins[:, None], axis=1)[:, 0] - counts[np.arange(len(bins)), bins]
+        fraction = (target - below) / np.maximum(counts[np.arange(len(bins)), bins], 1)
+        bands.append(-HISTOGRAM_RANGE + (bins + fraction) * bin_width)
+
+    return np.array(bands)
+
+
+def simulate(
+    bonding_target: float,
+    n_paths: int = 10_000,
+    n_epochs: int = 4 * EPOCHS_PER_PERIOD,
+    seed: int = 0,
+    batch_size: int = 1_000,
+    workers: int = 1,
+    volatility: float = 0.02,
+    percentiles=PERCENTILES,
+    initial_ratio: float = BONDED_RATIO,
+) -> np.ndarray:
+    """
+    Simulates the given number of bonded ratio paths and returns
+    the percentile bands of the staking provision with the shape (percentiles, epochs).
+    """
+    batch_sizes = [min(batch_size, n_paths - start) for start in range(0, n_paths, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(batch_sizes))
+    # NOTE: each worker gets one chunk of the batches, so that it only returns one histogram
+    chunks = [range(i, len(seeds), workers) for i in range(min(workers, len(seeds)))]
+    arguments = (
+        [[seeds[i] for i in chunk] for chunk in chunks],
+        [[batch_sizes[i] for i in chunk] for chunk in chunks],
+        [n_epochs] * len(chunks),
+        [initial_ratio] * len(chunks),
+        [volatility] * len(chunks),
+    )
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            counts = sum(executor.map(histogram_batches, *arguments))
+    else:
+        counts = sum(map(histogram_batches, *arguments))
+
+    # NOTE: the provision decreases with the bonded ratio, so its lower percentiles are at the upper deviations
+    deviations = histogram_percentiles(counts, [100 - percentile for percentile in percentiles])
+    logits = np.log(initial_ratio / (1 - initial_ratio)) + deviations * deviation_scale(n_epochs, volatility)
+    return epoch_provisions(bonding_target, logits)
+
+
+# -----------------
+# Execution
+#
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate the staking provisions for random bonded ratio paths.")
+    parser.add_argument("--bonding-target", type=float, default=0.33)
+    parser.add_argument("--paths", type=int, default=10_000)
+    parser.add_argument("--epochs", type=int, default=4 * EPOCHS_PER_PERIOD)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--volatility", type=float, default=0.02, help="Standard deviation of the daily logit steps")
+    parser.add_argument("--initial-ratio", type=float, default=BONDED_RATIO, help="Bonded ratio at the first epoch")
+    args = parser.parse_args()
+
+    bands = simulate(
+        args.bonding_target,
+        args.paths,
+        args.epochs,
+        args.seed,
+        workers=args.workers,
+        volatility=args.volatility,
+        initial_ratio=args.initial_ratio,
+    )
+
+    print("epoch " + " ".join(f"p{percentile:>11}" for percentile in PERCENTILES))
+    for epoch in range(0, args.epochs, EPOCHS_PER_PERIOD // 12):
+        print(f"{epoch:>5} " + " ".join(f"{value:>12.0f}" for value in bands[:, epoch]))
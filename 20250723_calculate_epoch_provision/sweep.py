@@ -0,0 +1,101 @@
+"""
+This script calculates the staking provisions for a full grid of bonding targets,
+bonded ratios, maximum variances and periods in one call.
+
+Instead of looping over all combinations in Python, each parameter gets its own
+axis and NumPy broadcasting evaluates `exp_decay` and `bonding_incentive` for the
+whole grid at once.
+
+Requires numpy, as well as pyarrow for exporting to Parquet.
+"""
+
+import argparse
+
+import numpy as np
+
+from epoch_provision import BONDED_RATIO, MAX_VARIANCE, STAKING_RATIO, bonding_incentive, exp_decay
+
+
+COLUMNS = ("bonding_target", "bonded_ratio", "max_variance", "period", "staking_provision")
+
+
+# -----------------
+# Functions
+#
+def sweep(
+    bonding_targets,
+    bonded_ratios=(BONDED_RATIO,),
+    max_variances=(MAX_VARIANCE,),
+    periods=range(4),
+) -> np.ndarray:
+    """
+    Returns the staking provisions with the shape
+    (bonding targets, bonded ratios, max variances, periods).
+    """
+    targets = np.asarray(bonding_targets, dtype=float)[:, None, None, None]
+    ratios = np.asarray(bonded_ratios, dtype=float)[None, :, None, None]
+    variances = np.asarray(max_variances, dtype=float)[None, None, :, None]
+    periods = np.asarray(periods, dtype=float)[None, None, None, :]
+
+    return STAKING_RATIO * exp_decay(periods) * bonding_incentive(targets, ratios, variances)
+
+
+def sweep_table(
+    bonding_targets,
+    bonded_ratios=(BONDED_RATIO,),
+    max_variances=(MAX_VARIANCE,),
+    periods=range(4),
+) -> dict:
+    """Returns the sweep as a table with one column array per parameter and one row per grid point."""
+    provisions = sweep(bonding_targets, bonded_ratios, max_variances, periods)
+    axes = np.meshgrid(
+        np.asarray(bonding_targets, dtype=float),
+        np.asarray(bonded_ratios, dtype=float),
+        np.asarray(max_variances, dtype=float),
+        np.asarray(periods),
+        indexing="ij",
+        sparse=True,
+    )
+
+    columns = [np.broadcast_to(axis, provisions.shape).ravel() for axis in axes] + [provisions.ravel()]
+    return dict(zip(COLUMNS, columns))
+
+
+def to_csv(table: dict, path: str):
+    np.savetxt(
+        path,
+        np.column_stack([table[column] for column in COLUMNS]),
+        delimiter=",",
+        header=",".join(COLUMNS),
+        comments="",
+        fmt=["%.6g", "%.6g", "%.6g", "%d", "%.2f"],
+    )
+
+
+def to_parquet(table: dict, path: str):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    pq.write_table(pa.table(table), path)
+
+
+# -----------------
+# Execution
+#
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep the staking provision over a grid of parameters.")
+    parser.add_argument("--bonding-targets", type=float, nargs="+", default=[0.33, 0.66])
+    parser.add_argument("--bonded-ratios", type=float, nargs="+", default=[BONDED_RATIO])
+    parser.add_argument("--max-variances", type=float, nargs="+", default=[MAX_VARIANCE])
+    parser.add_argument("--periods", type=int, default=4, help="Number of periods, starting at 0")
+    parser.add_argument("--output", help="Write the table to this .csv or .parquet file instead of printing it")
+    args = parser.parse_args()
+
+    table = sweep_table(args.bonding_targets, args.bonded_ratios, args.max_variances, range(args.periods))
+    if args.output is None:
+        for row in zip(*(table[column] for column in COLUMNS)):
+            print(" ".join(f"{value:.6g}" for value in row[:-1]), round(row[-1]))
+    elif args.output.endswith(".parquet"):
+        to_parquet(table, args.output)
+    else:
+        to_csv(table, args.output)
@@ -0,0 +1,52 @@
+import pytest
+
+from epoch_provision import (
+    STAKING_RATIO,
+    ProvisionParams,
+    bonding_incentive,
+    cumulative_staking_provision,
+    decay_sum,
+    epoch_staking_provision,
+    exp_decay,
+    projection_factor,
+    staking_provision_between,
+)
+
+
+def summed_staking_provision(epoch: int, params: ProvisionParams) -> float:
+    """Sums the staking provision epoch by epoch, which the closed form has to match."""
+    total = 0.0
+    for current in range(epoch):
+        period_provision = params.a * (1 - params.r) ** (current // params.epochs_per_period) + params.c
+        total += projection_factor(params) * period_provision
+    return total
+
+
+@pytest.mark.parametrize("params", [
+    ProvisionParams(0.33),
+    ProvisionParams(0.66, bonded_ratio=0.5, epochs_per_period=7),
+    ProvisionParams(0.5, r=0.0, epochs_per_period=3),
+])
+def test_closed_form_matches_the_sum_over_epochs(params):
+    for epoch in [0, 1, params.epochs_per_period - 1, params.epochs_per_period, 3 * params.epochs_per_period + 2]:
+        expected = summed_staking_provision(epoch, params)
+        assert cumulative_staking_provision(epoch, params) == pytest.approx(expected)
+        assert sum(epoch_staking_provision(current, params) for current in range(epoch)) == pytest.approx(expected)
+
+
+def test_staking_provision_between_is_the_difference_of_the_totals():
+    params = ProvisionParams(0.33)
+    assert staking_provision_between(100, 800, params) == pytest.approx(
+        summed_staking_provision(800, params) - summed_staking_provision(100, params)
+    )
+
+
+def test_decay_sum_without_decay():
+    params = ProvisionParams(0.33, r=0.0)
+    assert decay_sum(4, params) == pytest.approx(4 * (params.a + params.c))
+
+
+def test_epoch_provisions_add_up_to_the_period_provision():
+    params = ProvisionParams(0.33)
+    period_provision = sum(epoch_staking_provision(epoch, params) for epoch in range(params.epochs_per_period))
+    assert period_provision == pytest.approx(STAKING_RATIO * exp_decay(0) * bonding_incentive(0.33))
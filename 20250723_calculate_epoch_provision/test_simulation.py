@@ -0,0 +1,30 @@
+import pytest
+
+from epoch_provision import STAKING_RATIO, bonding_incentive, exp_decay
+
+np = pytest.importorskip("numpy")
+
+from simulation import EPOCHS_PER_PERIOD, PERCENTILES, simulate  # noqa: E402
+
+
+def test_simulation_is_reproducible_for_a_seed():
+    bands = simulate(0.33, n_paths=300, n_epochs=40, seed=7, batch_size=50)
+
+    assert bands.shape == (len(PERCENTILES), 40)
+    assert np.array_equal(bands, simulate(0.33, n_paths=300, n_epochs=40, seed=7, batch_size=50))
+    # The batches have their own seeds, so the number of workers doesn't change the results
+    assert np.array_equal(bands, simulate(0.33, n_paths=300, n_epochs=40, seed=7, batch_size=50, workers=2))
+    assert not np.array_equal(bands, simulate(0.33, n_paths=300, n_epochs=40, seed=8, batch_size=50))
+
+
+def test_simulation_bands_are_ordered():
+    bands = simulate(0.33, n_paths=500, n_epochs=2 * EPOCHS_PER_PERIOD, seed=0, batch_size=100)
+
+    assert np.all(np.diff(bands, axis=0) >= 0)
+
+
+def test_simulation_starts_at_the_initial_ratio():
+    bands = simulate(0.33, n_paths=10, n_epochs=3, volatility=0.0, initial_ratio=0.5)
+
+    expected = STAKING_RATIO * exp_decay(0) / EPOCHS_PER_PERIOD * bonding_incentive(0.33, 0.5)
+    assert bands == pytest.approx(np.full((len(PERCENTILES), 3), expected))
@@ -0,0 +1,35 @@
+import pytest
+
+from epoch_provision import STAKING_RATIO, bonding_incentive, exp_decay
+
+np = pytest.importorskip("numpy")
+
+from sweep import COLUMNS, sweep, sweep_table  # noqa: E402
+
+
+BONDING_TARGETS = [0.33, 0.66]
+BONDED_RATIOS = [0.2, 0.5, 0.8]
+MAX_VARIANCES = [0.2, 0.4]
+PERIODS = range(3)
+
+
+def test_sweep_matches_the_scalar_calculation():
+    provisions = sweep(BONDING_TARGETS, BONDED_RATIOS, MAX_VARIANCES, PERIODS)
+
+    assert provisions.shape == (2, 3, 2, 3)
+    for i, target in enumerate(BONDING_TARGETS):
+        for j, ratio in enumerate(BONDED_RATIOS):
+            for k, variance in enumerate(MAX_VARIANCES):
+                for period in PERIODS:
+                    expected = STAKING_RATIO * exp_decay(period) * bonding_incentive(target, ratio, variance)
+                    assert provisions[i, j, k, period] == pytest.approx(expected)
+
+
+def test_sweep_table_has_one_row_per_grid_point():
+    table = sweep_table(BONDING_TARGETS, BONDED_RATIOS, MAX_VARIANCES, PERIODS)
+
+    assert list(table) == list(COLUMNS)
+    assert all(len(column) == 2 * 3 * 2 * 3 for column in table.values())
+    for target, ratio, variance, period, provision in zip(*(table[column] for column in COLUMNS)):
+        expected = STAKING_RATIO * exp_decay(period) * bonding_incentive(target, ratio, variance)
+        assert provision == pytest.approx(expected)
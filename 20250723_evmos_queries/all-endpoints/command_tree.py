@@ -0,0 +1,162 @@
+"""
+This module discovers the query command tree of an Evmos binary
+by recursively parsing the output of `evmosd q <module> --help`.
+
+Discovering the tree takes a few hundred process spawns, so it is stored
+in a cache, that is keyed by the SHA-256 hash of the binary's content.
+Later runs against the same binary load the tree without calling it.
+"""
+
+# -------------------------
+# Imports
+#
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import sys
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+# -------------------------
+# Globals
+#
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+# NOTE: these are added to every command by cobra and are no queries
+IGNORED_COMMANDS = {"help", "completion"}
+DEFAULT_TIMEOUT = 30.0
+
+
+# -------------------------
+# Functions
+#
+def parse_help(help_text: str, depth: int) -> Tuple[List[str], List[str]]:
+    """
+    Parses the help output of a command, that is `depth` levels below `evmosd query`,
+    and returns the names of its subcommands and the positional arguments from its usage line.
+    """
+    subcommands: List[str] = []
+    args: List[str] = []
+    section = None
+    for line in help_text.splitlines():
+        if not line.strip():
+            section = None
+        elif not line.startswith(" "):
+            section = line.strip()
+        elif section == "Available Commands:":
+            name = line.split()[0]
+            if name not in IGNORED_COMMANDS:
+                subcommands.append(name)
+        elif section == "Usage:" and not args:
+            # NOTE: the usage line starts with the binary, `query` and the path of the command,
+            # so everything after it, except for the flags, are the arguments.
+            words = line.split()[2 + depth:]
+            if words != ["[command]"]:
+                args = [word for word in words if word != "[flags]"]
+
+    return subcommands, args
+
+
+async def get_help(binary: str, path: List[str], semaphore: asyncio.Semaphore, timeout: float) -> Optional[str]:
+    """Returns the help output of the command at the given path or None, if the call failed or timed out."""
+    async with semaphore:
+        process = await asyncio.create_subprocess_exec(
+            binary, "q", *path, "--help",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        try:
+            stdout, _ = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            return None
+
+    if process.returncode != 0:
+        return None
+    return stdout.decode(errors="replace")
+
+
+async def discover_node(binary: str, path: List[str], semaphore: asyncio.Semaphore, timeout: float,
+                        failed: List[List[str]]) -> Optional[dict]:
+    """
+    Returns the node of the command at the given path with all of its subcommands.
+    Commands, whose help could not be read, are added to `failed` and left out of the tree.
+    """
+    help_text = await get_help(binary, path, semaphore, timeout)
+    if help_text is None:
+        failed.append(path)
+        return None
+
+    subcommands, args = parse_help(help_text, len(path))
+    children = await asyncio.gather(*(
+        discover_node(binary, path + [name], semaphore, timeout, failed) for name in subcommands
+    ))
+
+    return {
+        "args": args,
+        "subcommands": {name: child for name, child in zip(subcommands, children) if child is not None},
+    }
+
+
+def hash_binary(binary_path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(binary_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha256.update(chunk)
+
+    return sha256.hexdigest()
+
+
+def discover_command_tree(binary: str = "evmosd", jobs: int = 16, cache_dir: str = CACHE_DIR,
+                          timeout: float = DEFAULT_TIMEOUT) -> dict:
+    """
+    Returns the query command tree of the given binary, where each node holds the arguments
+    from its usage line and its subcommands, e.g. `{"args": [], "subcommands": {"evm": {...}}}`.
+
+    Commands, whose help fails or takes longer than `timeout` seconds, are left out of the tree.
+    The tree is then incomplete, so it is not cached and discovered again on the next run.
+    """
+    binary_path = shutil.which(binary)
+    if binary_path is None:
+        raise FileNotFoundError(f"binary not found: {binary}")
+
+    cache_path = os.path.join(cache_dir, f"command_tree_{hash_binary(binary_path)}.json")
+    if os.path.exists(cache_path):
+        with open(cache_path, "r") as f:
+            return json.load(f)
+
+    failed: List[List[str]] = []
+
+    async def discover() -> Optional[dict]:
+        return await discover_node(binary_path, [], asyncio.Semaphore(jobs), timeout, failed)
+
+    tree = asyncio.run(discover()) or {"args": [], "subcommands": {}}
+    if failed:
+        for path in failed:
+            print(f"Could not get the help of `{' '.join([binary, 'q', *path])}`", file=sys.stderr)
+        return tree
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(tree, f, indent=2)
+    os.replace(tmp_path, cache_path)
+
+    return tree
+
+
+def iterate_leaves(tree: dict, path: List[str] | None = None) -> Iterator[Tuple[List[str], List[str]]]:
+    """Yields the path and arguments of all commands in the tree, that have no subcommands."""
+    path = path or []
+    if not tree["subcommands"]:
+        yield path, tree["args"]
+        return
+
+    for name, node in tree["subcommands"].items():
+        yield from iterate_leaves(node, path + [name])
+
+
+def get_no_argument_queries(tree: dict) -> List[List[str]]:
+    return [path for path, args in iterate_leaves(tree) if path and not args]
@@ -1,36 +1,186 @@
 #!/usr/bin/python3
+"""
+This script runs all Evmos query commands, that do not require passing any arguments,
+and reports the ones that returned an error.
+
+The queries are executed concurrently as subprocesses, where the number of
+queries running at the same time is bounded and each query has a timeout.
+The results are printed as soon as each query finishes.
+
+The queries are taken from the command tree of the binary (see `command_tree.py`),
+falling back to a static list of known queries, if the binary cannot be found.
+"""
+
 # -------------------------
-# Imports 
+# Imports
 #
+import argparse
+import asyncio
 import subprocess
-from typing import List, Tuple
+import time
+from dataclasses import dataclass
+from typing import List
+
+from command_tree import discover_command_tree, get_no_argument_queries
+
+
+# -------------------------
+# Globals
+#
+DEFAULT_JOBS = 16
+DEFAULT_TIMEOUT = 30.0
+
+NO_ARGUMENT_QUERIES = [
+    ["auth", "accounts"],
+    ["auth", "module-accounts"],
+    ["auth", "params"],
+    ["bank", "total"],
+    ["distribution", "community-pool"],
+    ["distribution", "params"],
+    ["epochs", "epoch-infos"],
+    ["erc20", "params"],
+    ["erc20", "token-pairs"],
+    ["evidence", "list"],
+    ["evm", "params"],
+    ["feemarket", "base-fee"],
+    ["feemarket", "block-gas"],
+    ["feemarket", "params"],
+    ["gov", "params"],
+    ["gov", "proposals"],
+    ["ibc", "channel", "channels"],
+    ["ibc", "client", "params"],
+    ["ibc", "client", "states"],
+    ["ibc", "connection", "connections"],
+    ["ibc-transfer", "denom-traces"],
+    ["ibc-transfer", "params"],
+    ["inflation", "circulating-supply"],
+    ["inflation", "epoch-mint-provision"],
+    ["inflation", "inflation-rate"],
+    ["inflation", "params"],
+    ["inflation", "period"],
+    ["inflation", "skipped-epochs"],
+    ["slashing", "params"],
+    ["slashing", "signing-infos"],
+    ["staking", "params"],
+    ["staking", "pool"],
+    ["staking", "validators"],
+    ["upgrade", "plan"],
+]
 
 
 # -------------------------
 # Functions
 #
+@dataclass
+class QueryResult:
+    command: List[str]
+    latency: float
+    error: str
+    timed_out: bool = False
+
+    @property
+    def failed(self) -> bool:
+        return self.timed_out or self.error != ""
+
+
 def execute_system_call_and_return_error(command: List[str] | str) -> bytes:
     """
     This function executes a call to the underlying operating system and
     returns the captured stderr.
     """
 
-    completed_process = subprocess.run(command, stderr=subprocess.PIPE)
-    # TODO: Convert to normal string instead of bytes
+    try:
+        completed_process = subprocess.run(command, stderr=subprocess.PIPE)
+    except FileNotFoundError as e:
+        return f"FileNotFoundError: {e}".encode()
+
+    # TODO: Convert to normal string instead of bytes (run_query already decodes the stderr of the async queries)
     return completed_process.stderr
 
 
+def build_query_commands(binary: str = "evmosd", node: str | None = None,
+                         queries: List[List[str]] = NO_ARGUMENT_QUERIES) -> List[List[str]]:
+    """Returns the full commands for the given queries, optionally run against the given node."""
+    node_flags = ["--node", node] if node else []
+    return [[binary, "q", *query, *node_flags] for query in queries]
+
+
+async def run_query(command: List[str], semaphore: asyncio.Semaphore, timeout: float) -> QueryResult:
+    """Runs the given command as a subprocess and returns its latency and the decoded stderr."""
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        except FileNotFoundError as e:
+            return QueryResult(command, time.perf_counter() - start, f"FileNotFoundError: {e}")
+
+        try:
+            _, stderr = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            return QueryResult(command, time.perf_counter() - start, f"timed out after {timeout}s", timed_out=True)
+
+        return QueryResult(command, time.perf_counter() - start, stderr.decode(errors="replace").strip())
+
+
+async def run_queries(commands: List[List[str]], jobs: int = DEFAULT_JOBS, timeout: float = DEFAULT_TIMEOUT,
+                      on_result=None) -> List[QueryResult]:
+    """
+    Runs all given commands concurrently, with at most `jobs` commands running at the same time.
+    The optional callback is called with each result as soon as the command finishes.
+    """
+    semaphore = asyncio.Semaphore(jobs)
+    tasks = [asyncio.create_task(run_query(command, semaphore, timeout)) for command in commands]
+
+    results = []
+    for next_result in asyncio.as_completed(tasks):
+        result = await next_result
+        if on_result is not None:
+            on_result(result)
+        results.append(result)
+
+    return results
+
+
+def print_result(result: QueryResult):
+    status = "ERROR" if result.failed else "OK"
+    print(f"{status:<5} {result.latency * 1e3:>9.1f} ms  {' '.join(result.command)}")
+    if result.failed:
+        for line in result.error.splitlines():
+            print(f"      {line}")
+
+
 # -------------------------
-# Execution 
+# Execution
 #
-executed_commands = [
-    ["evmosd", "q"],
-]
-queries_with_errors: List[Tuple[str, bytes]] = []
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run all Evmos queries, that do not require any arguments")
+    parser.add_argument("--binary", default="evmosd", help="Binary to run the queries with")
+    parser.add_argument("--node", help="Node to send the queries to (default: the one configured for the binary)")
+    parser.add_argument("-j", "--jobs", type=int, default=DEFAULT_JOBS, help="Number of queries to run at the same time")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="Timeout per query in seconds")
+    parser.add_argument("--no-discover", action="store_true",
+                        help="Use the static list of queries instead of discovering them from the binary")
+    args = parser.parse_args()
+
+    no_argument_queries = NO_ARGUMENT_QUERIES
+    if not args.no_discover:
+        try:
+            no_argument_queries = get_no_argument_queries(discover_command_tree(args.binary, args.jobs, timeout=args.timeout))
+        except FileNotFoundError as e:
+            print(f"Could not discover the queries ({e}), using the static list instead.")
 
-for executed_queries in executed_commands:
-    error = execute_system_call_and_return_error(executed_queries)
-    if error != b'':
-        queries_with_errors.append((" ".join(executed_queries), error))
+    executed_commands = build_query_commands(args.binary, args.node, no_argument_queries)
+    start = time.perf_counter()
+    results = asyncio.run(run_queries(executed_commands, args.jobs, args.timeout, on_result=print_result))
+    queries_with_errors = [result for result in results if result.failed]
 
-print(f"In total {len(queries_with_errors)} out of {len(executed_commands)} queries had errors!")
+    print(
+        f"\nIn total {len(queries_with_errors)} out of {len(executed_commands)} queries had errors! "
+        f"({time.perf_counter() - start:.1f}s)"
+    )
@@ -0,0 +1,135 @@
+"""
+This file contains the unit testing suite for the discovery
+of the query command tree of the Evmos binary.
+"""
+
+import sys
+
+import pytest
+
+import command_tree
+
+
+QUERY_HELP = """Querying subcommands
+
+Usage:
+  evmosd query [flags]
+  evmosd query [command]
+
+Aliases:
+  query, q
+
+Available Commands:
+  bank                     Querying commands for the bank module
+  evm                      Querying commands for the evm module
+
+Flags:
+  -h, --help   help for query
+
+Use "evmosd query [command] --help" for more information about a command.
+"""
+
+BANK_HELP = """Querying commands for the bank module
+
+Usage:
+  evmosd query bank [flags]
+  evmosd query bank [command]
+
+Available Commands:
+  balances                 Query for account balances by address
+  total                    Query the total supply of coins of the chain
+
+Flags:
+  -h, --help   help for bank
+"""
+
+BALANCES_HELP = """Query the total balance of an account or of a specific denomination.
+
+Usage:
+  evmosd query bank balances [address] [flags]
+
+Flags:
+      --denom string   The specific balance denomination to query for
+"""
+
+LEAF_HELP = """Usage:
+  evmosd query {path} [flags]
+
+Flags:
+  -h, --help   help for {path}
+"""
+
+FAKE_BINARY = f"""#!{sys.executable}
+import os
+import sys
+import time
+
+with open(os.environ["CALL_LOG"], "a") as f:
+    f.write(" ".join(sys.argv[1:]) + "\\n")
+
+path = tuple(sys.argv[2:-1])
+if " ".join(path) == os.environ.get("FAIL_PATH"):
+    sys.exit(1)
+if " ".join(path) == os.environ.get("SLOW_PATH"):
+    time.sleep(10)
+helps = {{(): {QUERY_HELP!r}, ("bank",): {BANK_HELP!r}, ("bank", "balances"): {BALANCES_HELP!r}}}
+print(helps.get(path, {LEAF_HELP!r}.format(path=" ".join(path))))
+"""
+
+
+class TestParseHelp:
+    def test_parse_help_should_return_subcommands(self):
+        assert command_tree.parse_help(QUERY_HELP, 0) == (["bank", "evm"], [])
+
+    def test_parse_help_should_return_args_of_leaf(self):
+        assert command_tree.parse_help(BALANCES_HELP, 2) == ([], ["[address]"])
+
+    def test_parse_help_should_ignore_help_command(self):
+        help_text = QUERY_HELP.replace("  evm ", "  help                     Help about any command\n  evm ")
+        assert command_tree.parse_help(help_text, 0) == (["bank", "evm"], [])
+
+
+def create_fake_binary(tmp_path, monkeypatch):
+    binary = tmp_path / "evmosd"
+    binary.write_text(FAKE_BINARY)
+    binary.chmod(0o755)
+    monkeypatch.setenv("CALL_LOG", str(tmp_path / "calls.log"))
+    return binary
+
+
+class TestDiscoverCommandTree:
+    def test_discover_command_tree_should_use_cache(self, tmp_path, monkeypatch):
+        binary = create_fake_binary(tmp_path, monkeypatch)
+        call_log = tmp_path / "calls.log"
+
+        tree = command_tree.discover_command_tree(str(binary), cache_dir=str(tmp_path / "cache"))
+        assert command_tree.get_no_argument_queries(tree) == [["bank", "total"], ["evm"]]
+        assert list(command_tree.iterate_leaves(tree))[0] == (["bank", "balances"], ["[address]"])
+        n_calls = len(call_log.read_text().splitlines())
+        assert n_calls == 5
+
+        assert command_tree.discover_command_tree(str(binary), cache_dir=str(tmp_path / "cache")) == tree
+        assert len(call_log.read_text().splitlines()) == n_calls
+
+    def test_discover_command_tree_should_fail_for_missing_binary(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            command_tree.discover_command_tree("unknownCommand", cache_dir=str(tmp_path))
+
+    def test_discover_command_tree_should_not_cache_failed_commands(self, tmp_path, monkeypatch, capsys):
+        binary = create_fake_binary(tmp_path, monkeypatch)
+        monkeypatch.setenv("FAIL_PATH", "bank")
+
+        tree = command_tree.discover_command_tree(str(binary), cache_dir=str(tmp_path / "cache"))
+
+        assert command_tree.get_no_argument_queries(tree) == [["evm"]]
+        assert "Could not get the help of" in capsys.readouterr().err
+        assert not (tmp_path / "cache").exists()
+
+    def test_discover_command_tree_should_time_out_hanging_commands(self, tmp_path, monkeypatch):
+        binary = create_fake_binary(tmp_path, monkeypatch)
+        monkeypatch.setenv("SLOW_PATH", "evm")
+
+        tree = command_tree.discover_command_tree(str(binary), cache_dir=str(tmp_path / "cache"), timeout=2)
+
+        assert command_tree.get_no_argument_queries(tree) == [["bank", "total"]]
+        assert not (tmp_path / "cache").exists()
@@ -4,6 +4,10 @@ query all Evmos endpoints, that do not require passing any
 arguments.
 """
 
+import asyncio
+import sys
+import time
+
 import query_all_endpoints_without_arguments as queries
 
 
@@ -16,3 +20,38 @@ class TestExecuteSystemCallAndReturnError:
     def test_execute_system_call_and_return_error_command_should_not_return_error(self):
         error = queries.execute_system_call_and_return_error("ls")
         assert error == b''
+
+
+class TestRunQueries:
+    def test_run_queries_should_return_decoded_stderr(self):
+        commands = [
+            [sys.executable, "-c", "pass"],
+            [sys.executable, "-c", "import sys; sys.stderr.write('Error: unknown query')"],
+        ]
+        results = asyncio.run(queries.run_queries(commands))
+        errors = {result.command[-1]: result.error for result in results}
+        assert errors == {"pass": "", "import sys; sys.stderr.write('Error: unknown query')": "Error: unknown query"}
+
+    def test_run_queries_should_time_out(self):
+        commands = [[sys.executable, "-c", "import time; time.sleep(10)"]]
+        results = asyncio.run(queries.run_queries(commands, timeout=0.5))
+        assert results[0].timed_out
+        assert results[0].failed
+        assert results[0].latency < 5
+
+    def test_run_queries_should_report_missing_binary(self):
+        results = asyncio.run(queries.run_queries([["unknownCommand", "q"]]))
+        assert "FileNotFoundError" in results[0].error
+
+    def test_run_queries_should_run_concurrently_and_stream_results(self):
+        commands = [[sys.executable, "-c", f"import time; time.sleep({delay})"] for delay in (1.0, 0.1)]
+        streamed = []
+        start = time.perf_counter()
+        asyncio.run(queries.run_queries(commands, jobs=2, on_result=streamed.append))
+        assert time.perf_counter() - start < 1.9
+        assert [result.command for result in streamed] == commands[::-1]
+
+    def test_build_query_commands_should_pass_node(self):
+        commands = queries.build_query_commands("evmosd", "http://localhost:26657")
+        assert commands[0][:2] == ["evmosd", "q"]
+        assert all(command[-2:] == ["--node", "http://localhost:26657"] for command in commands)
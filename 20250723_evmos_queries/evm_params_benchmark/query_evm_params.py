@@ -1,15 +1,31 @@
 #!/usr/bin/python3
+"""
+This script benchmarks the latency of querying the EVM parameters of an Evmos node.
+
+The query is sent directly to the REST endpoint of the node over keep-alive HTTP connections,
+with one connection per worker, so that the measurements don't include the startup
+of the `evmosd` binary for every call.
+The previous approach of calling the binary is still available with `--cli`.
+"""
+import argparse
+import http.client
 import os
+import queue
 import subprocess
-import timeit
 import sys
+import time
+import timeit
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from results import DEFAULT_RESULTS_FILE, append_run, compare, quantile
+from stub_node import start_stub_node
 
 
 # Define number of calls
 n_calls = 100
 
-# Setup binary to call local host
-os.system("evmosd config node http://localhost:26657")
+DEFAULT_URL = "http://localhost:1317/evmos/evm/v1/params"
 
 
 def query_params():
@@ -23,5 +39,136 @@ def query_params():
         sys.exit("Call failed!")
 
 
-duration = timeit.timeit(query_params, number=n_calls)
-print(f"Execution took {duration / n_calls} seconds on average")
+def benchmark_cli(n: int = n_calls):
+    # Setup binary to call local host
+    os.system("evmosd config node http://localhost:26657")
+
+    duration = timeit.timeit(query_params, number=n)
+    print(f"Execution took {duration / n} seconds on average")
+
+
+def get_binary_version() -> str:
+    """Returns the version of the installed `evmosd` binary, which is used to tag the results."""
+    try:
+        result = subprocess.run(["evmosd", "version"], capture_output=True, text=True)
+    except FileNotFoundError:
+        return "unknown"
+
+    # NOTE: depending on the version, the output is printed to stderr
+    return (result.stdout or result.stderr).strip() or "unknown"
+
+
+def send_query(connection: http.client.HTTPConnection, path: str) -> float:
+    """Sends one query over the given connection and returns its latency in seconds."""
+    start = time.perf_counter()
+    connection.request("GET", path, headers={"Connection": "keep-alive"})
+    response = connection.getresponse()
+    response.read()
+    latency = time.perf_counter() - start
+
+    if response.status != 200:
+        raise RuntimeError(f"Query failed with status {response.status}")
+    return latency
+
+
+def benchmark_http(url: str, n: int, concurrency: int) -> tuple:
+    """
+    Sends n queries to the given URL from the given number of workers,
+    which each keep their own connection open.
+
+    The connections are opened and warmed up with one untimed query before the timing starts,
+    so that the latencies don't include the TCP setup.
+
+    Returns the latencies of all queries in seconds and the total duration.
+    """
+    parts = urlsplit(url)
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+    connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    connections = queue.Queue()
+    for _ in range(concurrency):
+        connection = connection_class(parts.hostname, parts.port, timeout=10)
+        send_query(connection, path)
+        connections.put(connection)
+
+    def query(_):
+        # NOTE: there are as many connections as workers, so a connection is always available
+        connection = connections.get()
+        try:
+            return send_query(connection, path)
+        except (BrokenPipeError, ConnectionResetError):
+            # The node dropped the keep-alive connection (RemoteDisconnected is a ConnectionResetError),
+            # so it's reopened before timing the query again
+            connection.close()
+            connection.connect()
+            return send_query(connection, path)
+        finally:
+            connections.put(connection)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(query, range(n)))
+    duration = time.perf_counter() - start
+
+    while not connections.empty():
+        connections.get().close()
+
+    return latencies, duration
+
+
+def summarize(latencies: list, duration: float) -> dict:
+    return {
+        "p50": quantile(latencies, 0.5),
+        "p95": quantile(latencies, 0.95),
+        "p99": quantile(latencies, 0.99),
+        "throughput": len(latencies) / duration,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark querying the EVM params of a node.")
+    parser.add_argument("--url", default=DEFAULT_URL, help="REST endpoint of the EVM params query")
+    parser.add_argument("-n", "--calls", type=int, default=n_calls, help="Number of queries per concurrency level")
+    parser.add_argument("-c", "--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--stub", action="store_true", help="Run against a local stub node instead of a real node")
+    parser.add_argument("--cli", action="store_true", help="Time the `evmosd q evm params` binary calls instead")
+    parser.add_argument("--tag", help="Version to store the results under (default: output of `evmosd version`)")
+    parser.add_argument("--results", help="File to append the raw latency samples to (default: results.jsonl next to "
+                                          "this script, runs against the stub node are only stored if it's given)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"),
+                        help="Compare the stored results of two versions instead of running the benchmark")
+    args = parser.parse_args()
+
+    if args.compare:
+        try:
+            compare(args.results or DEFAULT_RESULTS_FILE, *args.compare)
+        except (OSError, ValueError) as e:
+            sys.exit(f"Could not compare the results: {e}")
+        sys.exit(0)
+
+    if args.cli:
+        benchmark_cli(args.calls)
+        sys.exit(0)
+
+    url = args.url
+    tag = args.tag
+    if args.stub:
+        server = start_stub_node()
+        url = f"http://127.0.0.1:{server.server_port}/evmos/evm/v1/params"
+        tag = tag or "stub"
+    tag = tag or get_binary_version()
+    # Runs against the stub node would pollute the baselines of the real versions in the default results file
+    results_path = args.results if args.stub else args.results or DEFAULT_RESULTS_FILE
+
+    print(f"{'Concurrency':>11} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'Queries/s':>10}")
+    for concurrency in args.concurrency:
+        latencies, duration = benchmark_http(url, args.calls, concurrency)
+        if results_path is not None:
+            append_run(results_path, tag, concurrency, latencies, duration, url)
+        stats = summarize(latencies, duration)
+        print(
+            f"{concurrency:>11} {stats['p50'] * 1e3:>9.3f} {stats['p95'] * 1e3:>9.3f} "
+            f"{stats['p99'] * 1e3:>9.3f} {stats['throughput']:>10.1f}"
+        )
+
+    if results_path is not None:
+        print(f"\nStored the results for version {tag} in {results_path}")
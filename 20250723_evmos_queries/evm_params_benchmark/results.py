@@ -0,0 +1,94 @@
+"""
+This module stores the raw latency samples of every benchmark run in an append-only
+JSON lines file, tagged with the version of the tested binary, and compares
+the results of two versions using bootstrapped confidence intervals.
+"""
+import json
+import math
+import os
+import random
+import time
+
+
+# NOTE: the results are stored next to this script, so that they are found from any working directory
+DEFAULT_RESULTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results.jsonl")
+
+
+def append_run(path: str, version: str, concurrency: int, latencies: list, duration: float, url: str = ""):
+    """Appends a benchmark run to the results file, storing the latencies in whole microseconds to keep it compact."""
+    run = {
+        "version": version,
+        "timestamp": int(time.time()),
+        "url": url,
+        "concurrency": concurrency,
+        "duration": round(duration, 6),
+        "samples_us": [round(latency * 1e6) for latency in latencies],
+    }
+    with open(path, "a") as f:
+        f.write(json.dumps(run, separators=(",", ":")) + "\n")
+
+
+def load_samples(path: str, version: str) -> dict:
+    """
+    Returns the latency samples in seconds of all runs of the given version, grouped by the concurrency level.
+
+    Raises a ValueError if the file contains a malformed line or no runs of the version.
+    """
+    samples = {}
+    with open(path, "r") as f:
+        for line_number, line in enumerate(f, start=1):
+            try:
+                run = json.loads(line)
+                if run["version"] == version:
+                    samples.setdefault(run["concurrency"], []).extend(sample / 1e6 for sample in run["samples_us"])
+            except (ValueError, KeyError, TypeError) as e:
+                raise ValueError(f"line {line_number} of {path} is not a valid run: {e!r}") from e
+
+    if not samples:
+        raise ValueError(f"{path} contains no runs of version {version}")
+    return samples
+
+
+def quantile(samples: list, q: float) -> float:
+    """Returns the q-th quantile (between 0 and 1) of the samples using the nearest-rank method."""
+    ordered = sorted(samples)
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1))]
+
+
+def bootstrap_difference(base: list, new: list, q: float = 0.5, n_resamples: int = 1000, confidence: float = 0.95,
+                         seed: int = 0) -> tuple:
+    """
+    Returns the difference of the given quantile between the new and the base samples,
+    together with the lower and upper bound of its bootstrapped confidence interval.
+    """
+    rng = random.Random(seed)
+    differences = sorted(
+        quantile(rng.choices(new, k=len(new)), q) - quantile(rng.choices(base, k=len(base)), q)
+        for _ in range(n_resamples)
+    )
+    alpha = (1 - confidence) / 2
+
+    return (
+        quantile(new, q) - quantile(base, q),
+        differences[int(alpha * n_resamples)],
+        differences[min(n_resamples - 1, int((1 - alpha) * n_resamples))],
+    )
+
+
+def compare(path: str, base_version: str, new_version: str, quantiles=(0.5, 0.95)):
+    """Prints the latency differences between two versions and flags significant regressions."""
+    base = load_samples(path, base_version)
+    new = load_samples(path, new_version)
+
+    print(f"Comparing {new_version} against {base_version} (95% bootstrap confidence intervals)")
+    print(f"{'Concurrency':>11} {'Quantile':>8} {'Base (ms)':>10} {'New (ms)':>10} {'Diff (ms)':>10} {'CI (ms)':>21}")
+    for concurrency in sorted(set(base) & set(new)):
+        for q in quantiles:
+            difference, lower, upper = bootstrap_difference(base[concurrency], new[concurrency], q)
+            # NOTE: the difference is significant if the confidence interval does not include zero
+            flag = "REGRESSION" if lower > 0 else ("improvement" if upper < 0 else "")
+            print(
+                f"{concurrency:>11} {'p' + str(round(q * 100)):>8} {quantile(base[concurrency], q) * 1e3:>10.3f} "
+                f"{quantile(new[concurrency], q) * 1e3:>10.3f} {difference * 1e3:>10.3f} "
+                f"[{lower * 1e3:>8.3f}, {upper * 1e3:>8.3f}] {flag}"
+            )
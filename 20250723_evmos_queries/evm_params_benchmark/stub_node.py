@@ -0,0 +1,66 @@
+#!/usr/bin/python3
+"""
+This is a minimal stand-in for the REST endpoint of an Evmos node,
+which answers every GET request with a fixed EVM params response.
+
+It supports keep-alive connections, so the benchmark can be run and tested
+without starting a local node.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+PARAMS_RESPONSE = json.dumps({
+    "params": {
+        "evm_denom": "aevmos",
+        "enable_create": True,
+        "enable_call": True,
+        "extra_eips": ["3855"],
+        "allow_unprotected_txs": False,
+        "active_precompiles": [],
+        "evm_channels": [],
+    }
+}).encode()
+
+
+class StubNodeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # NOTE: the headers and the body are written separately, which is delayed by Nagle's algorithm otherwise
+    disable_nagle_algorithm = True
+    delay = 0.0
+
+    def do_GET(self):
+        if self.delay:
+            time.sleep(self.delay)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(PARAMS_RESPONSE)))
+        self.end_headers()
+        self.wfile.write(PARAMS_RESPONSE)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_node(port: int = 0, delay: float = 0.0) -> ThreadingHTTPServer:
+    """Starts the stub node in a background thread and returns the server (use `server.server_port` for the port)."""
+    handler = type("DelayedStubNodeHandler", (StubNodeHandler,), {"delay": delay})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a stub EVM params endpoint.")
+    parser.add_argument("--port", type=int, default=1317)
+    parser.add_argument("--delay", type=float, default=0.0, help="Artificial latency per request in seconds")
+    args = parser.parse_args()
+
+    server = start_stub_node(args.port, args.delay)
+    print(f"Serving stub node on http://127.0.0.1:{server.server_port}")
+    threading.Event().wait()
@@ -0,0 +1,89 @@
+"""
+This file contains the unit testing suite for the benchmark
+of querying the EVM params, which runs against the local stub node.
+"""
+
+import subprocess
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+
+import query_evm_params as benchmark
+from results import quantile
+from stub_node import StubNodeHandler, start_stub_node
+
+
+def start_counting_stub_node(close_connections: bool = False) -> ThreadingHTTPServer:
+    """Starts a stub node, that counts the opened connections and optionally closes them after every response."""
+
+    class CountingHandler(StubNodeHandler):
+        def setup(self):
+            super().setup()
+            self.server.n_connections += 1
+
+        def do_GET(self):
+            super().do_GET()
+            self.close_connection = close_connections
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CountingHandler)
+    server.daemon_threads = True
+    server.n_connections = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class TestBenchmarkHttp:
+    def test_benchmark_http_should_return_latencies_of_all_queries(self):
+        server = start_stub_node(delay=0.001)
+        url = f"http://127.0.0.1:{server.server_port}/evmos/evm/v1/params"
+
+        latencies, duration = benchmark.benchmark_http(url, 20, 4)
+        server.shutdown()
+
+        assert len(latencies) == 20
+        assert all(0.001 <= latency < duration for latency in latencies)
+
+    def test_benchmark_http_should_open_the_connections_before_timing(self):
+        server = start_counting_stub_node()
+        url = f"http://127.0.0.1:{server.server_port}/evmos/evm/v1/params"
+
+        latencies, _ = benchmark.benchmark_http(url, 20, 4)
+        server.shutdown()
+
+        assert len(latencies) == 20
+        assert server.n_connections == 4
+
+    def test_benchmark_http_should_reconnect_dropped_connections(self):
+        server = start_counting_stub_node(close_connections=True)
+        url = f"http://127.0.0.1:{server.server_port}/evmos/evm/v1/params"
+
+        latencies, _ = benchmark.benchmark_http(url, 5, 1)
+        server.shutdown()
+
+        assert len(latencies) == 5
+        # NOTE: one connection for the warm-up and a new one for every query
+        assert server.n_connections == 6
+
+
+class TestSummarize:
+    def test_summarize_should_use_the_same_quantiles_as_the_comparison(self):
+        latencies = [i / 1000 for i in range(1, 21)]
+
+        stats = benchmark.summarize(latencies, 2.0)
+
+        assert stats["p50"] == quantile(latencies, 0.5) == 0.01
+        assert stats["p95"] == quantile(latencies, 0.95) == 0.019
+        assert stats["throughput"] == 10
+
+
+class TestCompare:
+    def test_compare_should_exit_with_an_error_for_a_missing_results_file(self, tmp_path):
+        result = subprocess.run(
+            [sys.executable, benchmark.__file__, "--results", str(tmp_path / "missing.jsonl"), "--compare", "a", "b"],
+            capture_output=True,
+            text=True,
+        )
+
+        assert result.returncode == 1
+        assert "Could not compare the results" in result.stderr
+        assert "Traceback" not in result.stderr
@@ -0,0 +1,85 @@
+"""
+This file contains the unit testing suite for storing and comparing
+the results of the benchmark runs.
+"""
+
+import os
+import random
+
+import pytest
+
+import results
+
+
+class TestQuantile:
+    def test_quantile_should_use_the_nearest_rank(self):
+        samples = list(range(100, 0, -1))
+
+        assert results.quantile(samples, 0.5) == 50
+        assert results.quantile(samples, 0.95) == 95
+        assert results.quantile(samples, 0.99) == 99
+        assert results.quantile(samples, 0) == 1
+        assert results.quantile(samples, 1) == 100
+        assert results.quantile([3.0], 0.95) == 3.0
+
+
+class TestLoadSamples:
+    def test_load_samples_should_group_the_runs_of_the_version(self, tmp_path):
+        path = str(tmp_path / "results.jsonl")
+        results.append_run(path, "v1", 1, [0.001, 0.002], 0.003)
+        results.append_run(path, "v2", 1, [0.005], 0.005)
+        results.append_run(path, "v1", 4, [0.004], 0.004)
+
+        assert results.load_samples(path, "v1") == {1: [0.001, 0.002], 4: [0.004]}
+
+    def test_load_samples_should_reject_malformed_lines(self, tmp_path):
+        path = tmp_path / "results.jsonl"
+        results.append_run(str(path), "v1", 1, [0.001], 0.001)
+        with open(path, "a") as f:
+            f.write('{"version": "v1", "concur')
+
+        with pytest.raises(ValueError, match="line 2"):
+            results.load_samples(str(path), "v1")
+
+    def test_load_samples_should_reject_unknown_versions(self, tmp_path):
+        path = str(tmp_path / "results.jsonl")
+        results.append_run(path, "v1", 1, [0.001], 0.001)
+
+        with pytest.raises(ValueError, match="no runs of version v2"):
+            results.load_samples(path, "v2")
+
+
+class TestCompare:
+    def test_bootstrap_difference_should_flag_a_shifted_distribution(self):
+        rng = random.Random(0)
+        base = [rng.gauss(0.010, 0.001) for _ in range(500)]
+        slower = [sample + 0.002 for sample in base]
+        same = [rng.gauss(0.010, 0.001) for _ in range(500)]
+
+        difference, lower, upper = results.bootstrap_difference(base, slower, 0.5)
+        assert difference == pytest.approx(0.002)
+        assert 0 < lower <= difference <= upper
+
+        _, lower, upper = results.bootstrap_difference(base, same, 0.5)
+        assert lower <= 0 <= upper
+
+    def test_compare_should_print_regressions_and_improvements(self, tmp_path, capsys):
+        path = str(tmp_path / "results.jsonl")
+        rng = random.Random(1)
+        base = [rng.gauss(0.010, 0.001) for _ in range(300)]
+        results.append_run(path, "v1", 1, base, 1.0)
+        results.append_run(path, "v1", 4, base, 1.0)
+        results.append_run(path, "v2", 1, [sample + 0.003 for sample in base], 1.0)
+        results.append_run(path, "v2", 4, [sample - 0.003 for sample in base], 1.0)
+
+        results.compare(path, "v1", "v2", quantiles=(0.5,))
+
+        lines = capsys.readouterr().out.splitlines()[2:]
+        assert lines[0].split()[0] == "1" and lines[0].endswith("REGRESSION")
+        assert lines[1].split()[0] == "4" and lines[1].endswith("improvement")
+
+
+class TestDefaultResultsFile:
+    def test_default_results_file_should_be_next_to_the_module(self):
+        module_dir = os.path.dirname(os.path.abspath(results.__file__))
+        assert results.DEFAULT_RESULTS_FILE == os.path.join(module_dir, "results.jsonl")
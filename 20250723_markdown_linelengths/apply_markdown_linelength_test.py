@@ -3,6 +3,12 @@ This file contains the unit testing suite for the package to apply
 the markdown line length to all *.md files in a given folder.
 """
 
+import hashlib
+import json
+import subprocess
+
+import pytest
+
 import apply_markdown_linelengths as aml
 
 
@@ -30,3 +36,186 @@ def test_apply_markdown_line_length(tmpdir):
 
     contents = tmp_file.read().split("\n")
     assert parts == contents
+
+
+def test_reflow_lines_skips_code_blocks():
+    long_line = "word " * 20 + "and more " * 10 + "\n"
+    lines = ["```bash\n", long_line, "```\n", long_line]
+
+    reflowed = list(aml.reflow_lines(lines))
+
+    assert reflowed[:3] == [(line, False) for line in lines[:3]]
+    assert reflowed[3][1] is True
+    assert all(len(line) <= aml.LINE_LENGTH for line in reflowed[3][0].split("\n"))
+
+
+def test_reflow_lines_skips_tilde_fences_and_indented_code():
+    long_line = "word " * 20 + "and more " * 10
+    lines = [
+        "~~~\n", long_line + "\n", "```\n", long_line + "\n", "~~~\n",
+        "\n", "    " + long_line + "\n", "\n", "\t" + long_line + "\n",
+    ]
+
+    assert list(aml.reflow_lines(lines)) == [(line, False) for line in lines]
+
+
+def test_reflow_lines_reflows_indented_paragraph_continuations():
+    long_line = "word " * 20 + "and more " * 10
+    lines = ["Some text\n", "    " + long_line + "\n"]
+
+    assert [changed for _, changed in aml.reflow_lines(lines)] == [False, True]
+
+
+def test_reflow_line_does_not_break_before_block_markers():
+    for marker in ["-", "*", "+", "1.", "2)", "#", "##"]:
+        line = "word " * 22 + f"items: {marker} first item and more text that goes on, and on"
+        reflowed = aml.reflow_line(line)
+
+        assert not any(aml.BLOCK_MARKER_PATTERN.match(part) for part in reflowed[1:]), reflowed
+
+
+def test_reflow_line_strips_the_remainder():
+    line = "x " * 30 + "This is some text with a sentence.  " + "and another which is long enough, " * 3
+
+    reflowed = aml.reflow_line(line)
+
+    assert len(reflowed) > 1
+    assert all(part and part == part.lstrip() for part in reflowed)
+
+
+def test_reflow_lines_skips_tables_and_headings():
+    long_text = "This is a long line, " * 10
+    lines = [f"| {long_text} | cell |\n", f"## {long_text}\n", f"  | {long_text} |\n"]
+
+    assert list(aml.reflow_lines(lines)) == [(line, False) for line in lines]
+
+
+def test_apply_line_length_to_file_keeps_mode(tmpdir):
+    tmp_file = tmpdir.join("test.md")
+    tmp_file.write("This is a long line, " * 10 + "\n")
+    tmp_file.chmod(0o640)
+
+    assert aml.apply_line_length_to_file(str(tmp_file)) is True
+    assert tmp_file.stat().mode & 0o777 == 0o640
+
+
+def test_apply_line_length_to_file_only_writes_changes(tmpdir):
+    tmp_file = tmpdir.join("test.md")
+    tmp_file.write("short line\n")
+    tmp_file.setmtime(0)
+
+    tmpdir.setmtime(0)
+    assert aml.apply_line_length_to_file(str(tmp_file)) is False
+    assert tmp_file.mtime() == 0
+    # NOTE: no temporary file is created either, which would change the modification time of the folder
+    assert tmpdir.mtime() == 0
+    assert tmpdir.listdir() == [tmp_file]
+
+    tmp_file.write("This is a long line, " * 10 + "\n")
+    assert aml.apply_line_length_to_file(str(tmp_file)) is True
+    assert all(len(line) <= aml.LINE_LENGTH for line in tmp_file.read().split("\n"))
+
+
+def test_apply_markdown_line_length_with_cache_and_jobs(tmpdir, monkeypatch):
+    cache_path = str(tmpdir.join("cache.json"))
+    docs = tmpdir.mkdir("docs")
+    for i in range(4):
+        docs.join(f"{i}.md").write("This is a long line, " * 10 + "\n")
+
+    assert aml.apply_markdown_line_length(str(docs), jobs=2, cache_path=cache_path) is True
+    contents = docs.join("0.md").read()
+    assert all(len(line) <= aml.LINE_LENGTH for line in contents.split("\n"))
+
+    # Unchanged files are skipped without being read
+    with monkeypatch.context() as m:
+        m.setattr(aml, "process_file", lambda *args: pytest.fail(f"unexpected read of {args[0]}"))
+        assert aml.apply_markdown_line_length(str(docs), cache_path=cache_path) is True
+
+    # Files with a new modification time but the same contents are not rewritten
+    docs.join("2.md").setmtime(0)
+    assert aml.apply_markdown_line_length(str(docs), cache_path=cache_path) is True
+    assert docs.join("2.md").mtime() == 0
+    assert docs.join("2.md").read() == contents
+
+
+def test_apply_markdown_line_length_cache_is_independent_of_the_working_directory(tmpdir, monkeypatch):
+    cache_path = str(tmpdir.join("cache.json"))
+    docs = tmpdir.mkdir("docs")
+    docs.join("latin1.md").write_binary(b"Caf\xe9 " + b"This is a long line, " * 10 + b"\n")
+
+    monkeypatch.chdir(tmpdir)
+    assert aml.apply_markdown_line_length("docs", cache_path=cache_path) is True
+    with open(cache_path) as f:
+        entries = json.load(f)["files"]
+    file_path = str(docs.join("latin1.md"))
+    assert list(entries) == [file_path]
+    assert entries[file_path][2] == hashlib.sha256(docs.join("latin1.md").read_binary()).hexdigest()
+
+    monkeypatch.chdir(docs)
+    monkeypatch.setattr(aml, "process_file", lambda *args: pytest.fail(f"unexpected read of {args[0]}"))
+    assert aml.apply_markdown_line_length(".", cache_path=cache_path) is True
+
+
+def git(repo, *args):
+    subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True)
+
+
+def test_check_changed_lines(tmpdir):
+    repo = str(tmpdir)
+    git(repo, "init", "-q")
+    git(repo, "config", "user.email", "test@example.com")
+    git(repo, "config", "user.name", "test")
+    long_line = "x" * (aml.LINE_LENGTH + 1) + "\n"
+    tmpdir.join("old.md").write(long_line)
+    tmpdir.join("notes.txt").write(long_line)
+    git(repo, "add", ".")
+    git(repo, "commit", "-qm", "initial")
+
+    tmpdir.join("old.md").write("short\n" + long_line + "short\n" + long_line)
+    tmpdir.mkdir("docs").join("new.md").write(long_line)
+    tmpdir.join("notes.txt").write(long_line + long_line)
+    git(repo, "add", ".")
+    git(repo, "commit", "-qm", "change")
+
+    assert aml.check_changed_lines(repo, "HEAD~1..HEAD") == [
+        ("docs/new.md", 1, aml.LINE_LENGTH + 1),
+        ("old.md", 2, aml.LINE_LENGTH + 1),
+    ]
+
+
+def test_check_changed_lines_matches_the_fixer(tmpdir):
+    repo = str(tmpdir)
+    git(repo, "init", "-q")
+    git(repo, "config", "user.email", "test@example.com")
+    git(repo, "config", "user.name", "test")
+    long_line = "x" * (aml.LINE_LENGTH + 5)
+    tmpdir.join("doc.md").write("```\n" + long_line + "\n")
+    git(repo, "add", ".")
+    git(repo, "commit", "-qm", "initial")
+
+    # The first long line is in the code block, that was opened in an unchanged line
+    tmpdir.join("doc.md").write_binary(
+        ("```\n" + long_line + "\n" + long_line + "\n```\n" + f"++ {long_line}\r\n" + f"# {long_line}\n").encode()
+    )
+    git(repo, "add", ".")
+    git(repo, "commit", "-qm", "change")
+
+    assert aml.check_changed_lines(repo, "HEAD~1..HEAD") == [("doc.md", 5, aml.LINE_LENGTH + 1)]
+
+
+def test_check_changed_lines_unquotes_paths(tmpdir):
+    repo = str(tmpdir)
+    git(repo, "init", "-q")
+    git(repo, "config", "user.email", "test@example.com")
+    git(repo, "config", "user.name", "test")
+    git(repo, "commit", "-q", "--allow-empty", "-m", "initial")
+    long_line = "x" * (aml.LINE_LENGTH + 1) + "\n"
+    file_names = ["with space.md", "ünïcode.md", 'quote"and\\backslash.md', "b/nested.md"]
+    for file_name in file_names:
+        tmpdir.join(file_name).write_text(long_line, encoding="utf-8", ensure=True)
+    git(repo, "add", ".")
+    git(repo, "commit", "-qm", "change")
+
+    assert sorted(aml.check_changed_lines(repo, "HEAD~1..HEAD")) == sorted(
+        (file_name, 1, aml.LINE_LENGTH + 1) for file_name in file_names
+    )
@@ -2,9 +2,15 @@
 # ----------------------
 # Imports
 #
+import argparse
+import hashlib
+import json
 import os
 import re
+import shutil
+import subprocess
 import sys
+from concurrent.futures import ProcessPoolExecutor
 
 # ----------------------
 # Globals
@@ -13,14 +19,25 @@ LINE_LENGTH = 120
 BREAK_BEFORE = r' (and|or|which|that|to)'
 BREAK_AFTER = r'(?:\s*\d+\.)*(\.|:|,|\!|\?) '
 
+BREAK_BEFORE_PATTERN = re.compile(BREAK_BEFORE)
+BREAK_AFTER_PATTERN = re.compile(BREAK_AFTER)
+LIST_PREFIX_PATTERN = re.compile(r'\s*(?:[-*+]|\d+\.)?\s*')
+# Text starting with these markers would be rendered as a list item, a heading or a quote
+BLOCK_MARKER_PATTERN = re.compile(r'\s*(?:[-*+]|\d+[.)]|#{1,6}|>)(?:\s|$)')
+GIT_PATH_ESCAPES = {"a": "\a", "b": "\b", "t": "\t", "n": "\n", "v": "\v", "f": "\f", "r": "\r"}
+FENCE_PATTERN = re.compile(r'\s*(`{3,}|~{3,})')
+HUNK_HEADER_PATTERN = re.compile(r'@@ -\d+(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+# NOTE: the diffs in check mode contain the whole files, which is needed to know where the code blocks are
+FULL_CONTEXT = 1_000_000
+
 
 
 # ----------------------
 # Definitions
 #
-def find_match_to_break_in_line(line: str) -> list:
-    prev_match = ...
-    for current_match in re.finditer(BREAK_BEFORE, line):
+def find_match_to_break_in_line(line: str) -> re.Match | None:
+    prev_match = None
+    for current_match in BREAK_BEFORE_PATTERN.finditer(line):
         if current_match.end() > LINE_LENGTH:
             if current_match.start() > LINE_LENGTH:
                 return prev_match
@@ -32,42 +49,345 @@ def find_match_to_break_in_line(line: str) -> list:
     return None
 
 
+def find_break_after_punctuation(line: str) -> int | None:
+    """
+    Returns the position after the last punctuation within the line length,
+    which is not part of a leading list marker (e.g. "1. ")
+    and is not followed by a list or heading marker, which would start a new block in the next line.
+    """
+    prefix_length = LIST_PREFIX_PATTERN.match(line).end()
+
+    break_position = None
+    for match in BREAK_AFTER_PATTERN.finditer(line):
+        if match.end() - 1 > LINE_LENGTH:
+            break
+        if match.start() >= prefix_length and not BLOCK_MARKER_PATTERN.match(line, match.end()):
+            break_position = match.end() - 1
+
+    return break_position
+
+
 def break_line(line: str, match: re.Match) -> str:
-    return line[:match.start()] + r'\n' + line[match.start():]
+    # NOTE: the matched keyword starts with a space, which is replaced by the line break
+    return line[:match.start()] + '\n' + line[match.start() + 1:]
+
+
+def reflow_line(line: str) -> list:
+    """Splits a line without its line ending into lines, that are at most as long as the line length if possible."""
+    lines = []
+    while len(line) > LINE_LENGTH:
+        break_position = find_break_after_punctuation(line)
+        if break_position is None:
+            match = find_match_to_break_in_line(line)
+            if match is None:
+                break
+            head, line = break_line(line, match).split('\n', 1)
+        else:
+            head, line = line[:break_position], line[break_position + 1:]
+
+        # NOTE: repeated spaces at the break would indent the next line or leave an empty one
+        line = line.lstrip()
+        if head.strip():
+            lines.append(head.rstrip())
+
+    if line or not lines:
+        lines.append(line)
+    return lines
+
+
+def track_code_blocks(lines):
+    """
+    Yields each of the given lines of a markdown file and whether it is in a code block.
+    Code blocks are fenced with ``` or ~~~, or indented by four spaces or a tab after a blank line.
+    """
+    fence = None
+    in_indented_block = False
+    after_blank_line = True
+    for line in lines:
+        content = line.rstrip("\r\n")
+        match = FENCE_PATTERN.match(content)
+        if fence is not None:
+            # A fence is only closed by the same character, at least as often and without an info string
+            if match and match.group(1)[0] == fence[0] and len(match.group(1)) >= len(fence) \
+                    and content.strip() == match.group(1):
+                fence = None
+            yield line, True
+        elif match:
+            fence = match.group(1)
+            yield line, True
+        elif not content.strip():
+            yield line, in_indented_block
+        else:
+            in_indented_block = content.startswith(("    ", "\t")) and (after_blank_line or in_indented_block)
+            yield line, in_indented_block
+
+        after_blank_line = not content.strip()
+
+
+def exceeds_line_length(content: str, in_code_block: bool) -> bool:
+    """
+    Returns if the given line (without its line ending) has to be reflowed.
+    Lines in code blocks, table rows and headings are exempt,
+    because breaking them would change their meaning.
+    """
+    if in_code_block or len(content) <= LINE_LENGTH:
+        return False
+
+    return not content.lstrip().startswith(("|", "#"))
+
+
+def reflow_lines(lines, verbose: bool = False):
+    """
+    Yields the reflowed line and whether it was changed for each of the given lines of a markdown file.
+    """
+    for line, in_code_block in track_code_blocks(lines):
+        content = line.rstrip("\r\n")
+        if not exceeds_line_length(content, in_code_block):
+            yield line, False
+            continue
+
+        reflowed = reflow_line(content)
+        if len(reflowed) == 1:
+            yield line, False
+            continue
+
+        if verbose:
+            print("Line pre: ", content)
+            print("Line pos: ", "\n".join(reflowed))
+
+        line_ending = line[len(content):]
+        yield (line_ending or "\n").join(reflowed) + line_ending, True
+
+
+def apply_line_length_to_file(file_path: str, verbose: bool = False, digest=None) -> bool:
+    """
+    Applies the line length to the given file, which is only written if its contents change.
+    The file is written atomically by replacing it with a temporary file in the same folder,
+    which keeps the mode of the original file.
+
+    If a hashlib object is passed as the digest, it's updated with the raw bytes of the resulting file.
+    Returns if the file was changed.
+    """
+    # NOTE: surrogateescape round-trips bytes, that are not valid UTF-8, so the hash matches the bytes on disk
+    with open(file_path, "r", encoding="utf-8", errors="surrogateescape", newline="") as f:
+        reflowed = list(reflow_lines(f, verbose))
+
+    content = "".join(line for line, _ in reflowed)
+    if digest is not None:
+        digest.update(content.encode("utf-8", "surrogateescape"))
+
+    # NOTE: unchanged files are not touched at all, so that their modification time stays the same
+    if not any(changed for _, changed in reflowed):
+        return False
+
+    tmp_file_path = file_path + ".tmp"
+    with open(tmp_file_path, "w", encoding="utf-8", errors="surrogateescape", newline="") as tmp_file:
+        tmp_file.write(content)
+
+    shutil.copymode(file_path, tmp_file_path)
+    os.replace(tmp_file_path, file_path)
+
+    return True
+
+
+def process_file(file_path: str, verbose: bool = False, cached_hash: str | None = None) -> tuple:
+    """
+    Applies the line length to the given file, unless its contents match the cached hash.
 
+    Returns the file path, whether it was changed and its resulting cache entry.
+    """
+    if cached_hash is not None:
+        with open(file_path, "rb") as f:
+            content_hash = hashlib.sha256(f.read()).hexdigest()
+        if content_hash == cached_hash:
+            stat = os.stat(file_path)
+            return file_path, False, [stat.st_size, stat.st_mtime_ns, content_hash]
 
-def apply_markdown_line_length(path: str) -> bool:
+    digest = hashlib.sha256()
+    changed = apply_line_length_to_file(file_path, verbose, digest)
+    stat = os.stat(file_path)
+
+    return file_path, changed, [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+
+
+def load_cache(cache_path: str | None) -> dict:
+    if cache_path is None or not os.path.exists(cache_path):
+        return {}
+
+    with open(cache_path, "r") as f:
+        cache = json.load(f)
+
+    # NOTE: files are only known to comply for the same settings, that they were checked with
+    if cache.get("settings") != [LINE_LENGTH, BREAK_BEFORE, BREAK_AFTER]:
+        return {}
+
+    return cache["files"]
+
+
+def save_cache(cache_path: str, files: dict):
+    tmp_cache_path = cache_path + ".tmp"
+    with open(tmp_cache_path, "w") as f:
+        json.dump({"settings": [LINE_LENGTH, BREAK_BEFORE, BREAK_AFTER], "files": files}, f)
+
+    os.replace(tmp_cache_path, cache_path)
+
+
+def apply_markdown_line_length(path: str, verbose: bool = False, jobs: int = 1, cache_path: str | None = None) -> bool:
+    """
+    Applies the line length to all markdown files in the given folder.
+
+    Files can be processed by multiple worker processes in parallel.
+    If a cache file is given, the files, whose size and modification time did not change
+    since the last run, are skipped without reading them.
+    """
     if not os.path.isdir(path) or not os.path.exists(path):
         return False
 
-    for root, _, files in os.walk(path):
-        for file in files:
-            if not file.endswith(".md"):
+    cache = load_cache(cache_path)
+    files = {}
+    pending = []
+    for root, _, file_names in os.walk(path):
+        for file_name in file_names:
+            if not file_name.endswith(".md"):
                 continue
 
-            file_path = os.path.join(root, file)
-            with open(file_path, "r") as f:
-                lines = f.readlines()
-            for i, line in enumerate(lines):
-                if len(line) > LINE_LENGTH:
-                    print("Line pre: ", line)
-                    if re.search(BREAK_AFTER, line):
-                        line = re.sub(BREAK_AFTER, '\1' + r'\n', line)
-                    elif re.search(BREAK_BEFORE, line):
-                        line = re.sub(BREAK_BEFORE, r'\n' + '\1', line)
-                    else:
-                        line = line
-                    lines[i] = line
-                    print("Line pos: ", lines[i])
-
-            with open(file_path, "w") as f:
-                f.writelines(lines)
+            # NOTE: the cache is keyed by absolute paths, so that it's shared between runs from different folders
+            file_path = os.path.abspath(os.path.join(root, file_name))
+            cached = cache.get(file_path)
+            if cached is not None:
+                stat = os.stat(file_path)
+                if cached[:2] == [stat.st_size, stat.st_mtime_ns]:
+                    files[file_path] = cached
+                    continue
+
+            pending.append((file_path, verbose, cached[2] if cached is not None else None))
+
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(process_file, *zip(*pending), chunksize=16)) if pending else []
+    else:
+        results = [process_file(*arguments) for arguments in pending]
+
+    for file_path, changed, entry in results:
+        files[file_path] = entry
+        if changed and verbose:
+            print("Updated: ", file_path)
+
+    if cache_path is not None:
+        save_cache(cache_path, files)
 
     return True
 
 
+def unquote_git_path(path: str) -> str:
+    """
+    Returns the file path of a `+++ ` line of a git diff, which is followed by a tab if it contains spaces
+    and quoted with C-style escapes (with the bytes of non-ASCII characters in octal) if it contains special characters.
+    """
+    path = path.rstrip("\t")
+    if not (len(path) > 1 and path.startswith('"') and path.endswith('"')):
+        return path
+
+    quoted = path[1:-1].encode("utf-8", "surrogateescape")
+    unquoted = bytearray()
+    i = 0
+    while i < len(quoted):
+        if quoted[i] != ord("\\"):
+            unquoted.append(quoted[i])
+            i += 1
+        elif quoted[i + 1:i + 2].isdigit():
+            unquoted.append(int(quoted[i + 1:i + 4], 8))
+            i += 4
+        else:
+            escape = chr(quoted[i + 1])
+            unquoted.append(ord(GIT_PATH_ESCAPES.get(escape, escape)))
+            i += 2
+
+    return unquoted.decode("utf-8", "surrogateescape")
+
+
+def parse_new_files(diff: str) -> dict:
+    """
+    Parses the new version of each file from a git diff.
+
+    Returns a dict of the file paths to the (line number, content, added) tuples of their lines in the diff.
+    """
+    files = {}
+    lines = None
+    line_number = old_remaining = new_remaining = 0
+    for line in diff.split("\n"):
+        # NOTE: file headers are only parsed outside of hunks, because added lines can start with "++" as well
+        if old_remaining == 0 and new_remaining == 0:
+            if line.startswith("+++ "):
+                # NOTE: the diff is created with --no-prefix, so the path has no "b/" prefix
+                lines = files.setdefault(unquote_git_path(line[len("+++ "):]), [])
+            elif line.startswith("@@ "):
+                old_count, line_number, new_count = HUNK_HEADER_PATTERN.match(line).groups()
+                old_remaining = int(old_count or 1)
+                new_remaining = int(new_count or 1)
+                line_number = int(line_number)
+            continue
+
+        if line.startswith("\\"):
+            continue
+        if not line.startswith("+"):
+            old_remaining -= 1
+        if not line.startswith("-"):
+            new_remaining -= 1
+            lines.append((line_number, line[1:].rstrip("\r"), line.startswith("+")))
+            line_number += 1
+
+    return files
+
+
+def check_changed_lines(repo_path: str, rev_range: str) -> list:
+    """
+    Checks the lines of markdown files, that were added or changed in the given git revision range,
+    without reading or writing any files in the working tree.
+
+    Lines, that the fixer skips (in code blocks, table rows and headings), are not reported.
+    Long lines, that the fixer can't break (e.g. without any spaces), are still reported,
+    because they have to be shortened by hand.
+
+    Returns a list of (file, line number, column) for each line exceeding the line length,
+    where the column is the first one past the line length.
+    """
+    result = subprocess.run(
+        ["git", "-C", repo_path, "diff", f"--unified={FULL_CONTEXT}", "--no-color", "--no-ext-diff",
+         "--no-prefix", "--diff-filter=d", rev_range, "--", "*.md"],
+        capture_output=True,
+        encoding="utf-8",
+        errors="surrogateescape",
+        check=True,
+    )
+
+    violations = []
+    for file_path, lines in parse_new_files(result.stdout).items():
+        code_blocks = track_code_blocks(content for _, content, _ in lines)
+        for (line_number, content, added), (_, in_code_block) in zip(lines, code_blocks):
+            if added and exceeds_line_length(content, in_code_block):
+                violations.append((file_path, line_number, LINE_LENGTH + 1))
+
+    return violations
+
+
 # ----------------------
 # Execution
 #
 if __name__ == '__main__':
-    apply_markdown_line_length(sys.argv[1])
+    parser = argparse.ArgumentParser(description="Apply the maximum line length to all markdown files in a folder.")
+    parser.add_argument("path", help="Folder containing the markdown files (or the git repository when using --check)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print the changed lines and files")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of worker processes")
+    parser.add_argument("--cache", help="File to store the files, that are known to comply, to skip them in later runs")
+    parser.add_argument("--check", metavar="REV_RANGE",
+                        help="Only check the lines changed in this git revision range (e.g. main..HEAD) without writing")
+    args = parser.parse_args()
+
+    if args.check:
+        violations = check_changed_lines(args.path, args.check)
+        for file_path, line_number, column in violations:
+            print(f"{file_path}:{line_number}:{column}: line longer than {LINE_LENGTH} characters")
+        sys.exit(1 if violations else 0)
+
+    apply_markdown_line_length(args.path, args.verbose, args.jobs, args.cache)